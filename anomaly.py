@@ -0,0 +1,209 @@
+"""
+Incremental detection of reduced baby movement.
+
+Baselines are exponentially weighted sums over past days, kept for each
+hour of the day, plus kick totals per gestational week. They catch up
+from the kicks_changes log, so every insert, update or delete costs O(1)
+however long the history is, and are persisted in anomaly_state so a
+restart does not rescan the table. check() compares today's hourly
+rollup rows against the baselines.
+
+Only the active database counts: archived pregnancies (archive.py) are
+finished, and their days would carry next to no weight anyway. Moving
+records into or out of an archive shows in the log like any delete or
+insert.
+"""
+import json
+import math
+from collections import namedtuple
+from datetime import datetime
+import database
+from connection import transaction
+from settings import get_pregnancy_start_ordinal
+
+# a day's weight in the baseline halves every HALF_LIFE_DAYS days
+HALF_LIFE_DAYS = 7
+DECAY = 0.5 ** (1 / HALF_LIFE_DAYS)
+
+MIN_HISTORY_DAYS = 3  # days of history before the baseline is trusted
+MIN_EXPECTED = 3      # too few kicks expected to tell anything apart
+REDUCED_RATIO = 0.5   # flag below this share of the usual count...
+Z_LIMIT = -2.0        # ...that is also this many deviations below it
+
+Alert = namedtuple("Alert", "level message")  # level: "ok" or "warning"
+
+
+class Baselines:
+    """
+    Detection state as of log entry seq. For hour h, s1[h] is the sum
+    over days d of DECAY ** (ref_day - d) * x, where x is the total kicks
+    in hour h of day d, and s2[h] the same sum over x * x. weeks maps
+    gestational week (counted from start) to total kicks.
+    """
+    def __init__(self, seq=0, ref_day=0, start=None, s1=None, s2=None, weeks=None):
+        self.seq = seq
+        self.ref_day = ref_day
+        self.start = start
+        self.s1 = s1 or [0.0] * 24
+        self.s2 = s2 or [0.0] * 24
+        self.weeks = weeks or {}
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        data["weeks"] = {int(week): total for week, total in data["weeks"].items()}
+        return cls(**data)
+
+    def to_json(self):
+        return json.dumps({
+            "seq": self.seq, "ref_day": self.ref_day, "start": self.start,
+            "s1": self.s1, "s2": self.s2, "weeks": self.weeks,
+        })
+
+    def rebase(self, day):
+        """Move the reference day forward, decaying the sums to match."""
+        if day > self.ref_day:
+            factor = DECAY ** (day - self.ref_day)
+            self.s1 = [v * factor for v in self.s1]
+            self.s2 = [v * factor for v in self.s2]
+            self.ref_day = day
+
+    def change_cell(self, day, hour, old, new):
+        """Account for hour `hour` of `day` going from old to new kicks."""
+        weight = DECAY ** (self.ref_day - day)
+        self.s1[hour] += weight * (new - old)
+        self.s2[hour] += weight * (new * new - old * old)
+        if self.start is not None and day >= self.start:
+            week = (day - self.start) // 7
+            self.weeks[week] = self.weeks.get(week, 0) + new - old
+
+    def fill_weeks(self, start, daily_totals):
+        """Recount weeks from (day, total) pairs for a new start ordinal."""
+        self.start = start
+        self.weeks = {}
+        if start is None:
+            return
+        for day, total in daily_totals:
+            if day >= start:
+                week = (day - start) // 7
+                self.weeks[week] = self.weeks.get(week, 0) + total
+
+    def hourly_stats(self, today_hours, history_days):
+        """
+        (means, variances) of kicks per hour over the history_days days
+        before ref_day, given today's {hour: total}.
+        """
+        weight = DECAY * (1 - DECAY ** history_days) / (1 - DECAY)
+        means, variances = [], []
+        for hour in range(24):
+            x = today_hours.get(hour, 0)
+            mean = (self.s1[hour] - x) / weight
+            means.append(mean)
+            variances.append(max((self.s2[hour] - x * x) / weight - mean * mean, 0.0))
+        return means, variances
+
+
+def _build(seq, today):
+    state = Baselines(seq=seq, ref_day=today)
+    for day, hour, total in database.get_hourly_totals(archived=False):
+        state.change_cell(day, hour, 0, total)
+    state.fill_weeks(get_pregnancy_start_ordinal(), database.get_daily_totals(archived=False))
+    return state
+
+
+def _apply(state, entries):
+    # net change per (day, hour); the rollup already holds the new totals
+    cells = {}
+    for _, old_day, old_minute, old_count, day, minute, count in entries:
+        if old_day is not None:
+            key = (old_day, old_minute // 60)
+            cells[key] = cells.get(key, 0) - old_count
+        if day is not None:
+            key = (day, minute // 60)
+            cells[key] = cells.get(key, 0) + count
+    for (day, hour), delta in cells.items():
+        if delta:
+            new = database.get_hour_total(day, hour)
+            state.change_cell(day, hour, new - delta, new)
+
+
+def refresh(today):
+    """
+    Bring the persisted baselines up to date with the kicks_changes log
+    and return them. Rebuilds from the rollups only when there is no
+    saved state or the log no longer reaches back to it.
+    """
+    with transaction():
+        text = database.load_anomaly_state()
+        state = Baselines.from_json(text) if text else None
+        latest, oldest = database.get_change_bounds()
+        if (state is None or state.seq > latest
+                or (oldest is not None and oldest > state.seq + 1)):
+            state = _build(latest, today)
+        else:
+            state.rebase(today)
+            if latest > state.seq:
+                _apply(state, database.get_change_deltas(state.seq))
+                state.seq = latest
+            start = get_pregnancy_start_ordinal()
+            if start != state.start:
+                state.fill_weeks(start, database.get_daily_totals(archived=False))
+        database.save_anomaly_state(state.to_json())
+    return state
+
+
+def _reduced_today(state, now, today_hours, history_days):
+    means, variances = state.hourly_stats(today_hours, history_days)
+    part = now.minute / 60
+    expected = sum(means[:now.hour]) + part * means[now.hour]
+    variance = sum(variances[:now.hour]) + part * variances[now.hour]
+    observed = sum(total for hour, total in today_hours.items() if hour <= now.hour)
+    if expected < MIN_EXPECTED or observed >= REDUCED_RATIO * expected:
+        return None
+    # expected doubles as a Poisson floor for hours that never vary
+    z = (observed - expected) / math.sqrt(variance + expected)
+    if z >= Z_LIMIT:
+        return None
+    return Alert("warning",
+                 f"Fewer kicks than usual today: {observed} so far,\n"
+                 f"usually about {expected:.0f} by this time.")
+
+
+def _reduced_week(state, today, first_day):
+    if state.start is None:
+        return None
+    last = (today - state.start) // 7 - 1
+    if last < 1 or first_day > state.start + 7 * (last - 1):
+        return None  # need two full weeks of history
+    last_mean = state.weeks.get(last, 0) / 7
+    prior_mean = state.weeks.get(last - 1, 0) / 7
+    if prior_mean < MIN_EXPECTED or last_mean >= REDUCED_RATIO * prior_mean:
+        return None
+    return Alert("warning",
+                 f"Week {last}: {last_mean:.1f} kicks/day,\n"
+                 f"down from {prior_mean:.1f} in week {last - 1}.")
+
+
+def check(now=None):
+    """
+    Evaluate today's movement against the baselines; returns a list of
+    Alerts. Costs the same whatever the size of the history.
+    """
+    now = now or datetime.now()
+    today = now.date().toordinal()
+    state = refresh(today)
+    today_hours = {hour: total for _, hour, total in database.get_hourly_totals(today, today)}
+    records = database.count_records(today, today)
+    first_day = database.get_first_day()
+
+    alerts = []
+    if not records:
+        alerts.append(Alert("warning", "No records today!\nPlease check baby activity."))
+    if first_day is not None and today - first_day >= MIN_HISTORY_DAYS:
+        for alert in (_reduced_today(state, now, today_hours, today - first_day),
+                      _reduced_week(state, today, first_day)):
+            if alert is not None:
+                alerts.append(alert)
+    if not alerts:
+        alerts.append(Alert("ok", f"{records} record(s) today.\nAll good."))
+    return alerts
@@ -0,0 +1,362 @@
+"""
+Per-pregnancy archive databases, attached on demand.
+
+archive_range() moves the records of a completed pregnancy out of the
+active database into a compact file of its own (archives/ next to the
+database, named after the first and last date), with its (day, minute)
+index and its rows of the daily/hourly rollups, and registers it in the
+archives table. The active database keeps only what is still being
+tracked, so the indexes and rollups every query walks stay small.
+
+Read functions in database.py ask source() what to select from. A date
+range that no registered archive overlaps is answered from the active
+tables directly; the current pregnancy never pays for old ones. Once a
+range reaches into archives, they are ATTACHed to the calling thread's
+connection and the query goes through temp views (kicks_all,
+kicks_daily_all, kicks_hourly_all) that UNION ALL the active table with
+every attached archive. The day range in the query's WHERE clause is
+pushed down into each branch, so each file is searched on its own index.
+
+Archives are read-only, and so are their day ranges in the active
+database: inserts there are skipped and edits moving a record there are
+refused (see migrations._guard_archived_days). unarchive() moves the
+records back. Kick-counting sessions (kick_sessions) stay in the active
+database: archiving a session's record unlinks it, the archive keeps the
+link (session_links), and unarchive() restores it. Backups (backup.py)
+copy only the active database.
+
+    python cli.py archive 2023-01-09 2023-10-20
+    python cli.py archives
+    python cli.py unarchive archives/baby_kicks-2023-01-09_2023-10-20.db
+"""
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+import cache
+import connection
+from backup import BackupError, check
+from connection import transaction
+from models import day_to_date, parse_date
+from settings import get_pregnancy_start_ordinal
+
+# relative to the folder of the active database
+ARCHIVE_DIR = "archives"
+PREFIX = "baby_kicks-"
+# archives attached to one connection at a time (SQLite allows 10)
+MAX_ATTACHED = 8
+# 2: session_links
+SCHEMA_VERSION = 2
+
+_SCHEMA_NAME = re.compile(r"archive_\d+$")
+
+# archived tables, their columns, and the view over them
+TABLES = {
+    "kicks": "id, day, minute, kicks, comment, added_at",
+    "kicks_daily": "day, total, records",
+    "kicks_hourly": "day, hour, total, records",
+}
+
+_ARCHIVE_SCHEMA = """
+CREATE TABLE kicks (
+    id INTEGER PRIMARY KEY,
+    day INTEGER NOT NULL,
+    minute INTEGER NOT NULL CHECK (minute BETWEEN 0 AND 1439),
+    kicks INTEGER CHECK (kicks >= 0),
+    comment TEXT,
+    added_at TEXT
+);
+CREATE TABLE kicks_daily (
+    day INTEGER PRIMARY KEY,
+    total INTEGER NOT NULL,
+    records INTEGER NOT NULL
+);
+CREATE TABLE kicks_hourly (
+    day INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    PRIMARY KEY (day, hour)
+) WITHOUT ROWID;
+CREATE TABLE session_links (
+    session_id INTEGER PRIMARY KEY,
+    record_id INTEGER NOT NULL
+);
+"""
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _db_dir():
+    return os.path.dirname(os.path.abspath(connection.DB_PATH))
+
+
+def _resolve(path):
+    return path if os.path.isabs(path) else os.path.join(_db_dir(), path)
+
+
+def list_archives():
+    """(id, path, first day, last day, records, start day) of every archive, oldest first."""
+    return connection.get_connection().execute("""
+        SELECT id, path, first_day, last_day, records, start_day
+          FROM archives
+      ORDER BY first_day
+    """).fetchall()
+
+
+def find(path):
+    """The list_archives() entry for an archive file, or None."""
+    path = os.path.normcase(os.path.abspath(_resolve(path)))
+    for entry in list_archives():
+        if os.path.normcase(os.path.abspath(_resolve(entry[1]))) == path:
+            return entry
+    return None
+
+
+def source(table="kicks", lo=-1, hi=1 << 62):
+    """
+    What to select `table` rows with lo <= day <= hi from: the table of
+    the active database when no archive overlaps the range, otherwise
+    the temp view adding the archives, attached first if necessary.
+    The view has an extra start_day column: the pregnancy start ordinal
+    of archived rows, NULL for active ones.
+    """
+    conn = connection.get_connection()
+    needed = conn.execute("""
+        SELECT id, path FROM archives WHERE first_day <= ? AND last_day >= ?
+    """, (hi, lo)).fetchall()
+    if not needed:
+        return table
+    _attach(conn, {f"archive_{archive_id}": path for archive_id, path in needed})
+    return f"temp.{table}_all"
+
+
+def reaches(start_day=None, end_day=None):
+    """True if any archive holds days in the range (either bound optional)."""
+    return connection.get_connection().execute("""
+        SELECT 1 FROM archives WHERE first_day <= ? AND last_day >= ? LIMIT 1
+    """, (1 << 62 if end_day is None else end_day,
+          -1 if start_day is None else start_day)).fetchone() is not None
+
+
+def _attach(conn, needed):
+    """
+    Attach the needed archives ({schema name: path}), detaching others if
+    necessary, and rebuild the views whenever the attached set changed.
+    """
+    registered = {f"archive_{archive_id}": start for archive_id, start in
+                  conn.execute("SELECT id, start_day FROM archives")}
+    attached = {name for _, name, _ in conn.execute("PRAGMA database_list")
+                if _SCHEMA_NAME.match(name)}
+    # unarchived since, or making room for the ones needed now
+    drop = attached - registered.keys()
+    missing = needed.keys() - attached
+    spare = sorted(attached - drop - needed.keys())
+    while len(attached) - len(drop) + len(missing) > MAX_ATTACHED and spare:
+        drop.add(spare.pop())
+    if len(attached) - len(drop) + len(missing) > MAX_ATTACHED:
+        raise ArchiveError(
+            f"The date range spans more than {MAX_ATTACHED} archives; choose a shorter one."
+        )
+    if not drop and not missing:
+        return
+    for name in drop:
+        conn.execute(f"DETACH {name}")
+    for name in sorted(missing):
+        path = _resolve(needed[name])
+        if not os.path.exists(path):
+            raise ArchiveError(f"Archive {path} is missing.")
+        conn.execute(f"ATTACH ? AS {name}", (path,))
+    schemas = sorted(attached - drop | missing)
+    for table, columns in TABLES.items():
+        branches = [f"SELECT {columns}, NULL AS start_day FROM main.{table}"]
+        for name in schemas:
+            start = registered[name]
+            branches.append(f"SELECT {columns}, {start:d} FROM {name}.{table}")
+        conn.execute(f"DROP VIEW IF EXISTS temp.{table}_all")
+        conn.execute(f"CREATE TEMP VIEW {table}_all AS {' UNION ALL '.join(branches)}")
+
+
+def _changed_since(cursor, seq, lo, hi):
+    """True if kicks_changes shows records between lo and hi changed after seq."""
+    oldest = cursor.execute("SELECT MIN(seq) FROM kicks_changes").fetchone()[0]
+    if oldest is not None and oldest > seq + 1:
+        return True  # pruned; cannot tell
+    return cursor.execute("""
+        SELECT 1 FROM kicks_changes
+         WHERE seq > ? AND (day BETWEEN ? AND ? OR old_day BETWEEN ? AND ?)
+         LIMIT 1
+    """, (seq, lo, hi, lo, hi)).fetchone() is not None
+
+
+def archive_range(start_date, end_date, directory=ARCHIVE_DIR):
+    """
+    Move the records from start_date (the pregnancy's start date) to
+    end_date inclusive into a new archive file in directory. Returns
+    (path, number of records). The range must end before the current
+    pregnancy start in Settings and must not overlap another archive.
+
+    The records are first copied from one read snapshot, and the file
+    is compacted and checked; then one write transaction deletes them
+    from the active database and registers the archive, unless they
+    changed meanwhile (ArchiveError; nothing is moved).
+    """
+    lo, hi = parse_date(start_date), parse_date(end_date)
+    if lo > hi:
+        raise ValueError("The start date is after the end date")
+    current = get_pregnancy_start_ordinal()
+    if current is not None and hi >= current:
+        raise ArchiveError(
+            f"Only completed pregnancies can be archived; the range reaches into the "
+            f"current one (started {day_to_date(current)})."
+        )
+    conn = connection.get_connection()
+    overlap = conn.execute("""
+        SELECT path FROM archives WHERE first_day <= ? AND last_day >= ? LIMIT 1
+    """, (hi, lo)).fetchone()
+    if overlap:
+        raise ArchiveError(f"The range overlaps the archive {overlap[0]}.")
+
+    directory = _resolve(directory)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{PREFIX}{day_to_date(lo)}_{day_to_date(hi)}.db")
+    if os.path.exists(path):
+        raise ArchiveError(f"{path} already exists.")
+    part = path + ".part"
+    registered = False
+    try:
+        target = sqlite3.connect(part, isolation_level=None)
+        try:
+            target.executescript(_ARCHIVE_SCHEMA)
+        finally:
+            target.close()
+        conn.execute("ATTACH ? AS archive_new", (part,))
+        try:
+            with transaction(mode="DEFERRED") as cursor:
+                seq = cursor.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM kicks_changes").fetchone()[0]
+                cursor.execute(f"""
+                    INSERT INTO archive_new.kicks ({TABLES['kicks']})
+                    SELECT {TABLES['kicks']} FROM main.kicks
+                     WHERE day BETWEEN ? AND ?
+                  ORDER BY day, minute
+                """, (lo, hi))
+                records = cursor.rowcount
+                first, last = cursor.execute(
+                    "SELECT MIN(day), MAX(day) FROM archive_new.kicks").fetchone()
+                for table in ("kicks_daily", "kicks_hourly"):
+                    cursor.execute(f"""
+                        INSERT INTO archive_new.{table}
+                        SELECT {TABLES[table]} FROM main.{table} WHERE day BETWEEN ? AND ?
+                    """, (lo, hi))
+                # deleting the records sets kick_sessions.record_id to NULL
+                cursor.execute("""
+                    INSERT INTO archive_new.session_links (session_id, record_id)
+                    SELECT s.id, s.record_id
+                      FROM main.kick_sessions s JOIN archive_new.kicks k ON k.id = s.record_id
+                """)
+        finally:
+            conn.execute("DETACH archive_new")
+        if not records:
+            raise ArchiveError(f"No records between {day_to_date(lo)} and {day_to_date(hi)}.")
+
+        target = sqlite3.connect(part, isolation_level=None)
+        try:
+            # built after the rows went in, in order: a compact index
+            target.execute(
+                "CREATE UNIQUE INDEX idx_kicks_day_minute ON kicks(day, minute)")
+            target.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            target.execute("VACUUM")
+        finally:
+            target.close()
+        try:
+            check(part)
+        except BackupError as e:
+            raise ArchiveError(str(e)) from None
+        os.replace(part, path)
+
+        with transaction() as cursor:
+            if _changed_since(cursor, seq, lo, hi):
+                raise ArchiveError(
+                    "Records in the range changed while they were being archived; "
+                    "nothing was moved. Try again."
+                )
+            cursor.execute("DELETE FROM kicks WHERE day BETWEEN ? AND ?", (lo, hi))
+            cursor.execute("""
+                INSERT INTO archives
+                  (path, first_day, last_day, records, start_day, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (os.path.relpath(path, _db_dir()),
+                  first, last, records, lo, datetime.now().isoformat(timespec='seconds')))
+        registered = True
+        cache.clear()
+    finally:
+        if not registered:
+            for leftover in (part, path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+    return path, records
+
+
+def _relink_sessions(cursor, first, last):
+    """Point sessions at their records restored from archive_restore."""
+    version = cursor.execute("PRAGMA archive_restore.user_version").fetchone()[0]
+    if version >= 2:
+        # only where the restored record was not skipped for a taken id
+        cursor.execute("""
+            UPDATE main.kick_sessions SET record_id = l.record_id
+              FROM archive_restore.session_links l
+              JOIN archive_restore.kicks a ON a.id = l.record_id
+              JOIN main.kicks k ON k.id = a.id AND k.day = a.day AND k.minute = a.minute
+             WHERE kick_sessions.id = l.session_id AND kick_sessions.record_id IS NULL
+        """)
+        return
+    # started_at is local ISO text, e.g. 2023-05-01T09:30:00.250
+    cursor.execute("""
+        UPDATE main.kick_sessions SET record_id = k.id
+          FROM main.kicks k
+         WHERE kick_sessions.record_id IS NULL
+           AND k.day BETWEEN ? AND ?
+           AND k.day = CAST(julianday(date(started_at)) - 1721424.5 AS INTEGER)
+           AND k.minute = CAST(strftime('%H', started_at) AS INTEGER) * 60
+                        + CAST(strftime('%M', started_at) AS INTEGER)
+    """, (first, last))
+
+
+def unarchive(path):
+    """
+    Move an archive's records back into the active database and drop it
+    from the registry. Records whose date and time were taken meanwhile
+    are skipped; the file is deleted unless there were any. Sessions
+    get their restored records back (by date and time for archives made
+    before session_links). Returns (restored, skipped).
+    """
+    entry = find(path)
+    if entry is None:
+        raise ArchiveError(f"{path} is not a registered archive.")
+    archive_id, stored, first, last, records, _ = entry
+    conn = connection.get_connection()
+    name = f"archive_{archive_id}"
+    if any(db == name for _, db, _ in conn.execute("PRAGMA database_list")):
+        conn.execute(f"DETACH {name}")
+    conn.execute("ATTACH ? AS archive_restore", (_resolve(stored),))
+    try:
+        with transaction() as cursor:
+            # unregistered first: inserts into archived ranges are skipped
+            cursor.execute("DELETE FROM archives WHERE id = ?", (archive_id,))
+            cursor.execute(f"""
+                INSERT OR IGNORE INTO main.kicks ({TABLES['kicks']})
+                SELECT {TABLES['kicks']} FROM archive_restore.kicks ORDER BY day, minute
+            """)
+            restored = cursor.rowcount
+            _relink_sessions(cursor, first, last)
+    finally:
+        conn.execute("DETACH archive_restore")
+        # the registry changed even if no record did
+        cache.clear()
+    if restored == records:
+        os.remove(_resolve(stored))
+    return restored, records - restored
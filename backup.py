@@ -0,0 +1,242 @@
+"""
+Online backups through SQLite's backup API.
+
+A backup copies the database a few pages at a time, sleeping between
+steps, inside one read transaction on its own connection. With WAL
+journaling that read transaction never blocks writers, and it keeps the
+copy a consistent snapshot: writes made meanwhile do not restart it. A
+backup of a large database therefore never stalls insert_record or the
+UI for longer than one small step.
+
+Backups are files named baby_kicks-YYYYMMDD-HHMMSS-mmm.db in BACKUP_DIR,
+next to the database (a relative directory is taken from the database's
+folder, not the working directory).
+Each one gets an integrity check. rotate() keeps the newest backup of
+each of the last keep_daily days and of each of the last keep_weekly ISO
+weeks. BackupScheduler does all of that in a background thread once per
+interval while the app runs.
+
+    python cli.py backup [--dir backups] [--keep-daily 7] [--keep-weekly 4]
+    python cli.py restore backups/baby_kicks-20250105-211500-042.db
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import connection
+import migrations
+
+# relative to the folder of the database
+BACKUP_DIR = "backups"
+PREFIX = "baby_kicks-"
+# file name time stamp, to the millisecond; names without the
+# milliseconds, from older releases, are still recognized
+STAMP = "%Y%m%d-%H%M%S"
+# pages copied per step (4 KiB each) and the pause after every step
+PAGES_PER_STEP = 64
+STEP_SLEEP = 0.005
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+# how often the scheduler makes a backup, and how often it checks
+INTERVAL = timedelta(days=1)
+CHECK_SECONDS = 3600
+
+
+class BackupError(Exception):
+    pass
+
+
+def _stamp(now):
+    return f"{now.strftime(STAMP)}-{now.microsecond // 1000:03d}"
+
+
+def _taken(stamp):
+    """The datetime in a file name's time stamp, or None."""
+    for fmt in (STAMP + "-%f", STAMP):
+        try:
+            return datetime.strptime(stamp, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def _resolve(directory):
+    if os.path.isabs(directory):
+        return directory
+    return os.path.join(os.path.dirname(os.path.abspath(connection.DB_PATH)), directory)
+
+
+def check(path, quick=False):
+    """Raise BackupError unless PRAGMA integrity_check on path says ok."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        pragma = "quick_check" if quick else "integrity_check"
+        problems = [row[0] for row in conn.execute(f"PRAGMA {pragma}")]
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"{path} is not a usable database: {e}") from None
+    finally:
+        conn.close()
+    if problems != ["ok"]:
+        raise BackupError(f"{path} failed the integrity check: {'; '.join(problems[:5])}")
+
+
+def backup(directory=BACKUP_DIR, pages=PAGES_PER_STEP, sleep=STEP_SLEEP,
+           progress=None, verify=True):
+    """
+    Copy the database into a new timestamped file in directory and
+    return its path. progress(remaining, total), if given, is called
+    after every step. The copy is written under a temporary name and
+    only renamed once complete and, if verify, checked. An existing file
+    is never replaced: BackupError if the name is taken.
+    """
+    directory = _resolve(directory)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{PREFIX}{_stamp(datetime.now())}.db")
+    part = path + ".part"
+
+    def step(status, remaining, total):
+        if progress is not None:
+            progress(remaining, total)
+        if remaining and sleep:
+            time.sleep(sleep)
+
+    source = sqlite3.connect(connection.DB_PATH, isolation_level=None)
+    try:
+        target = sqlite3.connect(part, isolation_level=None)
+        try:
+            # one read transaction for the whole copy: a consistent
+            # snapshot that concurrent writes do not restart
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            source.backup(target, pages=pages, progress=step)
+            source.execute("COMMIT")
+            # a self-contained file, without -wal/-shm companions
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        if verify:
+            check(part)
+        if os.path.exists(path):
+            raise BackupError(f"{path} already exists.")
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    finally:
+        source.close()
+    return path
+
+
+def list_backups(directory=BACKUP_DIR):
+    """(taken at, path) of the backups in directory, newest first."""
+    found = []
+    directory = _resolve(directory)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return found
+    for name in names:
+        if not (name.startswith(PREFIX) and name.endswith(".db")):
+            continue
+        taken = _taken(name[len(PREFIX):-3])
+        if taken is None:
+            continue
+        found.append((taken, os.path.join(directory, name)))
+    found.sort(reverse=True)
+    return found
+
+
+def rotate(directory=BACKUP_DIR, keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY):
+    """
+    Delete backups except the newest of each of the last keep_daily days
+    and of each of the last keep_weekly weeks. Returns the deleted paths.
+    """
+    days, weeks, keep = set(), set(), set()
+    backups = list_backups(directory)
+    for taken, path in backups:  # newest first
+        day, week = taken.date(), taken.isocalendar()[:2]
+        if day not in days and len(days) < keep_daily:
+            days.add(day)
+            keep.add(path)
+        if week not in weeks and len(weeks) < keep_weekly:
+            weeks.add(week)
+            keep.add(path)
+    removed = [path for _, path in backups if path not in keep]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def restore(path, directory=BACKUP_DIR):
+    """
+    Replace the database contents with the backup at path, after checking
+    it, and bring the schema up to date. The current contents are backed
+    up into directory first; that backup's path is returned. Meant to run
+    while the app is closed.
+    """
+    check(path)
+    saved = backup(directory, pages=-1, sleep=0)
+    if os.path.normcase(os.path.abspath(saved)) == os.path.normcase(os.path.abspath(path)):
+        raise BackupError(f"The backup of the current contents would replace {path}.")
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        target = connection.get_connection()
+        source.backup(target)
+    finally:
+        source.close()
+    migrations.migrate()
+    return saved
+
+
+class BackupScheduler:
+    """
+    Background thread making a backup whenever the newest one is older
+    than interval, then rotating. Failures are kept in last_error rather
+    than raised, so a full disk never takes the app down.
+    """
+    def __init__(self, directory=BACKUP_DIR, interval=INTERVAL,
+                 keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY):
+        self.directory = directory
+        self.interval = interval
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.last_backup = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop after the current step; a half-written backup is discarded."""
+        self._stop.set()
+
+    def due(self):
+        backups = list_backups(self.directory)
+        return not backups or datetime.now() - backups[0][0] >= self.interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.due():
+                    self.last_backup = backup(self.directory, progress=self._check_stop)
+                    rotate(self.directory, self.keep_daily, self.keep_weekly)
+                self.last_error = None
+            except _Stopped:
+                return
+            except Exception as e:
+                self.last_error = e
+            self._stop.wait(CHECK_SECONDS)
+
+    def _check_stop(self, remaining, total):
+        if self._stop.is_set():
+            raise _Stopped
+
+
+class _Stopped(Exception):
+    pass
@@ -0,0 +1,59 @@
+"""
+Benchmark: anomaly.check() against a long history.
+
+The first check builds the baselines from the rollups; later ones only
+apply new kicks_changes entries and read today's rollup rows, so they
+should cost the same at any table size.
+
+    python -m benchmarks.bench_anomaly [--rows 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import anomaly
+import connection
+import database
+
+FIRST_DAY = 738886  # 2024-01-01
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    last_day = FIRST_DAY + (args.rows - 1) // 1440
+    now = datetime.fromordinal(last_day) + timedelta(hours=18)
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.configure(db_path=os.path.join(tmp, "bench.db"))
+        database.create_table()
+        database.insert_records(
+            (FIRST_DAY + i // 1440, i % 1440, i % 5, "", "") for i in range(args.rows)
+        )
+
+        results = {
+            "first check (build)": _ms(lambda: anomaly.check(now)),
+            "check, nothing new": _ms(lambda: anomaly.check(now)),
+        }
+        database.update_record(2, FIRST_DAY, 1, 9, "")
+        database.delete_record(1)
+        results["check after 2 writes"] = _ms(lambda: anomaly.check(now))
+        results["check next day"] = _ms(lambda: anomaly.check(now + timedelta(days=1)))
+        connection.close_connection()
+
+    print(f"{args.rows:,} rows")
+    for name, ms in results.items():
+        print(f"  {name:<22} {ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: queries on the current pregnancy with every past pregnancy
+in the active database versus moved into archive files (archive.py),
+against a generated history (see benchmarks/generate.py), plus the same
+queries on an archived pregnancy, which attach its file on first use.
+Also checks that re-importing archived records adds nothing (exit
+status 1 otherwise). Works on a copy; the --db file is left unchanged.
+
+    python -m benchmarks.bench_archive [--rows 1000000] [--db kicks-1m.db] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+import archive
+import cache
+import connection
+import database
+import importer
+import settings
+from benchmarks import generate
+
+
+def _queries(start):
+    end = (date.fromisoformat(start) + timedelta(weeks=41)).isoformat()
+    middle = (date.fromisoformat(start) + timedelta(weeks=30)).isoformat()
+    return [
+        ("get_records_page, first", lambda: database.get_records_page(start, end)),
+        ("get_records_page, newest", lambda: database.get_records_page(
+            start, end, descending=True)),
+        ("get_records_between_dates, 1 day", lambda: database.get_records_between_dates(
+            middle, middle)),
+        ("count_records", lambda: database.count_records(start, end)),
+        ("get_daily_totals", lambda: database.get_daily_totals(start, end)),
+        ("get_hourly_totals", lambda: database.get_hourly_totals(start, end)),
+        ("search_records", lambda: database.search_records("hiccups", start, end)),
+        ("record_exists", lambda: database.record_exists(middle, "21:00")),
+    ]
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _run(label, start, repeat):
+    print(f"  {label}")
+    for name, fn in _queries(start):
+        first = _time(fn, 1)
+        print(f"    {name:<36} {first:9.3f} {_time(fn, repeat):9.3f}")
+
+
+def _reimport(start, end):
+    """Import the records between start and end again; True if none were added."""
+    before = database.count_records()
+    result = importer.import_rows(
+        (r.date, r.time, "" if r.kicks is None else str(r.kicks), r.comment, r.added_at or "")
+        for r in database.get_records_between_dates(start, end))
+    ok = result.inserted == 0 and database.count_records() == before
+    print(f"  re-imported {result.read:,} archived records: {result.inserted:,} added"
+          f"{'' if ok else '  << FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--db", help="benchmark database; generated there if missing")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.db or os.path.join(tmp, "generated.db")
+        if not os.path.exists(source):
+            print(f"generating {args.rows:,} rows -> {source}")
+            generate.generate(source, args.rows)
+        with open(source + ".json") as f:
+            starts = json.load(f)["pregnancy_starts"]
+        path = os.path.join(tmp, "bench.db")
+        shutil.copy(source, path)
+        connection.configure(db_path=path)
+        database.create_table()
+        settings.set_pregnancy_start_date(starts[-1])
+        cache.ENABLED = False
+        print(f"{database.count_records():,} rows, {len(starts)} pregnancies, "
+              f"{os.path.getsize(path) / 2**20:.0f} MiB")
+        print(f"  {'ms':<40} {'first':>9} {'best':>9}")
+        _run("current pregnancy, nothing archived", starts[-1], args.repeat)
+
+        start = time.perf_counter()
+        for first, following in zip(starts, starts[1:]):
+            last = date.fromisoformat(following) - timedelta(days=1)
+            archive.archive_range(first, last.isoformat())
+        elapsed = time.perf_counter() - start
+        database.get_connection().execute("VACUUM")
+        connection.close_connection()
+        print(f"  archived {len(starts) - 1} pregnancies in {elapsed:.2f} s; active database "
+              f"{os.path.getsize(path) / 2**20:.0f} MiB, {database.count_records(starts[-1]):,} rows")
+
+        _run("current pregnancy, past ones archived", starts[-1], args.repeat)
+        _run("archived pregnancy (first: attach)", starts[0], args.repeat)
+        ok = _reimport(starts[0], starts[-1])
+        connection.close_connection()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: insert_record latency while an online backup runs, against
+a generated history (see benchmarks/generate.py). Compared are no
+backup, the stepped backup backup.py makes, and a one-step copy of the
+whole file.
+
+    python -m benchmarks.bench_backup [--rows 1000000] [--db kicks-1m.db]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import backup
+import connection
+import database
+from benchmarks import generate
+
+INSERT_PAUSE = 0.002  # between inserts, like a busy ingestion client
+
+
+def _inserts(stop, first_day, latencies, limit=None):
+    n = 0
+    while not stop.is_set() and (limit is None or n < limit):
+        day, minute = divmod(n, 1440)
+        start = time.perf_counter()
+        database.insert_record(first_day + day, minute, 3, "")
+        latencies.append((time.perf_counter() - start) * 1000)
+        n += 1
+        time.sleep(INSERT_PAUSE)
+
+
+def _report(label, latencies, seconds):
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    print(f"  {label:<30} {len(ordered):>6} {pct(50):8.3f} {pct(95):8.3f} "
+          f"{pct(99):8.3f} {ordered[-1]:8.3f} {seconds:8.2f}")
+
+
+def _run(label, day, backup_args, directory):
+    latencies = []
+    stop = threading.Event()
+    start = time.perf_counter()
+    if backup_args is None:
+        _inserts(stop, day, latencies, limit=500)
+    else:
+        worker = threading.Thread(target=_inserts, args=(stop, day, latencies))
+        worker.start()
+        try:
+            backup.backup(directory, **backup_args)
+        finally:
+            stop.set()
+            worker.join()
+    _report(label, latencies, time.perf_counter() - start)
+    database.get_connection().execute("DELETE FROM kicks WHERE day >= ?", (day,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--db", help="benchmark database; generated there if missing")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "bench.db")
+        if not os.path.exists(path):
+            print(f"generating {args.rows:,} rows -> {path}")
+            generate.generate(path, args.rows)
+        connection.configure(db_path=path)
+        database.create_table()
+        last_day = database.get_connection().execute(
+            "SELECT MAX(day) FROM kicks_daily").fetchone()[0]
+        size = os.path.getsize(path) / 2**20
+        print(f"{database.count_records():,} rows, {size:.0f} MiB")
+        print(f"  {'insert_record latency, ms':<30} {'n':>6} {'p50':>8} {'p95':>8} "
+              f"{'p99':>8} {'max':>8} {'secs':>8}")
+        directory = os.path.join(tmp, "backups")
+        day = last_day + 1
+        _run("no backup", day, None, directory)
+        _run(f"stepped ({backup.PAGES_PER_STEP} pages, "
+             f"{backup.STEP_SLEEP * 1000:g} ms sleep)", day, {}, directory)
+        _run("one step", day, {"pages": -1, "sleep": 0}, directory)
+        connection.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark: per-call cost of connect/close per operation versus the
+persistent per-thread connection from connection.py.
+
+    python -m benchmarks.bench_connection [--rows N] [--calls N]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import connection
+import database
+
+
+def _old_record_exists(path, day, minute):
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM kicks WHERE day = ? AND minute = ? LIMIT 1", (day, minute))
+    exists = cur.fetchone() is not None
+    conn.close()
+    return exists
+
+
+def _old_insert(path, i):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO kicks (day, minute, kicks, comment, added_at)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (800000 + i // 1440, i % 1440, 1, "", ""),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _per_call_us(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        connection.configure(db_path=path)
+        database.create_table()
+        database.insert_records(
+            (738886 + i // 1440, i % 1440, 1, "", "") for i in range(args.rows)
+        )
+
+        results = {
+            "record_exists (connect per call)":
+                _per_call_us(lambda i: _old_record_exists(path, 738886, 0), args.calls),
+            "record_exists (persistent)":
+                _per_call_us(lambda i: database.record_exists("2024-01-01", "00:00"), args.calls),
+            "insert (connect per call)":
+                _per_call_us(lambda i: _old_insert(path, i), args.calls),
+            "insert (persistent, WAL)":
+                _per_call_us(lambda i: database.insert_record(
+                    810000 + i // 1440, i % 1440, 1, ""), args.calls),
+        }
+        connection.close_connection()
+
+    for name, us in results.items():
+        print(f"{name:<36} {us:10.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
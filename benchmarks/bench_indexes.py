@@ -0,0 +1,78 @@
+"""
+Benchmark: kicks queries without and with the (day, minute) index, at
+several table sizes.
+
+    python -m benchmarks.bench_indexes [--sizes 100000 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import connection
+import database
+
+FIRST_DAY = 730120  # 2000-01-01
+
+
+def _fill(rows):
+    database.insert_records(
+        (FIRST_DAY + i // 1440, i % 1440, 1, "", "") for i in range(rows)
+    )
+
+
+def _best_ms(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _queries(rows):
+    middle = FIRST_DAY + rows // 2880
+    return {
+        "record_exists": lambda: database.record_exists(middle, 750),
+        "between (1 week)": lambda: database.get_records_between_dates(middle, middle + 6),
+        "all ordered (first page)": lambda: database.get_connection().execute(
+            "SELECT * FROM kicks ORDER BY day DESC, minute DESC LIMIT 200").fetchall(),
+    }
+
+
+def _plan(sql):
+    rows = database.get_connection().execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return "; ".join(r[-1] for r in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    probe = f"SELECT 1 FROM kicks WHERE day = {FIRST_DAY} AND minute = 750"
+    for size in args.sizes:
+        queries = _queries(size)
+        with tempfile.TemporaryDirectory() as tmp:
+            connection.configure(db_path=os.path.join(tmp, "bench.db"))
+            database.create_table()
+            _fill(size)
+            conn = database.get_connection()
+
+            conn.execute("DROP INDEX idx_kicks_day_minute")
+            scan_plan = _plan(probe)
+            before = {name: _best_ms(q) for name, q in queries.items()}
+            conn.execute("CREATE UNIQUE INDEX idx_kicks_day_minute ON kicks(day, minute)")
+            seek_plan = _plan(probe)
+            after = {name: _best_ms(q) for name, q in queries.items()}
+            connection.close_connection()
+
+        print(f"\n{size:,} rows")
+        print(f"  plan without index: {scan_plan}")
+        print(f"  plan with index:    {seek_plan}")
+        for name in queries:
+            print(f"  {name:<26} {before[name]:9.3f} ms -> {after[name]:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
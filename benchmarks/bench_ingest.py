@@ -0,0 +1,135 @@
+"""
+Benchmark: the HTTP ingestion API (server.py) on localhost. Concurrent
+clients post keyed events, one per request and in batches, while a
+second thread writes through database.py the way the desktop app does.
+Every event is then posted again, which must only replay: the record
+count may not change.
+
+    python -m benchmarks.bench_ingest [--events 20000] [--clients 20] [--batch 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+import connection
+import database
+from models import day_to_date
+from server import IngestServer
+
+FIRST_DAY = 738886  # 2024-01-01
+
+
+def _event(n, run):
+    day, minute = divmod(n, 1440)
+    return {
+        "date": day_to_date(FIRST_DAY + day), "time": f"{minute // 60:02d}:{minute % 60:02d}",
+        "kicks": n % 12, "comment": "from phone" if n % 10 == 0 else "",
+        "idempotency_key": f"{run}-{n}",
+    }
+
+
+async def _post(reader, writer, payload):
+    body = json.dumps(payload).encode()
+    writer.write(
+        b"POST /kicks HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def _client(port, events, batch, counts):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for i in range(0, len(events), batch):
+        chunk = events[i:i + batch]
+        payload = chunk[0] if batch == 1 else chunk
+        status, reply = await _post(reader, writer, payload)
+        results = [reply] if batch == 1 else reply["results"]
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        counts[status] = counts.get(status, 0) + 1
+    writer.close()
+
+
+async def _run(server, events, clients, batch):
+    counts = {}
+    shares = [events[i::clients] for i in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(server.port, share, batch, counts) for share in shares))
+    return time.perf_counter() - start, counts
+
+
+def _desktop_writer(stop, day, written):
+    """Insert a record now and then, like someone using the Tk form."""
+    minute = 0
+    while not stop.is_set() and minute < 1440:
+        database.insert_record(day, minute, 3, "desktop")
+        written[0] += 1
+        minute += 1
+        time.sleep(0.005)
+    connection.close_connection()
+
+
+async def _main(args):
+    server = IngestServer(port=0)
+    await server.start()
+    total = args.events
+    events = [_event(n, "run") for n in range(total)]
+    stop = threading.Event()
+    written = [0]
+    desktop = threading.Thread(
+        target=_desktop_writer, args=(stop, FIRST_DAY - 1, written), daemon=True)
+    desktop.start()
+
+    for label, batch in (("1 event per request", 1), (f"{args.batch} per request", args.batch)):
+        part = events[:total // 10] if batch == 1 else events[total // 10:]
+        elapsed, counts = await _run(server, part, args.clients, batch)
+        print(f"  {label:<22} {len(part):>7,} events in {elapsed:6.2f} s "
+              f"= {len(part) / elapsed:8,.0f} events/s  {counts}")
+
+    elapsed, counts = await _run(server, events, args.clients, args.batch)
+    stop.set()
+    desktop.join()
+    await server.close()
+
+    print(f"  {'retry everything':<22} {total:>7,} events in {elapsed:6.2f} s "
+          f"= {total / elapsed:8,.0f} events/s  {counts}")
+    print(f"  desktop thread wrote {written[0]} records alongside")
+    ok = (counts.get("replayed") == total
+          and database.count_records() == total + written[0])
+    print("  retries created no records" if ok else "  FAIL: retries were not idempotent")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ingest.db")
+        connection.configure(db_path=path)
+        database.create_table()
+        ok = asyncio.run(_main(args))
+        connection.close_connection()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
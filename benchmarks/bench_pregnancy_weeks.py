@@ -0,0 +1,75 @@
+"""
+Benchmark: changing the pregnancy start date on a large table.
+
+Gestational age is derived at query time (database.RECORD_COLUMNS), so a
+new start date rewrites no rows. This measures the change plus the
+first page read afterwards, a pass deriving the age of every row, and
+the memoized calculate_pregnancy_weeks over one date per row. Exits
+with status 1 if the change takes longer than --budget-ms.
+
+    python -m benchmarks.bench_pregnancy_weeks [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import connection
+import database
+import settings
+from models import day_to_date
+from utils import calculate_pregnancy_weeks
+
+FIRST_DAY = 738886  # 2024-01-01
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _change_start(start_date):
+    settings.set_pregnancy_start_date(start_date)
+    return database.get_records_page(limit=200)
+
+
+def _derive_all():
+    start = settings.get_pregnancy_start_ordinal()
+    return database.get_connection().execute(
+        "SELECT MIN(day - ?), MAX(day - ?) FROM kicks", (start, start)
+    ).fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.configure(db_path=os.path.join(tmp, "bench.db"))
+        database.create_table()
+        database.insert_records(
+            (FIRST_DAY + i // 1440, i % 1440, 1, "", "") for i in range(args.rows)
+        )
+
+        change_ms, page = _ms(lambda: _change_start("2023-12-04"))
+        assert page[0].pregnancy_weeks == "4 weeks 0 days", page[0].pregnancy_weeks
+        derive_ms, (low, high) = _ms(_derive_all)
+        dates = [day_to_date(FIRST_DAY + i // 1440) for i in range(args.rows)]
+        memo_ms, _ = _ms(lambda: [calculate_pregnancy_weeks(d) for d in dates])
+        connection.close_connection()
+
+    print(f"{args.rows:,} rows")
+    print(f"  change start date + first page  {change_ms:9.3f} ms")
+    print(f"  derive age of every row         {derive_ms:9.3f} ms  (days {low}..{high})")
+    print(f"  memoized weeks for every row    {memo_ms:9.3f} ms")
+    if change_ms > args.budget_ms:
+        print(f"FAIL: start date change over {args.budget_ms} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
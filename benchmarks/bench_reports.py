@@ -0,0 +1,70 @@
+"""
+Benchmark: report generation (reports.py) against a generated history
+(see benchmarks/generate.py): computing the statistics, then rendering
+the weekly report of the latest pregnancy and the monthly report of the
+whole history, as PNG files with one rendering process and with one per
+CPU, and as one PDF.
+
+    python -m benchmarks.bench_reports [--rows 100000] [--db kicks.db] [--workers N]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import connection
+import database
+import reports
+import settings
+from benchmarks import generate
+
+
+def _time(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--db", help="benchmark database; generated there if missing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the parallel runs (default: one per CPU)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "bench.db")
+        if not os.path.exists(path):
+            print(f"generating {args.rows:,} rows -> {path}")
+            generate.generate(path, args.rows)
+        with open(path + ".json") as f:
+            start = json.load(f)["pregnancy_starts"][-1]
+        connection.configure(db_path=path)
+        database.create_table()
+        settings.set_pregnancy_start_date(start)
+        end = (date.fromisoformat(start) + timedelta(weeks=41)).isoformat()
+        print(f"{database.count_records():,} rows")
+        print(f"  {'':<34} {'pages':>6} {'seconds':>8} {'pages/s':>8}")
+        for label, period, start_date, end_date in [
+                ("weekly, latest pregnancy", "week", start, end),
+                ("monthly, whole history", "month", None, None)]:
+            elapsed, stats = _time(reports.compute, start_date, end_date, period)
+            print(f"  {label + ': compute':<34} {len(stats):>6} {elapsed:8.3f}")
+            pages = len(stats) + 1
+            for fmt in ("png", "pdf"):
+                for workers in sorted({1, args.workers}) if fmt == "png" else [1]:
+                    out = os.path.join(tmp, f"{period}-{workers}")
+                    if fmt == "pdf":
+                        out += ".pdf"
+                    elapsed, _ = _time(reports.render, stats, out, fmt, workers)
+                    print(f"  {f'  {fmt}, {workers} worker(s)':<34} {pages:>6} "
+                          f"{elapsed:8.3f} {pages / elapsed:8.1f}")
+        connection.close_connection()
+
+
+if __name__ == "__main__":
+    main()
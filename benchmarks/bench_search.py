@@ -0,0 +1,69 @@
+"""
+Benchmark: database.search_records() over a large history in which a
+share of the records carry comments drawn from a small vocabulary, so
+common words match tens of thousands of rows.
+
+    python -m benchmarks.bench_search [--rows 1000000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import connection
+import database
+
+FIRST_DAY = 738886  # 2024-01-01
+PHRASES = (
+    "hiccups", "after dinner", "very active", "rolling", "light taps",
+    "strong kick", "during nap", "after breakfast", "music on",
+    "felt from outside", "lying on left side", "ate chocolate",
+)
+QUERIES = ("hiccups", "after din", "a", "strong kick", "no such word")
+
+
+def _comment(rng, share):
+    if rng.random() >= share:
+        return ""
+    return " ".join(rng.sample(PHRASES, rng.randint(1, 2)))
+
+
+def _best_ms(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--comment-share", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    last_day = FIRST_DAY + (args.rows - 1) // 1440
+    ranges = {"all": (None, None), "one day": (FIRST_DAY, FIRST_DAY),
+              "last week": (last_day - 6, last_day)}
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.configure(db_path=os.path.join(tmp, "bench.db"))
+        database.create_table()
+        database.insert_records(
+            (FIRST_DAY + i // 1440, i % 1440, 1, _comment(rng, args.comment_share), "")
+            for i in range(args.rows)
+        )
+        print(f"{args.rows:,} rows")
+        for query in QUERIES:
+            for name, (start, end) in ranges.items():
+                hits = len(database.search_records(query, start, end))
+                ms = _best_ms(lambda: database.search_records(query, start, end))
+                print(f"  {query!r:<16} {name:<10} {hits:4d} hits {ms:9.3f} ms")
+        connection.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: saving kick-counting sessions (sessions.py) as one packed
+BLOB per session versus one SQLite row per tap, in save time and in
+bytes added to the database, plus the time to summarize a session.
+
+    python -m benchmarks.bench_sessions [--taps 5000] [--sessions 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import connection
+import database
+import sessions
+from connection import transaction
+
+
+def _offsets(rng, taps):
+    # a kick every 0.2 to 90 s
+    return np.cumsum(rng.integers(200, 90000, taps))
+
+
+def _db_bytes():
+    conn = connection.get_connection()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (pages - free) * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def _blob(session_offsets, started):
+    for i, offsets in enumerate(session_offsets):
+        stats = sessions.summarize(offsets)
+        database.insert_session(started + timedelta(minutes=i), stats,
+                                sessions.encode(offsets), sessions.describe(stats))
+
+
+def _rows(session_offsets, started):
+    conn = connection.get_connection()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_taps (
+            session_id INTEGER NOT NULL,
+            offset_ms INTEGER NOT NULL,
+            PRIMARY KEY (session_id, offset_ms)
+        ) WITHOUT ROWID
+    """)
+    for i, offsets in enumerate(session_offsets):
+        with transaction() as cursor:
+            cursor.executemany("INSERT INTO session_taps VALUES (?, ?)",
+                               ((i, int(ms)) for ms in offsets))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--taps", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+    session_offsets = [_offsets(rng, args.taps) for _ in range(args.sessions)]
+    started = datetime(2025, 1, 5, 8, 0)
+
+    offsets = session_offsets[0]
+    start = time.perf_counter()
+    for _ in range(100):
+        sessions.summarize(offsets)
+    print(f"summarize, {args.taps:,} taps: {(time.perf_counter() - start) * 10:.3f} ms")
+
+    print(f"{args.sessions} sessions of {args.taps:,} taps")
+    print(f"  {'':<24} {'ms/session':>11} {'bytes/tap':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, save in (("packed BLOB", _blob), ("one row per tap", _rows)):
+            connection.configure(db_path=os.path.join(tmp, f"{save.__name__}.db"))
+            database.create_table()
+            before = _db_bytes()
+            start = time.perf_counter()
+            save(session_offsets, started)
+            elapsed = time.perf_counter() - start
+            added = _db_bytes() - before
+            print(f"  {label:<24} {elapsed * 1000 / args.sessions:11.3f} "
+                  f"{added / (args.taps * args.sessions):10.2f}")
+            connection.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency check: the Tk main loop must stay responsive while the
+background executor runs a large query.
+
+A heartbeat is scheduled every few milliseconds with after(); the gaps
+between beats are measured while get_records_between_dates() returns
+every row of a large table on the worker thread. Exits with status 1 if
+the longest gap exceeds --max-gap-ms. Needs a display (use xvfb-run on
+headless machines).
+
+    python -m benchmarks.bench_ui_latency [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+import connection
+import database
+from ui.background import get_executor
+
+HEARTBEAT_MS = 5
+FIRST_DAY = 730120  # 2000-01-01
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--max-gap-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.configure(db_path=os.path.join(tmp, "bench.db"))
+        database.create_table()
+        database.insert_records(
+            (FIRST_DAY + i // 1440, i % 1440, i % 7, "", "") for i in range(args.rows)
+        )
+
+        root = tk.Tk()
+        root.withdraw()
+        gaps = []
+        state = {"last": time.perf_counter(), "running": True}
+
+        def beat():
+            now = time.perf_counter()
+            gaps.append((now - state["last"]) * 1000)
+            state["last"] = now
+            if state["running"]:
+                root.after(HEARTBEAT_MS, beat)
+
+        def done(rows):
+            state["running"] = False
+            state["rows"] = len(rows)
+            state["elapsed"] = time.perf_counter() - started
+            root.after(50, root.quit)
+
+        root.after(HEARTBEAT_MS, beat)
+        started = time.perf_counter()
+        get_executor().submit(root, database.get_records_between_dates,
+                              FIRST_DAY, FIRST_DAY + args.rows, on_done=done)
+        root.mainloop()
+        root.destroy()
+        get_executor().shutdown()
+
+    gaps.sort()
+    worst = gaps[-1]
+    p99 = gaps[int(len(gaps) * 0.99)]
+    print(f"query returned {state['rows']:,} rows in {state['elapsed']:.2f} s")
+    print(f"heartbeats: {len(gaps)}, p99 gap {p99:.1f} ms, max gap {worst:.1f} ms")
+    if worst > args.max_gap_ms:
+        print(f"FAIL: main loop blocked for more than {args.max_gap_ms:.0f} ms")
+        return 1
+    print("OK: main loop stayed responsive")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
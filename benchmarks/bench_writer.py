@@ -0,0 +1,78 @@
+"""
+Benchmark: a burst of single-record inserts, like fast tapping during a
+counting session, committed one by one on the calling thread versus
+through the group-commit write queue (writer.py).
+
+    python -m benchmarks.bench_writer [--writes 2000] [--delay-ms 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import connection
+import database
+from writer import WriteQueue
+
+FIRST_DAY = 738886  # 2024-01-01
+
+
+def _rows(writes, offset):
+    for i in range(offset, offset + writes):
+        day, minute = divmod(i, 1440)
+        yield FIRST_DAY + day, minute, 3, ""
+
+
+def _direct(writes, offset, synchronous):
+    conn = connection.get_connection()
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    start = time.perf_counter()
+    for day, minute, kicks, comment in _rows(writes, offset):
+        database.insert_record(day, minute, kicks, comment)
+    elapsed = time.perf_counter() - start
+    conn.execute(f"PRAGMA synchronous={connection.SYNCHRONOUS}")
+    return elapsed, elapsed, writes
+
+
+def _queued(writes, offset, delay_ms, pause=0.0):
+    queue = WriteQueue(max_delay_ms=delay_ms)
+    start = time.perf_counter()
+    for row in _rows(writes, offset):
+        queue.submit(database.insert_record, *row)
+        if pause:
+            time.sleep(pause)
+    submitted = time.perf_counter() - start
+    queue.flush()
+    elapsed = time.perf_counter() - start
+    queue.close()
+    return elapsed, submitted, queue.commits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=5)
+    args = parser.parse_args()
+    n = args.writes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.configure(db_path=os.path.join(tmp, "writer.db"))
+        database.create_table()
+        runs = [
+            ("direct, synchronous=NORMAL", lambda o: _direct(n, o, "NORMAL")),
+            ("direct, synchronous=FULL", lambda o: _direct(n, o, "FULL")),
+            ("write queue, burst", lambda o: _queued(n, o, args.delay_ms)),
+            ("write queue, 1 tap/ms", lambda o: _queued(n, o, args.delay_ms, 0.001)),
+        ]
+        print(f"{n:,} single-record inserts")
+        print(f"  {'':<28} {'total s':>8} {'caller s':>9} {'writes/s':>10} {'commits':>8}")
+        for i, (label, run) in enumerate(runs):
+            elapsed, blocked, commits = run(i * n)
+            print(f"  {label:<28} {elapsed:8.3f} {blocked:9.3f} {n / elapsed:10,.0f} {commits:8,}")
+        assert database.count_records() == len(runs) * n
+        connection.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Seeded generator of realistic kick histories, written straight into a
+SQLite file through the normal insert path (triggers, rollups, search
+index and change log included).
+
+Each pregnancy is tracked from week 20 to week 40, with movement that
+grows with gestational age and peaks in the evening; pregnancies are
+about two years apart. Records per day rise with the requested size,
+and more pregnancies are added once a day is full, so 10k to 10M rows
+all come out as plausible histories. The same seed always gives the
+same database.
+
+    python -m benchmarks.generate kicks.db --rows 1000000 [--seed 1]
+"""
+import argparse
+import json
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import connection
+import database
+
+FIRST_START = date(2015, 3, 2)
+TRACKED_DAYS = 20 * 7   # week 20 to week 40
+PREGNANCY_GAP_DAYS = 730
+MIN_PREGNANCIES = 3
+MIN_PER_DAY = 4
+
+COMMENTS = (
+    "hiccups", "after dinner", "very active", "rolling", "light taps",
+    "strong kick", "during nap", "after breakfast", "music on",
+    "felt from outside", "lying on left side", "ate something sweet",
+    "quiet morning", "evening session", "after a walk",
+)
+
+# relative activity per hour of day: quiet at night, busiest in the evening
+HOURLY_ACTIVITY = np.array([
+    2, 1.5, 1, 1, 1, 1.2, 2, 3, 3.5, 3, 2.5, 2.5,
+    3, 3, 2.5, 2.5, 3, 3.5, 4, 5, 5.5, 5, 4, 3,
+])
+
+
+def plan(rows):
+    """(pregnancies, records per day) for at least `rows` records."""
+    wanted = rows * 1.1  # headroom for the day-to-day noise
+    pregnancies = MIN_PREGNANCIES
+    per_day = int(-(-wanted // (pregnancies * TRACKED_DAYS)))
+    if per_day > 1200:
+        pregnancies = int(-(-wanted // (1200 * TRACKED_DAYS)))
+        per_day = int(-(-wanted // (pregnancies * TRACKED_DAYS)))
+    return pregnancies, max(per_day, MIN_PER_DAY)
+
+
+def pregnancy_starts(pregnancies):
+    """Start dates (day 0 of week 0) of each generated pregnancy."""
+    step = timedelta(days=40 * 7 + PREGNANCY_GAP_DAYS)
+    return [FIRST_START + i * step for i in range(pregnancies)]
+
+
+def _minute_weights():
+    weights = np.repeat(HOURLY_ACTIVITY, 60)
+    return weights / weights.sum()
+
+
+def _days(rng, start, per_day, weights):
+    """
+    Yield (day, minutes, kicks, missing, comments) per tracked day of one
+    pregnancy; missing flags records without a count and comments holds
+    an index into COMMENTS, or -1.
+    """
+    first = start.toordinal() + 20 * 7
+    for offset in range(TRACKED_DAYS):
+        count = min(1440, max(1, int(rng.normal(per_day, per_day * 0.15))))
+        minutes = np.sort(rng.choice(1440, size=count, replace=False, p=weights))
+        # kicks per record grow from ~3 at week 20 to ~10 at week 40
+        mean = 3 + 7 * offset / TRACKED_DAYS
+        kicks = rng.poisson(mean * HOURLY_ACTIVITY[minutes // 60] / 3)
+        missing = rng.random(count) < 0.05
+        commented = rng.random(count) < 0.1
+        comments = rng.integers(0, len(COMMENTS), count)
+        yield first + offset, minutes, kicks, missing, np.where(commented, comments, -1)
+
+
+def _records(rng, starts, per_day, limit):
+    weights = _minute_weights()
+    produced = 0
+    for start in starts:
+        for day, minutes, kicks, missing, comments in _days(rng, start, per_day, weights):
+            added_at = f"{date.fromordinal(day).isoformat()}T21:00:00"
+            for minute, count, skip, comment in zip(
+                    minutes.tolist(), kicks.tolist(), missing.tolist(), comments.tolist()):
+                if produced == limit:
+                    return
+                yield (day, minute, None if skip else count,
+                       COMMENTS[comment] if comment >= 0 else "", added_at)
+                produced += 1
+
+
+def generate(path, rows, seed=1, chunk_size=50000, progress=None):
+    """
+    Create the database at path with `rows` records. Returns metadata
+    (row count, seed, pregnancy start dates), also saved next to the
+    database as <path>.json for benchmarks that need it.
+    """
+    pregnancies, per_day = plan(rows)
+    starts = pregnancy_starts(pregnancies)
+    rng = np.random.default_rng(seed)
+    connection.configure(db_path=path)
+    database.create_table()
+
+    chunk = []
+    inserted = 0
+    for rec in _records(rng, starts, per_day, rows):
+        chunk.append(rec)
+        if len(chunk) == chunk_size:
+            inserted += database.insert_records(chunk, bulk=True)
+            chunk = []
+            if progress is not None:
+                progress(inserted)
+    inserted += database.insert_records(chunk, bulk=True)
+    connection.close_connection()
+
+    meta = {"rows": inserted, "seed": seed, "per_day": per_day,
+            "pregnancy_starts": [d.isoformat() for d in starts]}
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def load_meta(path):
+    """The metadata generate() saved for the database at path."""
+    with open(path + ".json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    start = time.perf_counter()
+    meta = generate(args.path, args.rows, args.seed,
+                    progress=lambda n: print(f"\r{n:,} rows", end="", flush=True))
+    print(f"\r{meta['rows']:,} rows, {len(meta['pregnancy_starts'])} pregnancies "
+          f"in {time.perf_counter() - start:.1f} s -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
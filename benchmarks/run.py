@@ -0,0 +1,397 @@
+"""
+Benchmark suite: every database.py function, the chart and heatmap
+aggregation behind RecordsWindow, calculate_pregnancy_weeks in bulk and
+Treeview population, timed against a generated history (see
+benchmarks/generate.py). Results are written as JSON so two runs, e.g.
+before and after a change, can be compared.
+
+    python -m benchmarks.run --rows 100000 --out new.json [--compare old.json]
+    python -m benchmarks.run --db kicks-1m.db --rows 1000000   # reuse the file
+
+Writes are timed inside a transaction that is rolled back afterwards,
+so every repeat sees the same table. The result cache (cache.py) is off
+except in the cache suite, so repeats time the queries themselves. Treeview benchmarks need a display
+(use xvfb-run on headless machines) and are reported as skipped without
+one.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import cache
+import connection
+import database
+import importer
+import sessions
+import settings
+from benchmarks import generate
+from connection import transaction
+from models import day_to_date
+
+# functions that materialize every row are skipped above this size
+ALL_ROWS_LIMIT = 2000000
+# a benchmark slower than this is only run once more after the warm-up
+SLOW_MS = 1000
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _rolled_back(fn):
+    """fn() run inside a transaction that is always rolled back."""
+    def run():
+        try:
+            with transaction():
+                fn()
+                raise _Rollback
+        except _Rollback:
+            pass
+    return run
+
+
+def _consume(iterable):
+    for _ in iterable:
+        pass
+
+
+class Context:
+    """Facts about the benchmark database the benchmarks build on."""
+
+    def __init__(self, meta):
+        self.rows = meta["rows"]
+        conn = database.get_connection()
+        self.first_day, self.last_day = conn.execute(
+            "SELECT MIN(day), MAX(day) FROM kicks_daily").fetchone()
+        self.first_date = day_to_date(self.first_day)
+        self.last_date = day_to_date(self.last_day)
+        self.week_start = day_to_date(self.last_day - 6)
+        self.month_start = day_to_date(self.last_day - 29)
+        self.sample = database.get_records_page(
+            self.first_date, self.last_date, limit=1,
+            after=(self.last_day - 3, 720, 0))[0]
+        self.deep_key = conn.execute(
+            "SELECT day, minute, id FROM kicks ORDER BY day, minute, id LIMIT 1 OFFSET ?",
+            (self.rows // 2,)).fetchone()
+        self.free_day = self.last_day + 1  # no records there
+        self.week_ids = [rec.id for rec in database.get_records_between_dates(
+            self.week_start, self.last_date)]
+        # a 30-tap session; one is stored at a taken time, so without a record
+        offsets = [i * 45000 for i in range(30)]
+        self.taps = sessions.encode(offsets), sessions.summarize(offsets)
+        self.session_id = conn.execute("SELECT MAX(id) FROM kick_sessions").fetchone()[0]
+        if self.session_id is None:
+            taken = datetime.fromordinal(self.sample.day) + timedelta(minutes=self.sample.minute)
+            self.session_id = database.insert_session(
+                taken, self.taps[1], self.taps[0], "")[1]
+
+
+def _database_benchmarks(ctx):
+    s = ctx.sample
+    latest = database.get_change_bounds()[0]
+    free = [(ctx.free_day + i // 1440, i % 1440, 3, "", "") for i in range(1000)]
+    events = [(f"bench-{i}", day, minute, kicks, comment, added_at)
+              for i, (day, minute, kicks, comment, added_at) in enumerate(free)]
+    session_start = datetime.fromordinal(ctx.free_day).replace(hour=9)
+    blob, stats = ctx.taps
+    # raw rows as read from a file, each with a comment for the search index
+    raw = [(day_to_date(ctx.free_day + i // 1440), f"{i // 60 % 24:02d}:{i % 60:02d}", "3",
+            f"kicked after dinner {i}", "") for i in range(10000)]
+    benches = {
+        "database.get_connection": lambda: database.get_connection(),
+        "database.create_table (up to date)": database.create_table,
+        "database.insert_record": _rolled_back(
+            lambda: database.insert_record(ctx.free_day, 0, "3", "note")),
+        "database.insert_records (1000)": _rolled_back(
+            lambda: database.insert_records(free)),
+        "database.insert_records (1000, bulk)": _rolled_back(
+            lambda: database.insert_records(free, bulk=True)),
+        "importer.import_rows (10000, with comments)": _rolled_back(
+            lambda: importer.import_rows(raw)),
+        "database.ingest_records (1000, keyed)": _rolled_back(
+            lambda: database.ingest_records(events)),
+        "database.insert_session (30 taps)": _rolled_back(
+            lambda: database.insert_session(session_start, stats, blob, "")),
+        "database.get_session": lambda: database.get_session(ctx.session_id),
+        "database.record_exists": lambda: database.record_exists(s.date, s.time),
+        "database.get_records_between_dates (1 week)":
+            lambda: database.get_records_between_dates(ctx.week_start, ctx.last_date),
+        "database.get_records_page (first)":
+            lambda: database.get_records_page(descending=True),
+        "database.get_records_page (middle)":
+            lambda: database.get_records_page(after=ctx.deep_key),
+        "database.count_records (all)": lambda: database.count_records(),
+        "database.count_records (1 month)":
+            lambda: database.count_records(ctx.month_start, ctx.last_date),
+        "database.iter_export_chunks (1 month, csv)": lambda: _consume(
+            database.iter_export_chunks(ctx.month_start, ctx.last_date)),
+        "database.iter_export_chunks (1 month, jsonl)": lambda: _consume(
+            database.iter_export_chunks(ctx.month_start, ctx.last_date, as_json=True)),
+        "database.search_records (common word)":
+            lambda: database.search_records("after"),
+        "database.search_records (prefix, 1 week)":
+            lambda: database.search_records("hic", ctx.week_start, ctx.last_date),
+        "database.delete_record": _rolled_back(lambda: database.delete_record(s.id)),
+        "database.update_record": _rolled_back(lambda: database.update_record(
+            s.id, s.date, s.time, (s.kicks or 0) + 1, s.comment)),
+        "database.delete_records (1 week)": _rolled_back(
+            lambda: database.delete_records(ctx.week_ids)),
+        "database.update_records (1 week)": _rolled_back(
+            lambda: database.update_records(ctx.week_ids, comment="batch")),
+        "database.get_date_bounds": database.get_date_bounds,
+        "database.rebuild_rollups": _rolled_back(database.rebuild_rollups),
+        "database.get_daily_totals (all)": lambda: database.get_daily_totals(),
+        "database.get_hourly_totals (all)": lambda: database.get_hourly_totals(),
+        "database.get_change_bounds": database.get_change_bounds,
+        "database.get_changes_since (last 1000)":
+            lambda: database.get_changes_since(latest - 1000),
+        "database.get_change_deltas (last 1000)":
+            lambda: database.get_change_deltas(latest - 1000),
+        "database.get_hour_total": lambda: database.get_hour_total(s.day, s.minute // 60),
+        "database.get_first_day": database.get_first_day,
+        "database.load_anomaly_state": database.load_anomaly_state,
+        "database.save_anomaly_state": _rolled_back(
+            lambda: database.save_anomaly_state("{}")),
+        "database.iter_kick_columns (all)": lambda: _consume(database.iter_kick_columns()),
+    }
+    if ctx.rows <= ALL_ROWS_LIMIT:
+        benches["database.get_all_records"] = database.get_all_records
+    else:
+        benches["database.get_all_records"] = f"skipped: more than {ALL_ROWS_LIMIT:,} rows"
+    return benches
+
+
+def _cache_benchmarks(ctx):
+    def cached(fn):
+        # the warm-up call in measure() fills the cache; the rest are hits
+        def run():
+            cache.ENABLED = True
+            try:
+                fn()
+            finally:
+                cache.ENABLED = False
+        return run
+
+    return {
+        "cache hit: get_records_between_dates (1 week)": cached(
+            lambda: database.get_records_between_dates(ctx.week_start, ctx.last_date)),
+        "cache hit: count_records (1 month)": cached(
+            lambda: database.count_records(ctx.month_start, ctx.last_date)),
+        "cache hit: get_hourly_totals (today)": cached(
+            lambda: database.get_hourly_totals(ctx.last_day, ctx.last_day)),
+    }
+
+
+def _aggregation_benchmarks(ctx):
+    from columnar import KickSnapshot, get_snapshot
+    from ui.records_window import _daily_series, _hourly_matrix
+
+    get_snapshot()  # the window reuses the refreshed snapshot
+    month = (ctx.month_start, ctx.last_date)
+    return {
+        "columnar.KickSnapshot.refresh (full load)": lambda: KickSnapshot().refresh(),
+        "records_window chart series (all)": lambda: _daily_series(None),
+        "records_window chart series (1 month)": lambda: _daily_series(month),
+        "records_window heatmap matrix (all)": lambda: _hourly_matrix(None),
+        "records_window heatmap matrix (1 month)": lambda: _hourly_matrix(month),
+    }
+
+
+def _pregnancy_weeks_benchmarks(ctx):
+    import utils
+
+    dates = [day_to_date(day) for day in range(ctx.first_day, ctx.last_day + 1)]
+    # one date string per record, as a per-row loop would see them
+    per_row = [
+        day_to_date(day) for (day,) in
+        database.get_connection().execute("SELECT day FROM kicks LIMIT 1000000")
+    ]
+
+    def cold():
+        utils._weeks_for_day.cache_clear()
+        for d in dates:
+            utils.calculate_pregnancy_weeks(d)
+
+    return {
+        f"utils.calculate_pregnancy_weeks ({len(dates):,} distinct dates, cold)": cold,
+        f"utils.calculate_pregnancy_weeks ({len(per_row):,} rows, memoized)":
+            lambda: [utils.calculate_pregnancy_weeks(d) for d in per_row],
+    }
+
+
+def _treeview_benchmarks(ctx):
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:  # no display, or Tk missing
+        reason = f"skipped: {e}".splitlines()[0]
+        return {name: reason for name in (
+            "Treeview insert (200 rows)", "Treeview insert (1000 rows)",
+            "PagedTable.show (200 rows)")}
+    from ui.paged_table import PagedTable
+
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=tuple(range(7)), show="headings")
+    tree.pack()
+    table = PagedTable(tree, ttk.Scrollbar(root))
+    page = database.get_records_page(descending=True, limit=1000)
+
+    def fill(count):
+        def run():
+            tree.delete(*tree.get_children())
+            for rec in page[:count]:
+                tree.insert("", "end", values=rec.display_values())
+            root.update_idletasks()
+        return run
+
+    def show():
+        table.show(page[:200])
+        root.update_idletasks()
+
+    return {
+        "Treeview insert (200 rows)": fill(200),
+        "Treeview insert (1000 rows)": fill(1000),
+        "PagedTable.show (200 rows)": show,
+    }
+
+
+SUITES = (
+    _database_benchmarks,
+    _cache_benchmarks,
+    _aggregation_benchmarks,
+    _pregnancy_weeks_benchmarks,
+    _treeview_benchmarks,
+)
+
+
+def measure(fn, repeat):
+    """Time fn() after one warm-up call; returns a result dict in ms."""
+    start = time.perf_counter()
+    fn()
+    if (time.perf_counter() - start) * 1000 > SLOW_MS:
+        repeat = 1
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"best_ms": min(times), "median_ms": statistics.median(times), "runs": repeat}
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(meta, repeat=5, only=None):
+    """Run all suites against the configured database; returns the report."""
+    settings.set_pregnancy_start_date(meta["pregnancy_starts"][-1])
+    cache.ENABLED = False
+    ctx = Context(meta)
+    results = {}
+    for suite in SUITES:
+        for name, fn in suite(ctx).items():
+            if only and only not in name:
+                continue
+            if isinstance(fn, str):
+                results[name] = {"skipped": fn}
+            else:
+                results[name] = measure(fn, repeat)
+            _print(name, results[name])
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "rows": meta["rows"],
+            "seed": meta["seed"],
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _print(name, result):
+    if "skipped" in result:
+        print(f"  {name:<58} {result['skipped']}")
+    else:
+        print(f"  {name:<58} {result['best_ms']:10.3f} ms")
+
+
+def compare(report, baseline, threshold=1.2):
+    """Print each result against a baseline report; returns the regressions."""
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta']['rows']:,} rows)")
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if not old or "best_ms" not in old or "best_ms" not in result:
+            continue
+        ratio = result["best_ms"] / max(old["best_ms"], 1e-6)
+        mark = ""
+        if ratio > threshold:
+            mark = "  << slower"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            mark = "  faster"
+        print(f"  {name:<58} {old['best_ms']:10.3f} -> {result['best_ms']:10.3f} ms"
+              f"  x{ratio:5.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="size of the generated history (default: 100000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="benchmark database; generated there if missing")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="run benchmarks whose name contains this")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON report to compare with")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if anything got >20%% slower")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "bench.db")
+        if os.path.exists(path):
+            meta = generate.load_meta(path)
+        else:
+            print(f"generating {args.rows:,} rows (seed {args.seed}) -> {path}")
+            meta = generate.generate(path, args.rows, args.seed)
+        connection.configure(db_path=path)
+        database.create_table()
+        print(f"{meta['rows']:,} rows")
+        report = run(meta, args.repeat, args.only)
+        connection.close_connection()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f))
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
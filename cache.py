@@ -0,0 +1,203 @@
+"""
+Result cache for the read functions in database.py.
+
+Functions decorated with @cached keep their results keyed on the
+function, its arguments and the pregnancy start date, evicted least
+recently used first within MAX_ENTRIES and a MAX_BYTES budget. Each
+entry remembers the day range it covers (its start_date/end_date
+arguments, or everything).
+
+The write generation is the kicks_changes log: triggers add an entry,
+with the old and new day, for every insert, update or delete, whichever
+connection or process made it. Every cached read first looks up the
+latest seq (one seek on the primary key). If it moved, only the entries
+whose range contains a changed day are dropped. Reads inside a
+transaction bypass the cache, since their snapshot may be older than
+what is cached. Switching to another database file (connection.configure)
+drops everything, and so does archiving or unarchiving (archive.py),
+which can change what a read returns without logging a change.
+"""
+import functools
+import inspect
+import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+import connection
+from models import parse_date
+from settings import get_pregnancy_start_ordinal
+
+MAX_ENTRIES = 512
+MAX_BYTES = 32 * 2**20
+# more changed days than this since the last read: clear everything
+MAX_CHANGED_DAYS = 1000
+
+ENABLED = True
+
+_ALL_DAYS = (-1, 1 << 62)
+
+
+def _size(value):
+    """Rough memory footprint of a result: containers, rows and fields."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            size += sys.getsizeof(item)
+            if isinstance(item, tuple):
+                size += sum(sys.getsizeof(field) for field in item)
+    return size
+
+
+class ResultCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, first day, last day, size), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._seq = None
+        self._db_path = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidated = self.evicted = 0
+
+    def stats(self):
+        looked_up = self.hits + self.misses
+        return {
+            "entries": len(self._entries), "bytes": self._bytes,
+            "hits": self.hits, "misses": self.misses,
+            "hit_ratio": self.hits / looked_up if looked_up else 0.0,
+            "invalidated": self.invalidated, "evicted": self.evicted,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._seq = None
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[3]
+
+    def sync(self, conn):
+        """
+        Drop the entries made stale by changes logged since the last call.
+        Returns the latest seq, to be passed on to put().
+        """
+        with self._lock:
+            if self._db_path != connection.DB_PATH:
+                # entries and seq are from another database file
+                self.invalidated += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                self._seq = None
+                self._db_path = connection.DB_PATH
+            latest, oldest = conn.execute("""
+                SELECT COALESCE((SELECT MAX(seq) FROM kicks_changes), 0),
+                       (SELECT MIN(seq) FROM kicks_changes)
+            """).fetchone()
+            if latest == self._seq:
+                return latest
+            changed = None
+            if self._seq is not None and latest > self._seq and oldest <= self._seq + 1:
+                changed = set()
+                for old_day, day in conn.execute(
+                        "SELECT old_day, day FROM kicks_changes WHERE seq > ?", (self._seq,)):
+                    changed.update((old_day, day))
+                    if len(changed) > MAX_CHANGED_DAYS:
+                        changed = None
+                        break
+            if changed is None:
+                self.invalidated += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                changed.discard(None)
+                days = sorted(changed)
+                for key, (_, first, last, _) in list(self._entries.items()):
+                    i = bisect_left(days, first)
+                    if i < len(days) and days[i] <= last:
+                        self._drop(key)
+                        self.invalidated += 1
+            self._seq = latest
+            return latest
+
+    def get(self, key):
+        """(True, value) for a cached key, else (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value, first, last, seq):
+        """Cache value, read after sync() returned seq, unless it is already stale."""
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if seq != self._seq:
+                # another reader saw newer changes meanwhile; whether they
+                # touch this range is unknown
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, first, last, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evicted += 1
+
+
+_cache = ResultCache()
+
+
+def _day_bounds(signature, args, kwargs):
+    bound = signature.bind(*args, **kwargs).arguments
+    if "start_date" not in signature.parameters:
+        return _ALL_DAYS
+    start, end = bound.get("start_date"), bound.get("end_date")
+    return (
+        parse_date(start) if start is not None else _ALL_DAYS[0],
+        parse_date(end) if end is not None else _ALL_DAYS[1],
+    )
+
+
+def cached(fn):
+    """
+    Decorator for a database.py read function. The range a result covers
+    comes from the function's start_date/end_date parameters, if it has
+    them. List results are handed out as copies, so callers may modify
+    them.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def read(*args, **kwargs):
+        conn = connection.get_connection()
+        if not ENABLED or conn.in_transaction:
+            return fn(*args, **kwargs)
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())),
+               get_pregnancy_start_ordinal())
+        seq = _cache.sync(conn)
+        try:
+            hit, value = _cache.get(key)
+        except TypeError:  # unhashable arguments
+            return fn(*args, **kwargs)
+        if not hit:
+            value = fn(*args, **kwargs)
+            _cache.put(key, value, *_day_bounds(signature, args, kwargs), seq)
+        return list(value) if isinstance(value, list) else value
+    return read
+
+
+def stats():
+    """Hit/miss counts, size and invalidations of the shared cache."""
+    return _cache.stats()
+
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,213 @@
+"""
+Headless command line tools for Baby Kicks Tracker.
+
+    python cli.py import records.csv more.jsonl
+    python cli.py export records.csv.gz --from 2025-01-01
+    python cli.py rebuild-rollups
+    python cli.py serve --port 8765
+    python cli.py backup --keep-daily 7 --keep-weekly 4
+    python cli.py restore backups/baby_kicks-20250105-211500-042.db
+    python cli.py report pregnancy.pdf --period week
+    python cli.py archive 2023-01-09 2023-10-20
+"""
+import argparse
+import sys
+import connection
+import database
+
+
+def cmd_import(args):
+    """Stream CSV / JSON Lines files into the database."""
+    import importer
+
+    for path in args.files:
+        result = importer.import_file(path, fmt=args.format, chunk_size=args.chunk_size)
+        print(
+            f"{path}: read {result.read}, inserted {result.inserted}, "
+            f"duplicates {result.duplicates}, invalid {result.invalid}"
+        )
+
+
+def cmd_export(args):
+    """Stream records into a CSV / JSON Lines file."""
+    import export
+
+    count = export.export_file(args.path, fmt=args.format, start_date=args.start,
+                               end_date=args.end, compress=args.gzip or None)
+    print(f"{args.path}: exported {count} records")
+
+
+def cmd_rebuild_rollups(args):
+    """Recompute the daily/hourly rollup tables from the raw records."""
+    database.rebuild_rollups()
+    print("Rollups rebuilt.")
+
+
+def cmd_serve(args):
+    """Run the HTTP ingestion API (see server.py) until interrupted."""
+    import server
+
+    server.serve(args.host, args.port)
+
+
+def cmd_backup(args):
+    """Make an online backup, check it, and rotate old ones."""
+    import backup
+
+    path = backup.backup(args.dir)
+    print(f"Backed up to {path} (integrity check ok)")
+    if not args.no_rotate:
+        for old in backup.rotate(args.dir, args.keep_daily, args.keep_weekly):
+            print(f"Removed {old}")
+
+
+def cmd_restore(args):
+    """Replace the database with a checked backup."""
+    import backup
+
+    saved = backup.restore(args.path, args.dir)
+    print(f"Restored {args.path}; the previous contents were saved to {saved}")
+
+
+def cmd_report(args):
+    """Render weekly or monthly reports as PNG files or one PDF."""
+    import reports
+
+    paths = reports.build(args.out, args.period, args.format, args.start, args.end,
+                          args.workers)
+    print(f"Wrote {len(paths)} file(s)" if len(paths) > 1 else f"Wrote {paths[0]}")
+
+
+def cmd_archive(args):
+    """Move a completed pregnancy's records into an archive file."""
+    import archive
+
+    path, records = archive.archive_range(args.start, args.end, args.dir)
+    print(f"Archived {records} records to {path}")
+    if args.vacuum:
+        database.get_connection().execute("VACUUM")
+        print("Database compacted.")
+
+
+def cmd_archives(args):
+    """List the registered archives."""
+    import archive
+    from models import day_to_date
+
+    entries = archive.list_archives()
+    for _, path, first, last, records, start in entries:
+        print(f"{path}: {records} records, {day_to_date(first)} – {day_to_date(last)} "
+              f"(pregnancy started {day_to_date(start)})")
+    if not entries:
+        print("No archives.")
+
+
+def cmd_unarchive(args):
+    """Move an archive's records back into the database."""
+    import archive
+
+    restored, skipped = archive.unarchive(args.path)
+    print(f"Restored {restored} records from {args.path}"
+          + (f"; skipped {skipped} whose date and time were taken, kept the file"
+             if skipped else ""))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Baby Kicks Tracker command line tools."
+    )
+    parser.add_argument("--db", help=f"database file (default: {connection.DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="import records from CSV or JSON Lines files")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--format", choices=("csv", "jsonl"),
+                   help="input format (default: guessed from the file extension)")
+    p.add_argument("--chunk-size", type=int, default=10000,
+                   help="rows per transaction (default: 10000)")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="export records to a CSV or JSON Lines file")
+    p.add_argument("path", help="output file; a .gz suffix compresses it")
+    p.add_argument("--format", choices=("csv", "jsonl"),
+                   help="output format (default: guessed from the file extension)")
+    p.add_argument("--from", dest="start", metavar="YYYY-MM-DD",
+                   help="first date to export (default: the earliest record)")
+    p.add_argument("--to", dest="end", metavar="YYYY-MM-DD",
+                   help="last date to export (default: the latest record)")
+    p.add_argument("--gzip", action="store_true",
+                   help="gzip the output even without a .gz suffix")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("rebuild-rollups",
+                       help="recompute the daily/hourly chart rollups from the raw records")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("serve", help="accept kicks from companion devices over HTTP/JSON")
+    p.add_argument("--host", default="127.0.0.1",
+                   help="address to listen on (default: 127.0.0.1, this machine only)")
+    p.add_argument("--port", type=int, default=8765, help="port (default: 8765)")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("backup", help="back up the database without stopping the app")
+    p.add_argument("--dir", default="backups",
+                   help="backup directory, relative to the database (default: backups)")
+    p.add_argument("--keep-daily", type=int, default=7,
+                   help="keep the newest backup of this many days (default: 7)")
+    p.add_argument("--keep-weekly", type=int, default=4,
+                   help="keep the newest backup of this many weeks (default: 4)")
+    p.add_argument("--no-rotate", action="store_true", help="keep all old backups")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("restore", help="replace the database with a backup (close the app first)")
+    p.add_argument("path", help="backup file to restore")
+    p.add_argument("--dir", default="backups",
+                   help="where the current contents are saved first, relative to the "
+                        "database (default: backups)")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("report", help="render weekly or monthly reports without the GUI")
+    p.add_argument("out", help="PDF file, or directory for one PNG per page")
+    p.add_argument("--period", choices=("week", "month"), default="week",
+                   help="one page per gestational week or calendar month (default: week)")
+    p.add_argument("--format", choices=("png", "pdf"),
+                   help="output format (default: pdf for a .pdf path, else png)")
+    p.add_argument("--from", dest="start", metavar="YYYY-MM-DD",
+                   help="first date to report (default: the earliest record)")
+    p.add_argument("--to", dest="end", metavar="YYYY-MM-DD",
+                   help="last date to report (default: the latest record)")
+    p.add_argument("--workers", type=int,
+                   help="rendering processes (default: one per CPU)")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("archive",
+                       help="move a completed pregnancy's records into an archive file")
+    p.add_argument("start", metavar="FROM", help="the pregnancy's start date, YYYY-MM-DD")
+    p.add_argument("end", metavar="TO", help="last date to archive, YYYY-MM-DD")
+    p.add_argument("--dir", default="archives",
+                   help="archive directory, relative to the database (default: archives)")
+    p.add_argument("--vacuum", action="store_true",
+                   help="compact the database afterwards (close the app first)")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("archives", help="list archived pregnancies")
+    p.set_defaults(func=cmd_archives)
+
+    p = sub.add_parser("unarchive", help="move an archive's records back into the database")
+    p.add_argument("path", help="archive file")
+    p.set_defaults(func=cmd_unarchive)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        connection.configure(db_path=args.db)
+    database.create_table()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
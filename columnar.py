@@ -0,0 +1,185 @@
+"""
+Columnar NumPy snapshot of the kicks table for vectorized analytics.
+
+The snapshot holds one compact structured array (id, day, minute, count)
+loaded straight from a DB cursor. Aggregations are np.bincount calls
+instead of Python loops over rows. refresh() catches up incrementally
+from the kicks_changes log rather than reloading everything.
+"""
+import threading
+import numpy as np
+import database
+from connection import transaction
+
+RECORD_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("day", np.int32),      # date.toordinal()
+    ("minute", np.int16),   # minute of the day
+    ("count", np.int32),    # effective kick count
+])
+
+# reload from scratch when more than this share of rows changed
+FULL_RELOAD_RATIO = 0.25
+
+
+class KickSnapshot:
+    """In-memory column store of all kick records, kept in sync with the DB."""
+
+    def __init__(self):
+        self.data = np.empty(0, dtype=RECORD_DTYPE)
+        self.seq = None  # last kicks_changes entry applied
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Bring the snapshot up to date with the database; returns self."""
+        with self._lock, transaction(mode="DEFERRED"):
+            latest, oldest = database.get_change_bounds()
+            if self.seq is None or (oldest is not None and oldest > self.seq + 1):
+                self._load(latest)
+            elif latest > self.seq:
+                changes = database.get_changes_since(self.seq)
+                if len(changes) > len(self.data) * FULL_RELOAD_RATIO + 1000:
+                    self._load(latest)
+                else:
+                    self._apply(changes)
+                    self.seq = latest
+        return self
+
+    def _load(self, seq):
+        self.data = np.fromiter(database.iter_kick_columns(), dtype=RECORD_DTYPE)
+        self.seq = seq
+
+    def _apply(self, changes):
+        # only the last change per record matters
+        final = {}
+        for _, record_id, day, minute, count in changes:
+            final[record_id] = (day, minute, count)
+        ids = np.fromiter(final, dtype=np.int64, count=len(final))
+        keep = self.data[~np.isin(self.data["id"], ids)]
+        added = np.array(
+            [(rid, day, minute, count)
+             for rid, (day, minute, count) in final.items() if day is not None],
+            dtype=RECORD_DTYPE,
+        )
+        self.data = np.concatenate((keep, added))
+
+    def select(self, start_day=None, end_day=None):
+        """Rows with start_day <= day <= end_day (either bound optional)."""
+        data = self.data
+        if start_day is not None:
+            data = data[data["day"] >= start_day]
+        if end_day is not None:
+            data = data[data["day"] <= end_day]
+        return data
+
+    def daily_totals(self, start_day=None, end_day=None):
+        """
+        (days, totals): ascending day ordinals that have records and the
+        total kicks on each.
+        """
+        rows = self.select(start_day, end_day)
+        if not len(rows):
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        first = int(rows["day"].min())
+        offset = rows["day"] - first
+        totals = np.bincount(offset, weights=rows["count"]).astype(np.int64)
+        present = np.bincount(offset) > 0
+        return np.flatnonzero(present) + first, totals[present]
+
+    def hourly_matrix(self, start_day=None, end_day=None):
+        """
+        (days, matrix): ascending day ordinals that have records and a
+        24 x len(days) matrix of kicks per hour of day.
+        """
+        rows = self.select(start_day, end_day)
+        if not len(rows):
+            return np.empty(0, np.int64), np.zeros((24, 0), np.int64)
+        first = int(rows["day"].min())
+        span = int(rows["day"].max()) - first + 1
+        offset = rows["day"] - first
+        cell = offset * 24 + rows["minute"] // 60
+        grid = np.bincount(cell, weights=rows["count"], minlength=span * 24)
+        grid = grid.astype(np.int64).reshape(span, 24)
+        present = np.bincount(offset, minlength=span) > 0
+        return np.flatnonzero(present) + first, grid[present].T
+
+
+def daily_from_rollup(rows):
+    """KickSnapshot.daily_totals() output for database.get_daily_totals() rows."""
+    rows = np.array(rows, dtype=np.int64).reshape(-1, 2)
+    return rows[:, 0], rows[:, 1]
+
+
+def hourly_from_rollup(rows):
+    """KickSnapshot.hourly_matrix() output for database.get_hourly_totals() rows."""
+    rows = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    days, column = np.unique(rows[:, 0], return_inverse=True)
+    matrix = np.zeros((24, len(days)), np.int64)
+    matrix[rows[:, 1], column] = rows[:, 2]
+    return days, matrix
+
+
+# ordinal of 1970-01-01, the numpy datetime64 epoch
+_EPOCH_ORDINAL = 719163
+
+# level of detail: the widest range (in days) still shown per bin width
+BIN_LIMITS = (("day", 120), ("week", 7 * 104))
+
+
+def choose_bin(first_day, last_day):
+    """'day', 'week' or 'month' so a range never draws more than ~120 bins."""
+    span = last_day - first_day + 1
+    for width, limit in BIN_LIMITS:
+        if span <= limit:
+            return width
+    return "month"
+
+
+def bin_edges(days, width):
+    """
+    Start ordinal of the day/week/month bin each day falls in. Weeks start
+    on Monday (ordinal 1 is a Monday).
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if width == "day":
+        return days
+    if width == "week":
+        return days - (days - 1) % 7
+    months = (days - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+    return months.astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+
+
+def bin_end(starts, width):
+    """Ordinal just past the end of each bin starting at starts."""
+    starts = np.asarray(starts, dtype=np.int64)
+    if width == "day":
+        return starts + 1
+    if width == "week":
+        return starts + 7
+    months = (starts - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+    return (months + 1).astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+
+
+def rebin(days, values, width):
+    """
+    Sum per-day values into day/week/month bins. values is 1-D, or 2-D
+    with days along the last axis. Returns (bin_starts, binned).
+    """
+    if width == "day":
+        return np.asarray(days), values
+    starts, inverse = np.unique(bin_edges(days, width), return_inverse=True)
+    values = np.asarray(values)
+    out = np.zeros(values.shape[:-1] + (len(starts),), dtype=values.dtype)
+    np.add.at(out.T, inverse, values.T)
+    return starts, out
+
+
+_snapshot = None
+
+
+def get_snapshot():
+    """The shared, refreshed snapshot."""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = KickSnapshot()
+    return _snapshot.refresh()
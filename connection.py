@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = "baby_kicks.db"
+
+# PRAGMA synchronous level used for every connection. With WAL journaling
+# "NORMAL" only fsyncs on checkpoints, which is safe against application
+# crashes and much cheaper than "FULL" on every commit.
+SYNCHRONOUS = "NORMAL"
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# statement callback installed on every connection (see instrumentation.py)
+TRACE_CALLBACK = None
+
+_local = threading.local()
+
+
+def configure(db_path=None, synchronous=None):
+    """
+    Change the database path and/or synchronous level.
+    Connections opened by the calling thread are closed so the next call
+    to get_connection() picks up the new settings; other threads should
+    call close_connection() themselves.
+    """
+    global DB_PATH, SYNCHRONOUS
+    if synchronous is not None:
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown synchronous level: {synchronous}")
+        SYNCHRONOUS = synchronous
+    if db_path is not None:
+        DB_PATH = db_path
+    close_connection()
+
+
+def set_trace_callback(callback):
+    """
+    Call callback(sql) for every statement on all connections, or stop
+    with None. Each thread's connection picks it up on its next use.
+    """
+    global TRACE_CALLBACK
+    TRACE_CALLBACK = callback
+
+
+def _open(db_path):
+    # isolation_level=None: we issue BEGIN/COMMIT ourselves in transaction()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def get_connection():
+    """
+    Return the long-lived connection of the calling thread, opening it on
+    first use. SQLite connections must not be shared between threads, so
+    every thread gets its own.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _open(DB_PATH)
+        _local.conn = conn
+        _local.path = DB_PATH
+        _local.depth = 0
+        _local.trace = None
+    if _local.trace is not TRACE_CALLBACK:
+        conn.set_trace_callback(TRACE_CALLBACK)
+        _local.trace = TRACE_CALLBACK
+    return conn
+
+
+def close_connection():
+    """Close the calling thread's connection, if any."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+        _local.depth = 0
+
+
+@contextmanager
+def transaction(mode="IMMEDIATE"):
+    """
+    Run a block inside one transaction and yield a cursor.
+    Commits on success and rolls back on error. Nested blocks become
+    savepoints, so an inner failure only undoes the inner block.
+    Use mode="DEFERRED" for a read-only block that needs one consistent
+    snapshot without taking the write lock.
+    """
+    conn = get_connection()
+    depth = _local.depth
+    name = f"sp{depth}"
+    if depth == 0:
+        conn.execute(f"BEGIN {mode}")
+    else:
+        conn.execute(f"SAVEPOINT {name}")
+    _local.depth = depth + 1
+    cursor = conn.cursor()
+    try:
+        yield cursor
+    except BaseException:
+        _local.depth = depth
+        if depth == 0:
+            conn.execute("ROLLBACK")
+        else:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+        raise
+    else:
+        _local.depth = depth
+        if depth == 0:
+            conn.execute("COMMIT")
+        else:
+            conn.execute(f"RELEASE {name}")
+    finally:
+        cursor.close()
@@ -1,133 +1,651 @@
+import re
 import sqlite3
 from datetime import datetime
+from itertools import islice
+import archive
+import connection
+import migrations
+import cache
+from cache import cached
+from connection import transaction
+from models import (
+    KickRecord, day_to_date, normalize_record, parse_date, parse_kicks, parse_time,
+)
+from settings import get_pregnancy_start_ordinal
 
-DB_PATH = "baby_kicks.db"
+# column list matching models.KickRecord; gestational_days is derived from
+# the current pregnancy start date, so changing it never rewrites rows
+RECORD_COLUMNS = "id, day, minute, kicks, comment, {gestation} AS gestational_days, added_at"
+
+def _start_day(source):
+    """
+    SQL for the pregnancy start ordinal of rows read from source, or None.
+    Archived rows (see archive.py) keep the start of their own pregnancy.
+    """
+    start = get_pregnancy_start_ordinal()
+    current = None if start is None else f"{start:d}"
+    if source == "kicks":
+        return current
+    return f"COALESCE(start_day, {current or 'NULL'})"
+
+def _record_columns(source="kicks"):
+    start = _start_day(source)
+    return RECORD_COLUMNS.format(
+        gestation="NULL" if start is None else f"day - {start}"
+    )
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    """
+    Return the calling thread's persistent connection (see connection.py).
+    """
+    return connection.get_connection()
 
 def create_table():
     """
-    Ensure the main table exists, and add missing columns if needed.
+    Bring the schema up to date (see migrations.py).
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # create base table if not exists
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS kicks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        time TEXT NOT NULL,
-        kicks TEXT,
-        comment TEXT
-    )
-    """)
+    migrations.migrate()
 
-    # get existing columns
-    cursor.execute("PRAGMA table_info(kicks)")
-    existing = {row[1] for row in cursor.fetchall()}
+def _check_not_archived(cursor, day):
+    """Raise archive.ArchiveError if an archive holds day's date range."""
+    row = cursor.execute(
+        "SELECT path FROM archives WHERE ? BETWEEN first_day AND last_day", (day,)
+    ).fetchone()
+    if row:
+        raise archive.ArchiveError(
+            f"{day_to_date(day)} is in the archive {row[0]}; unarchive it to change records there."
+        )
 
-    # add pregnancy_weeks column if missing
-    if "pregnancy_weeks" not in existing:
-        cursor.execute("ALTER TABLE kicks ADD COLUMN pregnancy_weeks TEXT")
+def insert_record(date, time, kicks, comment, added_at=None):
+    """
+    Insert a new record with all fields and return it as a KickRecord.
+    Raises ValueError if date, time or kicks cannot be parsed, and
+    archive.ArchiveError if the date is in an archived range.
+    """
+    day, minute, kicks, comment = normalize_record(date, time, kicks, comment)
+    if added_at is None:
+        added_at = datetime.now().isoformat(timespec='seconds')
 
-    # add added_at column if missing
-    if "added_at" not in existing:
-        cursor.execute("ALTER TABLE kicks ADD COLUMN added_at TEXT")
+    with transaction() as cursor:
+        _check_not_archived(cursor, day)
+        cursor.execute(f"""
+        INSERT INTO kicks
+          (day, minute, kicks, comment, added_at)
+        VALUES (?, ?, ?, ?, ?)
+        RETURNING {_record_columns()}
+        """, (day, minute, kicks, comment, added_at))
+        return KickRecord._make(cursor.fetchone())
 
-    conn.commit()
-    conn.close()
+def insert_records(rows, bulk=False):
+    """
+    Insert many (day, minute, kicks, comment, added_at) tuples, already
+    normalized with models.normalize_record, in a single transaction.
+    Rows whose day+minute already exist, or whose day is archived, are
+    skipped. Returns the number of rows actually inserted.
 
-def insert_record(date, time, kicks, comment, pregnancy_weeks, added_at=None):
+    With bulk=True the comments go into the search index (kicks_fts) in
+    one statement after the rows, with its insert trigger dropped
+    meanwhile, instead of row by row: several times faster for a chunk of
+    thousands. Both happen in the same transaction.
     """
-    Insert a new record with all fields.
+    with transaction() as cursor:
+        trigger = bulk and cursor.execute("""
+            SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'kicks_fts_insert'
+        """).fetchone()
+        if trigger:
+            # ids only grow (AUTOINCREMENT): the new rows are those past it
+            last = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM kicks").fetchone()[0]
+            cursor.execute("DROP TRIGGER kicks_fts_insert")
+        cursor.executemany("""
+        INSERT OR IGNORE INTO kicks
+          (day, minute, kicks, comment, added_at)
+        VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        inserted = max(cursor.rowcount, 0)
+        if trigger:
+            cursor.execute(trigger[0])
+            cursor.execute("""
+            INSERT INTO kicks_fts (rowid, comment)
+            SELECT id, comment FROM kicks WHERE id > ? AND comment <> ''
+            """, (last,))
+        return inserted
+
+def ingest_records(events):
     """
-    if added_at is None:
-        added_at = datetime.now().isoformat(timespec='seconds')
+    Store (key, day, minute, kicks, comment, added_at) events, already
+    normalized, in a single transaction; key is an idempotency key or
+    None. Returns one (status, record_id) per event, in order:
+      created   inserted as record_id
+      replayed  key seen before; record_id is the record it created
+      exists    another record (record_id) already has that date+time
+      archived  the date is in an archived range; record_id is None
+    """
+    results = []
+    now = datetime.now().isoformat(timespec='seconds')
+    with transaction() as cursor:
+        for key, day, minute, kicks, comment, added_at in events:
+            if key is not None:
+                row = cursor.execute(
+                    "SELECT record_id FROM ingest_keys WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    results.append(("replayed", row[0]))
+                    continue
+            row = cursor.execute("""
+                INSERT INTO kicks (day, minute, kicks, comment, added_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (day, minute) DO NOTHING
+                RETURNING id
+            """, (day, minute, kicks, comment, added_at)).fetchone()
+            if row is None:
+                # skipped: taken, or archived (see migrations._guard_archived_days)
+                row = cursor.execute(
+                    "SELECT id FROM kicks WHERE day = ? AND minute = ?", (day, minute)
+                ).fetchone()
+                results.append(("exists", row[0]) if row else ("archived", None))
+                continue
+            if key is not None:
+                cursor.execute(
+                    "INSERT INTO ingest_keys (key, record_id, created_at) VALUES (?, ?, ?)",
+                    (key, row[0], now),
+                )
+            results.append(("created", row[0]))
+    return results
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-    INSERT INTO kicks
-      (date, time, kicks, comment, pregnancy_weeks, added_at)
-    VALUES (?, ?, ?, ?, ?, ?)
-    """, (date, time, kicks, comment, pregnancy_weeks, added_at))
-    conn.commit()
-    conn.close()
+def insert_session(started_at, stats, tap_deltas, comment):
+    """
+    Store a kick-counting session (see sessions.py): its taps as the
+    packed tap_deltas BLOB, and a record at its start time with the
+    number of taps as the kick count. If that date and time already has
+    a record, or is archived, the session is kept without one. Returns (KickRecord or
+    None, session id).
+    """
+    day, minute = started_at.toordinal(), started_at.hour * 60 + started_at.minute
+    with transaction() as cursor:
+        row = cursor.execute(f"""
+            INSERT INTO kicks (day, minute, kicks, comment, added_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (day, minute) DO NOTHING
+            RETURNING {_record_columns()}
+        """, (day, minute, stats["taps"], comment,
+              datetime.now().isoformat(timespec='seconds'))).fetchone()
+        record = KickRecord._make(row) if row else None
+        cursor.execute("""
+            INSERT INTO kick_sessions
+              (record_id, started_at, duration_ms, taps, time_to_target_ms, tap_deltas)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (record and record.id, started_at.isoformat(timespec='milliseconds'),
+              stats["duration_ms"], stats["taps"], stats["time_to_target_ms"], tap_deltas))
+        return record, cursor.lastrowid
+
+def get_session(session_id):
+    """(started_at, record_id, tap_deltas) of a stored session, or None."""
+    return get_connection().execute(
+        "SELECT started_at, record_id, tap_deltas FROM kick_sessions WHERE id = ?",
+        (session_id,)
+    ).fetchone()
 
 def record_exists(date, time):
     """
-    Check if a record for given date+time already exists.
+    Check if a record for given date+time already exists, archived or not.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT 1 FROM kicks WHERE date = ? AND time = ? LIMIT 1",
-        (date, time)
+    day = parse_date(date)
+    cursor = get_connection().execute(
+        f"SELECT 1 FROM {archive.source('kicks', day, day)} WHERE day = ? AND minute = ? LIMIT 1",
+        (day, parse_time(time))
     )
-    exists = cursor.fetchone() is not None
-    conn.close()
-    return exists
+    return cursor.fetchone() is not None
 
+@cached
 def get_all_records():
     """
-    Return all records ordered by date/time desc.
+    Return all records (as KickRecord) ordered by date/time desc.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, date, time, kicks, comment, pregnancy_weeks, added_at
-          FROM kicks
-         ORDER BY date DESC, time DESC
+    source = archive.source("kicks")
+    cursor = get_connection().execute(f"""
+        SELECT {_record_columns(source)}
+          FROM {source}
+         ORDER BY day DESC, minute DESC
     """)
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return list(map(KickRecord._make, cursor))
 
+@cached
 def get_records_between_dates(start_date, end_date):
     """
-    Return records where date is between start_date and end_date inclusive.
+    Return records (as KickRecord) where date is between start_date and
+    end_date inclusive.
+    """
+    lo, hi = parse_date(start_date), parse_date(end_date)
+    source = archive.source("kicks", lo, hi)
+    cursor = get_connection().execute(f"""
+        SELECT {_record_columns(source)}
+          FROM {source}
+         WHERE day BETWEEN ? AND ?
+      ORDER BY day ASC, minute ASC
+    """, (lo, hi))
+    return list(map(KickRecord._make, cursor))
+
+def _day_range(start_date, end_date):
+    """Ordinal bounds for optional start/end dates (None = open ended)."""
+    return (
+        parse_date(start_date) if start_date is not None else -1,
+        parse_date(end_date) if end_date is not None else 1 << 62,
+    )
+
+@cached
+def get_records_page(start_date=None, end_date=None, after=None,
+                     limit=200, descending=False):
+    """
+    Return up to `limit` records (as KickRecord) in (day, minute, id)
+    order, or the reverse if descending, optionally limited to a date
+    range. `after` is the (day, minute, id) key of the last record
+    already seen; the page starts strictly after it in the same order.
+    Pages are seeks on the (day, minute) index, so any page costs the
+    same no matter how deep into the table it is.
+    """
+    lo, hi = _day_range(start_date, end_date)
+    op, order = ("<", "DESC") if descending else (">", "ASC")
+    where = "day BETWEEN ? AND ?"
+    params = [lo, hi]
+    if after is not None:
+        where += f" AND (day, minute, id) {op} (?, ?, ?)"
+        params.extend(after)
+    params.append(limit)
+    source = archive.source("kicks", lo, hi)
+    cursor = get_connection().execute(f"""
+        SELECT {_record_columns(source)}
+          FROM {source}
+         WHERE {where}
+      ORDER BY day {order}, minute {order}, id {order}
+         LIMIT ?
+    """, params)
+    return list(map(KickRecord._make, cursor))
+
+@cached
+def count_records(start_date=None, end_date=None):
+    """
+    Number of records in an optional date range, summed from the daily
+    rollup rather than counted row by row.
     """
+    lo, hi = _day_range(start_date, end_date)
+    cursor = get_connection().execute(f"""
+        SELECT COALESCE(SUM(records), 0)
+          FROM {archive.source("kicks_daily", lo, hi)}
+         WHERE day BETWEEN ? AND ?
+    """, (lo, hi))
+    return cursor.fetchone()[0]
+
+# exported columns, in file order (see export.py)
+EXPORT_FIELDS = ("date", "time", "kicks", "comment", "pregnancy_weeks", "added_at")
+
+def _export_values(source="kicks"):
+    # SQL for EXPORT_FIELDS, formatted like KickRecord.display_values()
+    start = _start_day(source)
+    if start is None:
+        weeks = "'N/A'"
+    else:
+        # floor division and modulo, also for days before the start
+        offset = f"(day - {start})"
+        rest = f"(({offset} % 7 + 7) % 7)"
+        weeks = f"printf('%d weeks %d days', ({offset} - {rest}) / 7, {rest})"
+        if source != "kicks":
+            weeks = f"IIF({offset} IS NULL, 'N/A', {weeks})"
+    return (
+        "date(day + 1721424.5)",  # day ordinal → Julian day → YYYY-MM-DD
+        "printf('%02d:%02d', minute / 60, minute % 60)",
+        "kicks",
+        "COALESCE(comment, '')",
+        weeks,
+        "COALESCE(added_at, '')",
+    )
+
+def iter_export_chunks(start_date=None, end_date=None, chunk_size=1000, as_json=False):
+    """
+    Yield lists of up to chunk_size rows in date/time order, optionally
+    limited to a date range. Rows are EXPORT_FIELDS tuples, or 1-tuples
+    holding one JSON object each when as_json. SQLite does the
+    formatting, so rows go to the file writer untouched, and fetchmany
+    keeps only one chunk in memory. Run it inside
+    transaction(mode="DEFERRED") to read one consistent snapshot.
+    """
+    lo, hi = _day_range(start_date, end_date)
+    source = archive.source("kicks", lo, hi)
+    values = _export_values(source)
+    if as_json:
+        pairs = ", ".join(f"'{name}', {sql}" for name, sql in zip(EXPORT_FIELDS, values))
+        columns = f"json_object({pairs})"
+    else:
+        columns = ", ".join(values)
+    cursor = get_connection().execute(f"""
+        SELECT {columns}
+          FROM {source}
+         WHERE day BETWEEN ? AND ?
+      ORDER BY day, minute, id
+    """, (lo, hi))
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+SEARCH_LIMIT = 200
+# bm25 is only computed for this many of the newest matches, so a search
+# costs the same however many records mention a common word
+SEARCH_CANDIDATES = 500
+
+def _search_words(text):
+    return re.findall(r"\w+", text)
+
+def _match_expression(words):
+    """FTS5 query requiring every word, the last one as a prefix."""
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+def _word_patterns(words):
+    """
+    One regex per word, matching where the FTS5 query does: a whole word,
+    the last one as a prefix.
+    """
+    last = len(words) - 1
+    return [re.compile(r"\b" + re.escape(word) + ("" if i == last else r"\b"), re.IGNORECASE)
+            for i, word in enumerate(words)]
+
+def _highlighter(words):
+    """Function wrapping the words (the last as a prefix) in [ ]."""
+    pattern = re.escape(words[-1]) + r"\w*"
+    if len(words) > 1:
+        # the others only as whole words, as the FTS5 query matches them
+        pattern = "(?:" + "|".join(map(re.escape, words[:-1])) + r")\b|" + pattern
+    regex = re.compile(rf"\b(?:{pattern})", re.IGNORECASE)
+    return lambda text: regex.sub(lambda m: f"[{m.group(0)}]", text)
+
+@cached
+def search_records(query, start_date=None, end_date=None, limit=SEARCH_LIMIT):
+    """
+    Return up to `limit` (KickRecord, highlighted comment) pairs whose
+    comment contains every word of query, the last word matching as a
+    prefix so it works while typing. Best matches (bm25) among the
+    newest SEARCH_CANDIDATES come first; matched words are wrapped in
+    [ ]. Optionally limited to a date range. Archived records (see
+    archive.py) have no search index: they are scanned, newest first,
+    with LIKE narrowing the rows and the same word matching checked on
+    each.
+    """
+    words = _search_words(query)
+    if not words:
+        return []
+    lo, hi = _day_range(start_date, end_date)
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, date, time, kicks, comment, pregnancy_weeks, added_at
-          FROM kicks
-         WHERE date BETWEEN ? AND ?
-      ORDER BY date ASC, time ASC
-    """, (start_date, end_date))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    source = archive.source("kicks", lo, hi)
+    cursor = None
+    if source == "kicks":
+        first_id, last_id = -1, 1 << 62
+        if start_date is not None or end_date is not None:
+            # narrow the index walk to the ids the range spans
+            first_id, last_id = conn.execute(
+                "SELECT MIN(id), MAX(id) FROM kicks WHERE day BETWEEN ? AND ?", (lo, hi)
+            ).fetchone()
+            if first_id is None:
+                return []
+        try:
+            cursor = conn.execute(f"""
+                WITH hits AS (
+                    SELECT kicks_fts.rowid AS hit_id, bm25(kicks_fts) AS score
+                      FROM kicks_fts JOIN kicks ON kicks.id = kicks_fts.rowid
+                     WHERE kicks_fts MATCH ?
+                       AND kicks_fts.rowid BETWEEN ? AND ?
+                       AND kicks.day BETWEEN ? AND ?
+                  ORDER BY kicks_fts.rowid DESC
+                     LIMIT ?
+                )
+                SELECT {_record_columns()}
+                  FROM hits JOIN kicks ON id = hit_id
+              ORDER BY score
+                 LIMIT ?
+            """, (_match_expression(words), first_id, last_id, lo, hi,
+                  SEARCH_CANDIDATES, limit))
+        except sqlite3.OperationalError:
+            pass  # SQLite without FTS5 (see migrations._comment_search)
+    if cursor is None:
+        where = " AND ".join(["comment LIKE ?"] * len(words))
+        patterns = _word_patterns(words)
+        rows = conn.execute(f"""
+            SELECT {_record_columns(source)}
+              FROM {source}
+             WHERE {where} AND day BETWEEN ? AND ?
+          ORDER BY day DESC, minute DESC
+        """, [f"%{word}%" for word in words] + [lo, hi])
+        cursor = islice((rec for rec in rows
+                         if all(p.search(rec[4] or "") for p in patterns)), limit)
+    highlight = _highlighter(words)
+    return [(rec, highlight(rec.comment)) for rec in map(KickRecord._make, cursor)]
 
 def delete_record(record_id):
     """
-    Delete record by its primary key.
+    Delete record by its primary key. Returns the deleted KickRecord, or
+    None if there was no such record.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM kicks WHERE id = ?", (record_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute(
+            f"DELETE FROM kicks WHERE id = ? RETURNING {_record_columns()}", (record_id,)
+        )
+        row = cursor.fetchone()
+    return KickRecord._make(row) if row else None
 
-def update_record(record_id, date, time, kicks, comment, pregnancy_weeks):
+def update_record(record_id, date, time, kicks, comment):
     """
-    Update an existing kick record’s fields.
+    Update an existing kick record’s fields and return the updated
+    KickRecord, or None if there was no such record.
+    Raises ValueError if date, time or kicks cannot be parsed, and
+    archive.ArchiveError if the date is in an archived range.
     """
-    conn = get_connection()
-    cur  = conn.cursor()
-    cur.execute(
-        """
-        UPDATE kicks
-           SET date             = ?,
-               time             = ?,
-               kicks            = ?,
-               comment          = ?,
-               pregnancy_weeks  = ?
-         WHERE id = ?
-        """,
-        (date, time, kicks, comment, pregnancy_weeks, record_id)
+    day, minute, kicks, comment = normalize_record(date, time, kicks, comment)
+    with transaction() as cur:
+        _check_not_archived(cur, day)
+        cur.execute(
+            f"""
+            UPDATE kicks
+               SET day     = ?,
+                   minute  = ?,
+                   kicks   = ?,
+                   comment = ?
+             WHERE id = ?
+            RETURNING {_record_columns()}
+            """,
+            (day, minute, kicks, comment, record_id)
+        )
+        row = cur.fetchone()
+    return KickRecord._make(row) if row else None
+
+# bound parameters per statement in batch operations (SQLite's limit
+# is 999 on older builds)
+BATCH_SIZE = 500
+
+def _batches(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), BATCH_SIZE):
+        batch = ids[i:i + BATCH_SIZE]
+        yield batch, ", ".join("?" * len(batch))
+
+def delete_records(record_ids):
+    """
+    Delete many records by primary key in a single transaction.
+    Returns the ids actually deleted.
+    """
+    deleted = []
+    with transaction() as cursor:
+        for batch, marks in _batches(record_ids):
+            cursor.execute(f"DELETE FROM kicks WHERE id IN ({marks}) RETURNING id", batch)
+            deleted.extend(row[0] for row in cursor.fetchall())
+    return deleted
+
+def update_records(record_ids, **changes):
+    """
+    Give many records the same kicks and/or comment in a single
+    transaction, e.g. update_records(ids, comment="hiccups"). Returns
+    the updated records (as KickRecord). Raises ValueError for other
+    fields or a kick count that cannot be parsed.
+    """
+    values = {}
+    for field, value in changes.items():
+        if field == "kicks":
+            values[field] = parse_kicks(value)
+        elif field == "comment":
+            values[field] = (value or "").strip()
+        else:
+            raise ValueError(f"Cannot edit {field!r} on several records at once")
+    updated = []
+    if not values:
+        return updated
+    assignments = ", ".join(f"{field} = ?" for field in values)
+    with transaction() as cursor:
+        for batch, marks in _batches(record_ids):
+            cursor.execute(f"""
+                UPDATE kicks SET {assignments}
+                 WHERE id IN ({marks})
+                RETURNING {_record_columns()}
+            """, [*values.values(), *batch])
+            updated.extend(map(KickRecord._make, cursor.fetchall()))
+    return updated
+
+@cached
+def get_date_bounds():
+    """
+    ('YYYY-MM-DD', 'YYYY-MM-DD') of the first and last record, or None
+    when there are none. Two seeks on the daily rollup's key, plus the
+    registry when there are archives.
+    """
+    first, last = get_connection().execute("""
+        SELECT (SELECT MIN(day) FROM kicks_daily), (SELECT MAX(day) FROM kicks_daily)
+    """).fetchone()
+    archived = get_connection().execute(
+        "SELECT MIN(first_day), MAX(last_day) FROM archives").fetchone()
+    if archived[0] is not None:
+        # an archive's first and last day are days with records
+        first = archived[0] if first is None else min(first, archived[0])
+        last = archived[1] if last is None else max(last, archived[1])
+    if first is None:
+        return None
+    return day_to_date(first), day_to_date(last)
+
+def rebuild_rollups():
+    """
+    Recompute the daily/hourly rollup tables from scratch. The triggers
+    keep them current; this is only needed to repair them.
+    """
+    with transaction() as cursor:
+        migrations.refill_rollups(cursor)
+    # not logged in kicks_changes, so cached totals would not notice
+    cache.clear()
+
+@cached
+def get_daily_totals(start_date=None, end_date=None, archived=True):
+    """
+    Return (day, total_kicks) pairs ascending, from the daily rollup;
+    with archived=False, from the active database only.
+    """
+    lo, hi = _day_range(start_date, end_date)
+    cursor = get_connection().execute(f"""
+        SELECT day, total
+          FROM {archive.source("kicks_daily", lo, hi) if archived else "kicks_daily"}
+         WHERE day BETWEEN ? AND ?
+      ORDER BY day
+    """, (lo, hi))
+    return cursor.fetchall()
+
+@cached
+def get_hourly_totals(start_date=None, end_date=None, archived=True):
+    """
+    Return (day, hour, total_kicks) triples ascending, from the hourly
+    rollup; with archived=False, from the active database only. Hours
+    without records are omitted.
+    """
+    lo, hi = _day_range(start_date, end_date)
+    cursor = get_connection().execute(f"""
+        SELECT day, hour, total
+          FROM {archive.source("kicks_hourly", lo, hi) if archived else "kicks_hourly"}
+         WHERE day BETWEEN ? AND ?
+      ORDER BY day, hour
+    """, (lo, hi))
+    return cursor.fetchall()
+
+def get_change_bounds():
+    """
+    (latest, oldest) seq in the kicks_changes log; latest is 0 and
+    oldest None when nothing has been logged yet.
+    """
+    # separate subqueries so each is a single seek on the primary key
+    cursor = get_connection().execute("""
+        SELECT COALESCE((SELECT MAX(seq) FROM kicks_changes), 0),
+               (SELECT MIN(seq) FROM kicks_changes)
+    """)
+    return cursor.fetchone()
+
+def get_changes_since(seq):
+    """
+    (seq, record_id, day, minute, count) log entries after seq, oldest
+    first. day/minute/count are None for deletions.
+    """
+    cursor = get_connection().execute("""
+        SELECT seq, record_id, day, minute, count
+          FROM kicks_changes
+         WHERE seq > ?
+      ORDER BY seq
+    """, (seq,))
+    return cursor.fetchall()
+
+def get_change_deltas(seq):
+    """
+    (seq, old_day, old_minute, old_count, day, minute, count) log entries
+    after seq, oldest first. The old_* values are None for insertions,
+    the new ones None for deletions.
+    """
+    cursor = get_connection().execute("""
+        SELECT seq, old_day, old_minute, old_count, day, minute, count
+          FROM kicks_changes
+         WHERE seq > ?
+      ORDER BY seq
+    """, (seq,))
+    return cursor.fetchall()
+
+def get_hour_total(day, hour):
+    """Total kicks in one hour of one day (0 if none), from the rollup."""
+    cursor = get_connection().execute(
+        "SELECT total FROM kicks_hourly WHERE day = ? AND hour = ?", (day, hour)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+@cached
+def get_first_day():
+    """
+    Day ordinal of the earliest record in the active database (archives
+    not included), or None if there are none.
+    """
+    return get_connection().execute("SELECT MIN(day) FROM kicks_daily").fetchone()[0]
+
+def load_anomaly_state():
+    """The JSON text saved by save_anomaly_state(), or None."""
+    row = get_connection().execute(
+        "SELECT state FROM anomaly_state WHERE id = 1"
+    ).fetchone()
+    return row[0] if row else None
+
+def save_anomaly_state(state):
+    """Replace the persisted anomaly detection state (JSON text)."""
+    with transaction() as cursor:
+        cursor.execute(
+            "INSERT OR REPLACE INTO anomaly_state (id, state) VALUES (1, ?)", (state,)
+        )
+
+def iter_kick_columns():
+    """
+    Cursor over (id, day, minute, count) for every record, where count
+    is the effective kick count (a record without one counts as one),
+    in the active database.
+    """
+    return get_connection().execute(
+        "SELECT id, day, minute, COALESCE(kicks, 1) FROM kicks"
     )
-    conn.commit()
-    conn.close()
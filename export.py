@@ -0,0 +1,78 @@
+import csv
+import gzip
+import os
+import database
+from connection import transaction
+
+CHUNK_SIZE = 1000
+
+
+def write_csv(fileobj, chunks):
+    """Write a header line, then the CSV rows; yields the count per chunk."""
+    writer = csv.writer(fileobj)
+    writer.writerow(database.EXPORT_FIELDS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield len(chunk)
+
+
+def write_jsonl(fileobj, chunks):
+    """Write one JSON object per line; yields the count per chunk."""
+    for chunk in chunks:
+        fileobj.write("".join(row[0] + "\n" for row in chunk))
+        yield len(chunk)
+
+
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+}
+
+
+def detect_format(path):
+    """Guess the output format and compression from the file extension."""
+    base, ext = os.path.splitext(path.lower())
+    compress = ext == ".gz"
+    if compress:
+        ext = os.path.splitext(base)[1]
+    return ("jsonl" if ext in (".jsonl", ".ndjson") else "csv"), compress
+
+
+def export_file(path, fmt=None, start_date=None, end_date=None, compress=None,
+                chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Stream records, optionally limited to a date range, into a CSV or
+    JSON Lines file, gzip-compressed if compress (default: path ends in
+    .gz). Only one chunk of rows is in memory at a time. progress, if
+    given, is called as progress(written, total) after each chunk, from
+    the calling thread. The file is written under a temporary name and
+    only renamed into place once complete. Returns the number of records.
+    """
+    guessed_fmt, guessed_compress = detect_format(path)
+    fmt = fmt or guessed_fmt
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if compress is None:
+        compress = guessed_compress
+
+    part = path + ".part"
+    opener = gzip.open if compress else open
+    options = {"compresslevel": 6} if compress else {}
+    written = 0
+    try:
+        # one read transaction: a consistent snapshot even while others write
+        with transaction(mode="DEFERRED"), \
+                opener(part, "wt", newline="", encoding="utf-8", **options) as f:
+            total = database.count_records(start_date, end_date)
+            chunks = database.iter_export_chunks(start_date, end_date, chunk_size,
+                                                 as_json=fmt == "jsonl")
+            for count in WRITERS[fmt](f, chunks):
+                written += count
+                if progress is not None:
+                    progress(written, total)
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return written
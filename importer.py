@@ -0,0 +1,148 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+import database
+from models import normalize_record
+
+CHUNK_SIZE = 10000
+
+# accepted column names (lower-cased) → record field; anything else,
+# including an exported pregnancy weeks column, is ignored
+FIELD_ALIASES = {
+    "date": "date",
+    "time": "time",
+    "kicks": "kicks",
+    "comment": "comment",
+    "added_at": "added_at",
+    "added at": "added_at",
+}
+
+ImportResult = namedtuple("ImportResult", "read inserted duplicates invalid")
+
+
+FIELDS = ("date", "time", "kicks", "comment", "added_at")
+
+
+def _field_getter(keys):
+    """
+    Build an itemgetter that pulls FIELDS out of a row laid out as keys,
+    resolving the column names once instead of once per row. Missing
+    fields read index -1, where callers append an empty value.
+    """
+    index = {}
+    for pos, key in enumerate(keys):
+        field = FIELD_ALIASES.get(str(key).strip().lower())
+        if field is not None and field not in index:
+            index[field] = pos
+    return itemgetter(*(index.get(f, -1) for f in FIELDS))
+
+
+def read_csv(fileobj):
+    """Yield one FIELDS tuple per CSV row, using the header line for names."""
+    reader = csv.reader(fileobj)
+    header = next(reader, None)
+    if header is None:
+        return
+    width = len(header)
+    get = _field_getter(header)
+    for row in reader:
+        if len(row) != width:
+            row = (row + [""] * width)[:width]
+        row.append("")
+        yield get(row)
+
+
+def read_jsonl(fileobj):
+    """
+    Yield one FIELDS tuple per non-empty JSON Lines row. A line that is
+    not a JSON object yields empty fields, so it is counted as invalid.
+    """
+    for line in fileobj:
+        line = line.strip()
+        if line:
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                obj = None
+            if not isinstance(obj, dict):
+                yield ("",) * len(FIELDS)
+                continue
+            keys = list(obj)
+            values = ["" if v is None else str(v) for v in obj.values()]
+            values.append("")
+            yield _field_getter(keys)(values)
+
+
+READERS = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+}
+
+
+def detect_format(path):
+    """Guess the input format from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "csv"
+
+
+def _normalize(raw, added_at):
+    """
+    Turn a raw FIELDS tuple into a typed insert tuple, or None if the row
+    is missing date/time or does not parse.
+    """
+    date, time, kicks, comment, added = map(str.strip, raw)
+    if not date or not time:
+        return None
+    try:
+        day, minute, kicks, comment = normalize_record(date, time, kicks, comment)
+    except ValueError:
+        return None
+    return (day, minute, kicks, comment, added or added_at)
+
+
+def import_rows(rows, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Insert an iterable of raw FIELDS tuples in chunks, one transaction per chunk.
+    Only one chunk is held in memory at a time. progress, if given, is
+    called with the number of rows read so far after each chunk.
+    """
+    added_at = datetime.now().isoformat(timespec='seconds')
+    read = inserted = invalid = 0
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        read += len(batch)
+        chunk = []
+        for raw in batch:
+            rec = _normalize(raw, added_at)
+            if rec is None:
+                invalid += 1
+            else:
+                chunk.append(rec)
+        inserted += database.insert_records(chunk, bulk=True)
+        if progress is not None:
+            progress(read)
+
+    return ImportResult(read, inserted, read - inserted - invalid, invalid)
+
+
+def import_file(path, fmt=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Stream a CSV or JSON Lines file into the database.
+    Rows with a date+time already in the database are skipped; rows
+    with a bad date, time or kick count are counted as invalid.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    with open(path, newline="", encoding="utf-8") as f:
+        return import_rows(READERS[fmt](f), chunk_size, progress)
@@ -0,0 +1,202 @@
+"""
+Opt-in latency instrumentation.
+
+When enabled, three kinds of samples are kept:
+  sql     every statement, via sqlite3's trace callback
+  db      every public database.py function (wall clock)
+  ui      UI action handlers marked with @timed_action, and the
+          background jobs they submit ("job")
+Samples go to a bounded ring buffer; summary() turns them into
+p50/p95/p99 per name. While disabled nothing is wrapped or traced, and
+@timed_action costs a single flag check.
+
+A statement's time runs from its trace callback to the next statement
+on the same thread or the end of the database.py call around it, so it
+includes fetching the rows.
+"""
+import functools
+import inspect
+import json
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import connection
+
+RING_SIZE = 10000
+# upper bounds (ms) of the histogram buckets in dump(); the last is open
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+# public database.py functions left unwrapped (called by all the others)
+SKIP_FUNCTIONS = ("get_connection",)
+
+ENABLED = False
+
+# (kind, name, milliseconds, time.time()) tuples
+_samples = deque(maxlen=RING_SIZE)
+_local = threading.local()
+_originals = {}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def record(kind, name, ms):
+    _samples.append((kind, name, ms, time.time()))
+
+
+def _statement_name(sql):
+    # literals vary per call; fold them so one query is one name
+    return _SPACE.sub(" ", _LITERALS.sub("?", sql)).strip()[:160]
+
+
+def _end_statement(now):
+    pending = getattr(_local, "statement", None)
+    if pending is not None:
+        _local.statement = None
+        record("sql", _statement_name(pending[0]), (now - pending[1]) * 1000)
+
+
+def _trace(sql):
+    now = time.perf_counter()
+    _end_statement(now)
+    _local.statement = (sql, now)
+
+
+def _timed(kind, name, fn):
+    if inspect.isgeneratorfunction(fn):
+        # time the whole iteration, not just creating the generator
+        @functools.wraps(fn)
+        def timed_generator(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                yield from fn(*args, **kwargs)
+            finally:
+                now = time.perf_counter()
+                _end_statement(now)
+                record(kind, name, (now - start) * 1000)
+        return timed_generator
+
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            now = time.perf_counter()
+            _end_statement(now)
+            record(kind, name, (now - start) * 1000)
+    return timed
+
+
+def enable():
+    """Start recording: trace SQL and wrap the database.py functions."""
+    global ENABLED
+    if ENABLED:
+        return
+    import database
+    for name, fn in vars(database).items():
+        if (inspect.isfunction(fn) and fn.__module__ == database.__name__
+                and not name.startswith("_") and name not in SKIP_FUNCTIONS):
+            _originals[name] = fn
+            setattr(database, name, _timed("db", name, fn))
+    connection.set_trace_callback(_trace)
+    ENABLED = True
+
+
+def disable():
+    """Stop recording and restore the unwrapped functions. Samples are kept."""
+    global ENABLED
+    if not ENABLED:
+        return
+    import database
+    for name, fn in _originals.items():
+        setattr(database, name, fn)
+    _originals.clear()
+    connection.set_trace_callback(None)
+    ENABLED = False
+
+
+def clear():
+    _samples.clear()
+
+
+def timed_action(fn):
+    """Decorator for UI action handlers; a no-op check while disabled."""
+    name = fn.__qualname__
+    timed = _timed("ui", name, fn)
+
+    @functools.wraps(fn)
+    def action(*args, **kwargs):
+        if not ENABLED:
+            return fn(*args, **kwargs)
+        return timed(*args, **kwargs)
+    return action
+
+
+def job(fn):
+    """fn wrapped to time a background job, or fn itself while disabled."""
+    if not ENABLED:
+        return fn
+    name = getattr(fn, "__qualname__", None) or type(fn).__name__
+    return _timed("job", name, fn)
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summary():
+    """
+    One dict per (kind, name) in the ring buffer, with count and the
+    p50/p95/p99/max latency in ms, slowest p95 first.
+    """
+    groups = {}
+    for kind, name, ms, _ in list(_samples):
+        groups.setdefault((kind, name), []).append(ms)
+    rows = []
+    for (kind, name), times in groups.items():
+        times.sort()
+        rows.append({
+            "kind": kind, "name": name, "count": len(times),
+            "p50": _percentile(times, 50), "p95": _percentile(times, 95),
+            "p99": _percentile(times, 99), "max": times[-1],
+        })
+    rows.sort(key=lambda row: row["p95"], reverse=True)
+    return rows
+
+
+def histogram(times):
+    """Counts of times (ms) per BUCKETS_MS bucket, keyed by its label."""
+    counts = dict.fromkeys([f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"], 0)
+    for ms in times:
+        for bound in BUCKETS_MS:
+            if ms <= bound:
+                counts[f"<={bound}"] += 1
+                break
+        else:
+            counts[f">{BUCKETS_MS[-1]}"] += 1
+    return counts
+
+
+def dump(path):
+    """Write the summary, per-name histograms, cache stats and raw samples as JSON."""
+    import cache
+    samples = list(_samples)
+    by_name = {}
+    for kind, name, ms, _ in samples:
+        by_name.setdefault(f"{kind}: {name}", []).append(ms)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "enabled": ENABLED,
+        "summary": summary(),
+        "histograms": {name: histogram(times) for name, times in by_name.items()},
+        "cache": cache.stats(),
+        "samples": [
+            {"kind": kind, "name": name, "ms": ms,
+             "at": datetime.fromtimestamp(at).isoformat(timespec="milliseconds")}
+            for kind, name, ms, at in samples
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
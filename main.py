@@ -1,8 +1,93 @@
-from ui.main_window import MainWindow
-import database
+import time
+
+# taken before any heavy import so --profile-startup can include them
+_STARTED = time.perf_counter()
+
+import argparse
+import sys
+
+# delay after the first paint before heavy modules are imported in the background
+PREWARM_DELAY_MS = 300
+HEAVY_MODULES = ("numpy", "matplotlib", "ui.records_window", "ui.charts")
+
+
+class StartupProfile:
+    """Wall-clock marks from process start to first paint, printed to stderr."""
+    def __init__(self):
+        self.marks = [("start", _STARTED)]
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        print("startup profile (ms):", file=sys.stderr)
+        prev = _STARTED
+        for name, t in self.marks[1:]:
+            print(f"  {name:<28} +{(t - prev) * 1000:8.1f}  = {(t - _STARTED) * 1000:8.1f}",
+                  file=sys.stderr)
+            prev = t
+        loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+        print(f"  heavy modules loaded before first paint: {', '.join(loaded) or 'none'}",
+              file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Baby Kicks Tracker")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print import and first-paint timings to stderr")
+    parser.add_argument("--no-prewarm", action="store_true",
+                        help="do not preload the records/charts modules in the background")
+    parser.add_argument("--no-backup", action="store_true",
+                        help="do not make the daily background backup")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record SQL and UI latencies from the start "
+                             "(view them with Ctrl+Shift+D)")
+    args = parser.parse_args(argv)
+
+    profile = StartupProfile() if args.profile_startup else None
+    if args.instrument:
+        import instrumentation
+        instrumentation.enable()
+
+    import database
+    from ui.main_window import MainWindow, prewarm
+    if profile:
+        profile.mark("imports")
 
-if __name__ == "__main__":
     database.create_table()
+    if profile:
+        profile.mark("database ready")
 
     app = MainWindow()
+    if profile:
+        profile.mark("main window built")
+
+    scheduler = None
+    if not args.no_backup:
+        from backup import BackupScheduler
+        scheduler = BackupScheduler().start()
+
+    if profile:
+        def first_paint():
+            profile.mark("first paint (loop idle)")
+            profile.report()
+        app.after_idle(first_paint)
+
+    if not args.no_prewarm:
+        def on_prewarmed(seconds):
+            if profile:
+                print(f"  background prewarm done in {seconds * 1000:.1f} ms",
+                      file=sys.stderr)
+        app.after(PREWARM_DELAY_MS, lambda: prewarm(on_done=on_prewarmed))
+
     app.mainloop()
+    if scheduler is not None:
+        scheduler.stop()
+
+    # commit writes still queued when the window closed
+    from writer import close_writer
+    close_writer()
+
+
+if __name__ == "__main__":
+    main()
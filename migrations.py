@@ -0,0 +1,512 @@
+"""
+Versioned schema migrations keyed on PRAGMA user_version.
+
+Each step brings the schema from version N-1 to N and runs in its own
+transaction together with the version bump. Steps are written to be
+idempotent so databases created before versioning (user_version 0 but
+with a kicks table already present) upgrade cleanly.
+"""
+import sqlite3
+from connection import get_connection, transaction
+from models import parse_date, parse_time, parse_kicks
+
+# entries of kicks_changes kept for incremental readers
+CHANGE_LOG_KEEP = 100000
+
+
+def _create_kicks(cursor):
+    """Base table, plus the columns older releases added ad hoc."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS kicks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        kicks TEXT,
+        comment TEXT
+    )
+    """)
+    cursor.execute("PRAGMA table_info(kicks)")
+    existing = {row[1] for row in cursor.fetchall()}
+    if "pregnancy_weeks" not in existing:
+        cursor.execute("ALTER TABLE kicks ADD COLUMN pregnancy_weeks TEXT")
+    if "added_at" not in existing:
+        cursor.execute("ALTER TABLE kicks ADD COLUMN added_at TEXT")
+
+
+def _index_date_time(cursor):
+    """
+    Composite UNIQUE index on (date, time). It serves record_exists as an
+    index-only lookup, the date range filter as a seek, and both ORDER BY
+    date, time directions without a sort step. Older databases could hold
+    several rows for one date and time; all but the first are moved to
+    kicks_rejected so the index can be built.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS kicks_rejected AS
+    SELECT * FROM kicks WHERE 0
+    """)
+    cursor.execute("""
+    INSERT INTO kicks_rejected
+    SELECT * FROM kicks
+     WHERE id NOT IN (SELECT MIN(id) FROM kicks GROUP BY date, time)
+    """)
+    cursor.execute("""
+    DELETE FROM kicks
+     WHERE id NOT IN (SELECT MIN(id) FROM kicks GROUP BY date, time)
+    """)
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_kicks_date_time ON kicks(date, time)"
+    )
+
+
+def _typed_columns(cursor):
+    """
+    Rebuild kicks with typed columns: day ordinal, minute-of-day and an
+    INTEGER kick count (see models.py). Legacy rows are parsed once here.
+    Non-numeric kick counts are kept by moving them into the comment;
+    rows whose date or time cannot be parsed, or that collide once
+    normalized (e.g. '9:05' and '09:05'), are copied to kicks_rejected.
+    """
+    cursor.execute("""
+    CREATE TABLE kicks_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        day INTEGER NOT NULL,
+        minute INTEGER NOT NULL CHECK (minute BETWEEN 0 AND 1439),
+        kicks INTEGER CHECK (kicks >= 0),
+        comment TEXT,
+        pregnancy_weeks TEXT,
+        added_at TEXT
+    )
+    """)
+    cursor.execute(
+        "CREATE UNIQUE INDEX idx_kicks_day_minute ON kicks_new(day, minute)"
+    )
+
+    def converted():
+        rows = get_connection().execute("""
+            SELECT id, date, time, kicks, comment, pregnancy_weeks, added_at
+              FROM kicks ORDER BY id
+        """)
+        for rid, date, time, kicks, comment, weeks, added_at in rows:
+            try:
+                day, minute = parse_date(date), parse_time(time)
+            except ValueError:
+                continue
+            try:
+                count = parse_kicks(kicks)
+            except ValueError:
+                count = None
+                note = f"(kicks: {str(kicks).strip()})"
+                comment = f"{comment} {note}" if comment else note
+            yield rid, day, minute, count, comment, weeks, added_at
+
+    cursor.executemany("""
+    INSERT OR IGNORE INTO kicks_new
+      (id, day, minute, kicks, comment, pregnancy_weeks, added_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, converted())
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS kicks_rejected AS
+    SELECT * FROM kicks WHERE 0
+    """)
+    cursor.execute("""
+    INSERT INTO kicks_rejected
+    SELECT * FROM kicks WHERE id NOT IN (SELECT id FROM kicks_new)
+    """)
+
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'kicks'")
+    seq = cursor.fetchone()
+    cursor.execute("DROP TABLE kicks")
+    cursor.execute("ALTER TABLE kicks_new RENAME TO kicks")
+    if seq is not None:
+        # keep AUTOINCREMENT from reusing ids of rows deleted in the past
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'kicks'", seq
+        )
+
+
+def refill_rollups(cursor):
+    """Recompute kicks_daily / kicks_hourly from the raw kicks rows."""
+    cursor.execute("DELETE FROM kicks_daily")
+    cursor.execute("DELETE FROM kicks_hourly")
+    cursor.execute("""
+    INSERT INTO kicks_daily (day, total, records)
+    SELECT day, SUM(COALESCE(kicks, 1)), COUNT(*)
+      FROM kicks
+     GROUP BY day
+    """)
+    cursor.execute("""
+    INSERT INTO kicks_hourly (day, hour, total, records)
+    SELECT day, minute / 60, SUM(COALESCE(kicks, 1)), COUNT(*)
+      FROM kicks
+     GROUP BY day, minute / 60
+    """)
+
+
+# Trigger bodies that add (+) or remove (-) one kicks row, given as NEW or
+# OLD, from the rollups. A record without a kick count counts as one kick.
+_ROLLUP_ADD = """
+    INSERT INTO kicks_daily (day, total, records)
+    VALUES ({row}.day, COALESCE({row}.kicks, 1), 1)
+        ON CONFLICT (day) DO UPDATE
+       SET total = total + excluded.total, records = records + 1;
+    INSERT INTO kicks_hourly (day, hour, total, records)
+    VALUES ({row}.day, {row}.minute / 60, COALESCE({row}.kicks, 1), 1)
+        ON CONFLICT (day, hour) DO UPDATE
+       SET total = total + excluded.total, records = records + 1;
+"""
+_ROLLUP_REMOVE = """
+    UPDATE kicks_daily
+       SET total = total - COALESCE({row}.kicks, 1), records = records - 1
+     WHERE day = {row}.day;
+    DELETE FROM kicks_daily WHERE day = {row}.day AND records = 0;
+    UPDATE kicks_hourly
+       SET total = total - COALESCE({row}.kicks, 1), records = records - 1
+     WHERE day = {row}.day AND hour = {row}.minute / 60;
+    DELETE FROM kicks_hourly
+     WHERE day = {row}.day AND hour = {row}.minute / 60 AND records = 0;
+"""
+
+
+def _rollup_tables(cursor):
+    """
+    Materialized per-day and per-(day, hour) totals kept current by
+    triggers, so charts cost O(days shown) rather than O(records).
+    """
+    cursor.execute("""
+    CREATE TABLE kicks_daily (
+        day INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL,
+        records INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE kicks_hourly (
+        day INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        records INTEGER NOT NULL,
+        PRIMARY KEY (day, hour)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER kicks_rollup_insert AFTER INSERT ON kicks BEGIN
+    {_ROLLUP_ADD.format(row="NEW")}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER kicks_rollup_delete AFTER DELETE ON kicks BEGIN
+    {_ROLLUP_REMOVE.format(row="OLD")}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER kicks_rollup_update AFTER UPDATE OF day, minute, kicks ON kicks BEGIN
+    {_ROLLUP_REMOVE.format(row="OLD")}
+    {_ROLLUP_ADD.format(row="NEW")}
+    END
+    """)
+    refill_rollups(cursor)
+
+
+def _change_log(cursor):
+    """
+    kicks_changes: an append-only log of every change to kicks, written
+    by triggers, so in-memory views (columnar.KickSnapshot) can catch up
+    incrementally. Each entry carries the record's new day, minute and
+    effective kick count, or NULLs when it was deleted. Only the most
+    recent CHANGE_LOG_KEEP entries are kept; a reader that fell further
+    behind sees a gap in seq and reloads from scratch.
+    """
+    cursor.execute("""
+    CREATE TABLE kicks_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        record_id INTEGER NOT NULL,
+        day INTEGER,
+        minute INTEGER,
+        count INTEGER
+    )
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_log_insert AFTER INSERT ON kicks BEGIN
+        INSERT INTO kicks_changes (record_id, day, minute, count)
+        VALUES (NEW.id, NEW.day, NEW.minute, COALESCE(NEW.kicks, 1));
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_log_update AFTER UPDATE OF day, minute, kicks ON kicks BEGIN
+        INSERT INTO kicks_changes (record_id, day, minute, count)
+        VALUES (NEW.id, NEW.day, NEW.minute, COALESCE(NEW.kicks, 1));
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_log_delete AFTER DELETE ON kicks BEGIN
+        INSERT INTO kicks_changes (record_id) VALUES (OLD.id);
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER kicks_log_prune AFTER INSERT ON kicks_changes
+    WHEN NEW.seq % 1000 = 0 BEGIN
+        DELETE FROM kicks_changes WHERE seq <= NEW.seq - {CHANGE_LOG_KEEP};
+    END
+    """)
+
+
+def _derive_pregnancy_weeks(cursor):
+    """
+    Drop the stored pregnancy_weeks text. It was frozen at write time and
+    went stale whenever the start date changed; reads now derive the
+    gestational age from day and the current start date instead.
+    (ALTER TABLE ... DROP COLUMN needs SQLite 3.35 or newer.)
+    """
+    cursor.execute("ALTER TABLE kicks DROP COLUMN pregnancy_weeks")
+
+
+def _anomaly_state(cursor):
+    """
+    Log the old day/minute/count of updated and deleted records in
+    kicks_changes, so readers can subtract them without rescanning, and
+    add anomaly_state, where anomaly.py persists its baselines as JSON.
+    """
+    for column in ("old_day", "old_minute", "old_count"):
+        cursor.execute(f"ALTER TABLE kicks_changes ADD COLUMN {column} INTEGER")
+    cursor.execute("DROP TRIGGER kicks_log_update")
+    cursor.execute("DROP TRIGGER kicks_log_delete")
+    cursor.execute("""
+    CREATE TRIGGER kicks_log_update AFTER UPDATE OF day, minute, kicks ON kicks BEGIN
+        INSERT INTO kicks_changes
+          (record_id, day, minute, count, old_day, old_minute, old_count)
+        VALUES (NEW.id, NEW.day, NEW.minute, COALESCE(NEW.kicks, 1),
+                OLD.day, OLD.minute, COALESCE(OLD.kicks, 1));
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_log_delete AFTER DELETE ON kicks BEGIN
+        INSERT INTO kicks_changes (record_id, old_day, old_minute, old_count)
+        VALUES (OLD.id, OLD.day, OLD.minute, COALESCE(OLD.kicks, 1));
+    END
+    """)
+    cursor.execute("""
+    CREATE TABLE anomaly_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        state TEXT NOT NULL
+    )
+    """)
+
+
+def _fts5_available(cursor):
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    cursor.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+
+def _comment_search(cursor):
+    """
+    kicks_fts: an FTS5 index over kicks.comment, stored as an external
+    content table (no second copy of the text) and kept in sync by
+    triggers. Empty comments are never indexed; prefix indexes keep
+    search-as-you-type on one to three letters fast. Skipped when SQLite was
+    built without FTS5; database.search_records() then falls back to LIKE.
+    """
+    if not _fts5_available(cursor):
+        return
+    cursor.execute("""
+    CREATE VIRTUAL TABLE kicks_fts USING fts5(
+        comment,
+        content='kicks',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='1 2 3'
+    )
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_fts_insert AFTER INSERT ON kicks
+    WHEN NEW.comment <> '' BEGIN
+        INSERT INTO kicks_fts (rowid, comment) VALUES (NEW.id, NEW.comment);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_fts_delete AFTER DELETE ON kicks
+    WHEN OLD.comment <> '' BEGIN
+        INSERT INTO kicks_fts (kicks_fts, rowid, comment)
+        VALUES ('delete', OLD.id, OLD.comment);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_fts_update AFTER UPDATE OF comment ON kicks BEGIN
+        INSERT INTO kicks_fts (kicks_fts, rowid, comment)
+        SELECT 'delete', OLD.id, OLD.comment WHERE OLD.comment <> '';
+        INSERT INTO kicks_fts (rowid, comment)
+        SELECT NEW.id, NEW.comment WHERE NEW.comment <> '';
+    END
+    """)
+    cursor.execute("""
+    INSERT INTO kicks_fts (rowid, comment)
+    SELECT id, comment FROM kicks WHERE comment <> ''
+    """)
+
+
+def _ingest_keys(cursor):
+    """
+    ingest_keys: the idempotency key of every record created through the
+    ingestion API (server.py), so a retried request finds its record
+    instead of adding it twice.
+    """
+    cursor.execute("""
+    CREATE TABLE ingest_keys (
+        key TEXT PRIMARY KEY,
+        record_id INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    ) WITHOUT ROWID
+    """)
+
+
+def _log_comment_edits(cursor):
+    """
+    Log comment-only edits in kicks_changes too, so readers that cache
+    whole records (cache.py) see them. Day, minute and count are logged
+    unchanged, which incremental totals apply as a zero delta.
+    """
+    cursor.execute("DROP TRIGGER kicks_log_update")
+    cursor.execute("""
+    CREATE TRIGGER kicks_log_update AFTER UPDATE OF day, minute, kicks, comment ON kicks BEGIN
+        INSERT INTO kicks_changes
+          (record_id, day, minute, count, old_day, old_minute, old_count)
+        VALUES (NEW.id, NEW.day, NEW.minute, COALESCE(NEW.kicks, 1),
+                OLD.day, OLD.minute, COALESCE(OLD.kicks, 1));
+    END
+    """)
+
+
+def _archives(cursor):
+    """
+    archives: the registry of per-pregnancy archive files (archive.py)
+    with the day range each one holds, so a query can tell without
+    opening them whether it needs any.
+    """
+    cursor.execute("""
+    CREATE TABLE archives (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        first_day INTEGER NOT NULL,
+        last_day INTEGER NOT NULL,
+        records INTEGER NOT NULL,
+        start_day INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """)
+
+
+def _kick_sessions(cursor):
+    """
+    kick_sessions: taps of kick-counting sessions (sessions.py) as one
+    delta-encoded uint32 BLOB per session, next to the record in kicks
+    that summarizes it. Deleting that record keeps the taps.
+    """
+    cursor.execute("""
+    CREATE TABLE kick_sessions (
+        id INTEGER PRIMARY KEY,
+        record_id INTEGER REFERENCES kicks(id) ON DELETE SET NULL,
+        started_at TEXT NOT NULL,
+        duration_ms INTEGER NOT NULL,
+        taps INTEGER NOT NULL,
+        time_to_target_ms INTEGER,
+        tap_deltas BLOB NOT NULL
+    )
+    """)
+    cursor.execute(
+        "CREATE INDEX idx_kick_sessions_record ON kick_sessions(record_id)"
+    )
+
+
+def _guard_archived_days(cursor):
+    """
+    Keep writes out of the day ranges of archives (archive.py). The
+    unique (day, minute) index only covers the active table, so without
+    this a record could be added again for a date and time that was
+    archived. Inserts there are skipped, as for a date and time that is
+    taken; moving a record there is refused.
+    """
+    cursor.execute("""
+    CREATE TRIGGER kicks_archived_insert BEFORE INSERT ON kicks
+    WHEN EXISTS (SELECT 1 FROM archives WHERE NEW.day BETWEEN first_day AND last_day) BEGIN
+        SELECT RAISE(IGNORE);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER kicks_archived_update BEFORE UPDATE OF day ON kicks
+    WHEN NEW.day <> OLD.day
+     AND EXISTS (SELECT 1 FROM archives WHERE NEW.day BETWEEN first_day AND last_day) BEGIN
+        SELECT RAISE(ABORT, 'The date is in an archived range');
+    END
+    """)
+
+
+def _search_without_one_letter_prefix(cursor):
+    """
+    Rebuild kicks_fts with prefix indexes for two and three letters only.
+    The one-letter index made every indexed word cost a fourth index
+    entry, for searches too short to narrow anything down.
+    """
+    if not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'kicks_fts'").fetchone():
+        return
+    cursor.execute("DROP TABLE kicks_fts")
+    cursor.execute("""
+    CREATE VIRTUAL TABLE kicks_fts USING fts5(
+        comment,
+        content='kicks',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """)
+    cursor.execute("INSERT INTO kicks_fts (kicks_fts) VALUES ('rebuild')")
+
+
+# Append new steps at the end; never reorder or edit released ones.
+MIGRATIONS = [
+    _create_kicks,
+    _index_date_time,
+    _typed_columns,
+    _rollup_tables,
+    _change_log,
+    _derive_pregnancy_weeks,
+    _anomaly_state,
+    _comment_search,
+    _ingest_keys,
+    _log_comment_edits,
+    _archives,
+    _kick_sessions,
+    _guard_archived_days,
+    _search_without_one_letter_prefix,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_version():
+    return get_connection().execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate():
+    """
+    Apply all pending migrations and return the resulting version.
+    An up-to-date database costs a single PRAGMA read.
+    """
+    version = get_version()
+    if version == LATEST_VERSION:
+        return version
+    if version > LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this app "
+            f"supports ({LATEST_VERSION})."
+        )
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        with transaction() as cursor:
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+    return LATEST_VERSION
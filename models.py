@@ -0,0 +1,129 @@
+from collections import namedtuple
+from datetime import date as _date
+from functools import lru_cache
+
+# Records are stored with typed columns:
+#   day    proleptic Gregorian ordinal (datetime.date.toordinal())
+#   minute minute of the day, 0..1439
+#   kicks  non-negative count, or NULL when not given
+# Strings typed by the user are parsed once, at write time. Gestational
+# age is not stored: reads derive it as day minus the start-date ordinal.
+
+_MIN_DAY, _MAX_DAY = _date.min.toordinal(), _date.max.toordinal()
+
+
+def parse_date(value):
+    """Return the day ordinal for a 'YYYY-MM-DD' string, a date or an ordinal."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        if not _MIN_DAY <= value <= _MAX_DAY:
+            raise ValueError(f"Invalid date: {value!r} (day ordinal out of range)")
+        return value
+    if isinstance(value, _date):
+        return value.toordinal()
+    try:
+        return _date.fromisoformat(str(value).strip()).toordinal()
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r} (expected YYYY-MM-DD)") from None
+
+
+def parse_time(value):
+    """Return minute-of-day for an 'HH:MM' string (seconds are ignored) or an int."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        if not 0 <= value < 24 * 60:
+            raise ValueError(f"Invalid time: {value!r} (minute of day out of range)")
+        return value
+    parts = str(value).strip().split(":")
+    try:
+        if len(parts) not in (2, 3):
+            raise ValueError
+        hour, minute = int(parts[0]), int(parts[1])
+    except ValueError:
+        raise ValueError(f"Invalid time: {value!r} (expected HH:MM)") from None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time: {value!r} (expected HH:MM)")
+    return hour * 60 + minute
+
+
+def parse_kicks(value):
+    """Return the kick count as an int, or None when left empty."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        count = int(text)
+    except ValueError:
+        count = -1
+    if count < 0:
+        raise ValueError("Kicks count must be a whole number of 0 or more")
+    return count
+
+
+def day_to_date(day):
+    """'YYYY-MM-DD' for a day ordinal."""
+    return _date.fromordinal(day).isoformat()
+
+
+def minute_to_time(minute):
+    """'HH:MM' for a minute-of-day."""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+@lru_cache(maxsize=1024)
+def format_gestational_age(days):
+    """'W weeks D days' for a number of days since the pregnancy start."""
+    if days is None:
+        return "N/A"
+    return f"{days // 7} weeks {days % 7} days"
+
+
+def normalize_record(date, time, kicks, comment):
+    """
+    Validate user input and return (day, minute, kicks, comment).
+    Raises ValueError with a user-facing message on bad input.
+    """
+    return (
+        parse_date(date),
+        parse_time(time),
+        parse_kicks(kicks),
+        (comment or "").strip(),
+    )
+
+
+class KickRecord(namedtuple(
+        "KickRecord", "id day minute kicks comment gestational_days added_at")):
+    """
+    One row of the kicks table, with typed fields. gestational_days is
+    derived at query time from the current pregnancy start date.
+    """
+    __slots__ = ()
+
+    @property
+    def date(self):
+        return day_to_date(self.day)
+
+    @property
+    def time(self):
+        return minute_to_time(self.minute)
+
+    @property
+    def count(self):
+        """Kicks for charting: a record without a count stands for one kick."""
+        return 1 if self.kicks is None else self.kicks
+
+    @property
+    def pregnancy_weeks(self):
+        return format_gestational_age(self.gestational_days)
+
+    def display_values(self):
+        """Column values for the records table."""
+        return (
+            self.id,
+            self.date,
+            self.time,
+            "" if self.kicks is None else self.kicks,
+            self.comment or "",
+            self.pregnancy_weeks,
+            self.added_at or "",
+        )
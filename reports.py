@@ -0,0 +1,328 @@
+"""
+Weekly and monthly reports, rendered headless.
+
+compute() turns one range query on the hourly rollup into per-period
+statistics with NumPy: total kicks, daily totals and their 10th/50th/90th
+percentiles, the average activity per hour of day, and the trend of the
+average daily total against the previous period. Weeks are gestational
+weeks counted from the start of the pregnancy each day belongs to: the
+one in Settings or an archived one (calendar weeks from Monday for days
+outside all of them). Months are calendar months.
+
+render() draws one page per period plus a summary page and writes them
+as PNG files, rendered with the Agg backend over a process pool, or as
+one vector PDF drawn with PdfPages.
+
+    python cli.py report reports/ --period week
+    python cli.py report pregnancy.pdf --from 2025-01-01
+"""
+import io
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import archive
+import database
+from columnar import bin_edges, bin_end
+from models import day_to_date
+from settings import get_pregnancy_start_ordinal
+
+PERIODS = ("week", "month")
+DPI = 150
+PAGE_SIZE = (11.69, 8.27)  # A4 landscape, inches
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _pregnancies():
+    """
+    (starts, ends) ordinal arrays of the known pregnancies, by start: the
+    archived ones, up to their last record, and the current one.
+    """
+    known = {start: last + 1 for _, _, _, last, _, start in archive.list_archives()}
+    current = get_pregnancy_start_ordinal()
+    if current is not None:
+        known[current] = 1 << 62
+    starts = sorted(known)
+    return (np.array(starts, dtype=np.int64),
+            np.array([known[s] for s in starts], dtype=np.int64))
+
+
+def _pregnancy_start(days, pregnancies):
+    """Start ordinal of the pregnancy each day belongs to, -1 if none."""
+    starts, ends = pregnancies
+    i = np.searchsorted(starts, days, side="right") - 1
+    found = (i >= 0) & (days < ends[np.maximum(i, 0)])
+    return np.where(found, starts[np.maximum(i, 0)], -1) if len(starts) else np.full_like(days, -1)
+
+
+def _period_starts(days, period, pregnancies):
+    """Start ordinal of the period each day falls in."""
+    calendar = bin_edges(days, period)
+    if period != "week":
+        return calendar
+    start = _pregnancy_start(days, pregnancies)
+    return np.where(start >= 0, start + (days - start) // 7 * 7, calendar)
+
+
+def _title(first, period, pregnancies):
+    if period == "month":
+        return day_to_date(first)[:7]
+    start = int(_pregnancy_start(np.array([first]), pregnancies)[0])
+    if start >= 0:
+        return f"Week {(first - start) // 7}"
+    return f"Week of {day_to_date(first)}"
+
+
+def compute(start_date=None, end_date=None, period="week"):
+    """
+    One dict of statistics per period with records, oldest first:
+    title, first/last (YYYY-MM-DD), days (ordinals of every day in the
+    period), daily (total per day, NaN without records), recorded_days,
+    total, mean, p10/p50/p90 (of daily totals), hourly (24 averages per
+    recorded day), peak_hour, and trend (relative change of mean from
+    the previous period, None without one).
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown report period: {period}")
+    rows = np.array(database.get_hourly_totals(start_date, end_date), dtype=np.int64)
+    if not len(rows):
+        return []
+    day, hour, total = rows.T
+    pregnancies = _pregnancies()
+
+    # every day of every period touched, so each period is complete; a
+    # week cut short by the next pregnancy's start ends there
+    first = int(_period_starts(day[:1], period, pregnancies)[0])
+    last = int(bin_end(_period_starts(day[-1:], period, pregnancies), period)[0])
+    days = np.arange(first, last)
+    grid = np.bincount((day - first) * 24 + hour, weights=total,
+                       minlength=len(days) * 24).reshape(len(days), 24)
+    present = np.zeros(len(days), bool)
+    present[day - first] = True
+    daily = np.where(present, grid.sum(axis=1), np.nan)
+
+    keys = _period_starts(days, period, pregnancies)
+    bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    recorded = np.add.reduceat(present, bounds)
+    totals = np.add.reduceat(np.nan_to_num(daily), bounds)
+    hourly = np.add.reduceat(grid, bounds, axis=0) / np.maximum(recorded, 1)[:, None]
+    mean = totals / np.maximum(recorded, 1)
+
+    # daily totals as a (periods x 31) matrix, NaN-padded, for percentiles
+    group = np.repeat(np.arange(len(bounds)), np.diff(np.r_[bounds, len(days)]))
+    padded = np.full((len(bounds), 31), np.nan)
+    padded[group, np.arange(len(days)) - bounds[group]] = daily
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN periods
+        p10, p50, p90 = np.nanpercentile(padded, [10, 50, 90], axis=1)
+
+    reports = []
+    previous = None
+    for i, begin in enumerate(bounds):
+        if not recorded[i]:
+            previous = None
+            continue
+        end = bounds[i + 1] if i + 1 < len(bounds) else len(days)
+        reports.append({
+            "title": _title(int(days[begin]), period, pregnancies),
+            "period": period,
+            "first": day_to_date(int(days[begin])),
+            "last": day_to_date(int(days[end - 1])),
+            "days": days[begin:end].tolist(),
+            "daily": daily[begin:end].tolist(),
+            "recorded_days": int(recorded[i]),
+            "total": int(totals[i]),
+            "mean": float(mean[i]),
+            "p10": float(p10[i]), "p50": float(p50[i]), "p90": float(p90[i]),
+            "hourly": hourly[i].tolist(),
+            "peak_hour": int(np.argmax(hourly[i])),
+            "trend": float(mean[i] / previous - 1) if previous else None,
+        })
+        previous = mean[i]
+    return reports
+
+
+# -- rendering (PNG: in the worker processes; PDF: in this one) ---------
+
+# per-worker page figures by number of days shown, built once and then
+# refreshed with each period's data, as ui/charts.py does
+_pages = {}
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.figure  # noqa: F401  (loaded once per worker)
+
+
+def _png(figure):
+    """The figure as PNG bytes."""
+    buf = io.BytesIO()
+    figure.savefig(buf, format="png", dpi=DPI)
+    return buf.getvalue()
+
+
+class _PeriodPage:
+    """One period's page: daily bars, hourly profile and a text summary."""
+
+    def __init__(self, length):
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=PAGE_SIZE, dpi=DPI)
+        grid = self.figure.add_gridspec(2, 2, height_ratios=(3, 1), hspace=0.35, wspace=0.2,
+                                        left=0.06, right=0.97, top=0.88, bottom=0.06)
+        self.title = self.figure.suptitle("", fontsize=16)
+
+        self.daily = self.figure.add_subplot(grid[0, 0])
+        self.x = np.arange(length)
+        self.day_bars = self.daily.bar(self.x, np.zeros(length), color="tab:blue")
+        self.median = self.daily.axhline(0, color="tab:orange", linestyle="--", label="median")
+        self.p10 = self.daily.axhline(0, color="tab:orange", linestyle=":",
+                                      label="10th / 90th percentile")
+        self.p90 = self.daily.axhline(0, color="tab:orange", linestyle=":")
+        self.ticks = self.x if length <= 7 else self.x[::3]
+        self.daily.set_xticks(self.ticks)
+        self.daily.set_title("Kicks per day")
+        self.daily.legend(loc="upper left", fontsize=8)
+
+        self.hourly = self.figure.add_subplot(grid[0, 1])
+        self.hour_bars = self.hourly.bar(np.arange(24), np.zeros(24), color="tab:green")
+        self.hourly.set_xticks(np.arange(0, 24, 3))
+        self.hourly.set_xlabel("Hour of day")
+        self.hourly.set_title("Average kicks per hour")
+
+        summary = self.figure.add_subplot(grid[1, :])
+        summary.axis("off")
+        self.text = summary.text(0, 1, "", va="top", fontsize=12, linespacing=1.8)
+
+    def draw(self, stats):
+        self.title.set_text(f"{stats['title']}  ·  {stats['first']} – {stats['last']}")
+        values = np.nan_to_num(np.array(stats["daily"]))
+        for bar, value in zip(self.day_bars, values):
+            bar.set_height(value)
+        for line, value in ((self.median, stats["p50"]), (self.p10, stats["p10"]),
+                            (self.p90, stats["p90"])):
+            line.set_ydata([value, value])
+        self.daily.set_ylim(0, max(values.max(), stats["p90"]) * 1.1 or 1)
+        days = [stats["days"][i] for i in self.ticks]
+        if stats["period"] == "week":
+            labels = [f"{WEEKDAYS[(day - 1) % 7]}\n{day_to_date(day)[5:]}" for day in days]
+        else:
+            labels = [day_to_date(day)[8:] for day in days]
+        self.daily.set_xticklabels(labels, fontsize=8)
+
+        for bar, value in zip(self.hour_bars, stats["hourly"]):
+            bar.set_height(value)
+        self.hourly.set_ylim(0, max(stats["hourly"]) * 1.1 or 1)
+
+        trend = stats["trend"]
+        self.text.set_text("\n".join([
+            f"Total kicks: {stats['total']}    Days recorded: {stats['recorded_days']}"
+            f"    Average per recorded day: {stats['mean']:.1f}",
+            f"Daily totals: 10th percentile {stats['p10']:.0f}, median {stats['p50']:.0f}, "
+            f"90th percentile {stats['p90']:.0f}    Most active hour: "
+            f"{stats['peak_hour']:02d}:00–{stats['peak_hour'] + 1:02d}:00",
+            "Trend: no previous period" if trend is None else
+            f"Trend: {trend:+.0%} average per day compared with the previous {stats['period']}",
+        ]))
+        return self.figure
+
+
+def _period_figure(stats):
+    """One period's page, on this process's figure for its number of days."""
+    length = len(stats["days"])
+    page = _pages.get(length)
+    if page is None:
+        page = _pages[length] = _PeriodPage(length)
+    return page.draw(stats)
+
+
+def _render_period(stats):
+    """One period's page as PNG bytes."""
+    return _png(_period_figure(stats))
+
+
+def _summary_figure(reports):
+    """The overview page: average and spread of daily totals per period."""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=PAGE_SIZE, dpi=DPI)
+    ax = figure.add_subplot()
+    figure.subplots_adjust(left=0.06, right=0.97, top=0.9, bottom=0.15)
+    x = np.arange(len(reports))
+    p50 = np.array([r["p50"] for r in reports])
+    ax.bar(x, [r["mean"] for r in reports], color="tab:blue", label="average per day")
+    ax.errorbar(x, p50, fmt="o", color="tab:orange", label="median, 10th–90th percentile",
+                yerr=[p50 - [r["p10"] for r in reports], [r["p90"] for r in reports] - p50])
+    step = max(1, len(reports) // 20)
+    ax.set_xticks(x[::step])
+    ax.set_xticklabels([r["title"] for r in reports][::step], rotation=30, ha="right")
+    ax.set_ylabel("Kicks per day")
+    ax.legend(loc="upper left")
+    figure.suptitle(f"Daily kicks per {reports[0]['period']}  ·  "
+                    f"{reports[0]['first']} – {reports[-1]['last']}", fontsize=16)
+    return figure
+
+
+def _render_summary(reports):
+    """The overview page as PNG bytes."""
+    return _png(_summary_figure(reports))
+
+
+def _write_pdf(path, reports):
+    """All pages into one PDF, as vector graphics."""
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(path) as pdf:
+        pdf.savefig(_summary_figure(reports))
+        for stats in reports:
+            pdf.savefig(_period_figure(stats))
+
+
+def render(reports, out, fmt="png", workers=None):
+    """
+    Render a summary page and one page per period of compute()'s output.
+    For "png", out is a directory that gets summary.png and one file per
+    period, named after its first day and title, rendered with `workers`
+    processes (default: one per CPU); for "pdf", one file with all pages,
+    drawn in this process. Returns the paths written.
+    """
+    if fmt not in ("png", "pdf"):
+        raise ValueError(f"Unsupported report format: {fmt}")
+    if not reports:
+        raise ValueError("No records in the report range")
+    if fmt == "pdf":
+        _write_pdf(out, reports)
+        return [out]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker()
+        summary = _render_summary(reports)
+        pages = [_render_period(r) for r in reports]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            pending = pool.submit(_render_summary, reports)
+            # a few chunks per worker: each chunk reuses that worker's figure
+            chunk = max(1, len(reports) // (workers * 4))
+            pages = list(pool.map(_render_period, reports, chunksize=chunk))
+            summary = pending.result()
+
+    os.makedirs(out, exist_ok=True)
+    paths = []
+    # weeks of different pregnancies can share a title; the first day tells them apart
+    for name, png in [("summary", summary)] + [
+            (f"{r['first']}_{r['title'].lower().replace(' ', '-')}", page)
+            for r, page in zip(reports, pages)]:
+        path = os.path.join(out, f"{name}.png")
+        with open(path, "wb") as f:
+            f.write(png)
+        paths.append(path)
+    return paths
+
+
+def build(out, period="week", fmt=None, start_date=None, end_date=None, workers=None):
+    """compute() then render(); fmt defaults to "pdf" for a .pdf path."""
+    fmt = fmt or ("pdf" if out.lower().endswith(".pdf") else "png")
+    return render(compute(start_date, end_date, period), out, fmt, workers)
@@ -0,0 +1,272 @@
+"""
+Local HTTP/JSON ingestion API, for companion devices that capture kicks
+away from the desktop form.
+
+    python cli.py serve [--host 127.0.0.1] [--port 8765]
+
+    POST /kicks    one event object, a JSON array of them, or {"events": [...]}
+    GET  /health   {"status": "ok"}
+
+An event has the same fields as an imported row: "date" (YYYY-MM-DD),
+"time" (HH:MM), optional "kicks", "comment" and "added_at", plus an
+optional "idempotency_key" (for a single event also accepted as the
+Idempotency-Key header). A retried event with a key it was first stored
+under is answered from the ingest_keys table instead of being added
+again.
+
+Every event gets a result, in order:
+
+    {"status": "created", "id": 12}
+    {"status": "replayed", "id": 12}     same key as an earlier request
+    {"status": "exists", "id": 7}        that date and time is taken
+    {"status": "archived", "id": null}   that date is in an archive (archive.py)
+    {"status": "invalid", "error": "Invalid time: '25:00' ..."}
+
+A single event is answered with its result (201 Created, 200, 409 for
+an archived date or 422 for an invalid one), a batch with {"results": [...]}.
+
+Events are validated on the event loop, and each request's events are
+stored by database.ingest_records on a write queue (writer.py), which
+group-commits concurrent requests in shared transactions. The
+desktop app can keep using the same file: WAL lets it read throughout,
+and each batch holds the write lock only for one short transaction. If
+the database stays locked (see SQLite's busy timeout), the request gets
+503 and can be retried with the same keys.
+"""
+import asyncio
+import json
+import sqlite3
+from datetime import datetime
+
+import database
+from models import normalize_record
+from writer import WriteQueue
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_EVENTS = 5000
+# concurrent requests already queue up while a group commits, so the
+# write queue need not hold the first one back
+WRITE_DELAY_MS = 0
+MAX_BODY = 4 * 1024 * 1024
+MAX_KEY_LENGTH = 200
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large",
+    422: "Unprocessable Entity", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_event(obj, key=None):
+    """
+    (key, day, minute, kicks, comment, added_at) for one event object.
+    Raises ValueError with a client-facing message on bad input.
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("An event must be a JSON object")
+    key = obj.get("idempotency_key", key)
+    if key is not None:
+        if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise ValueError(f"idempotency_key must be a string of 1 to {MAX_KEY_LENGTH} characters")
+    if obj.get("date") is None or obj.get("time") is None:
+        raise ValueError("date and time are required")
+    if not isinstance(obj["date"], str) or not isinstance(obj["time"], str):
+        raise ValueError("date and time must be strings (YYYY-MM-DD and HH:MM)")
+    comment = obj.get("comment")
+    if comment is not None and not isinstance(comment, str):
+        raise ValueError("comment must be a string")
+    day, minute, kicks, comment = normalize_record(
+        obj["date"], obj["time"], obj.get("kicks"), comment
+    )
+    added_at = obj.get("added_at")
+    if added_at is None:
+        added_at = datetime.now().isoformat(timespec="seconds")
+    else:
+        try:
+            added_at = datetime.fromisoformat(str(added_at)).isoformat(timespec="seconds")
+        except ValueError:
+            raise ValueError(f"Invalid added_at: {added_at!r} (expected ISO 8601)") from None
+    return key, day, minute, kicks, comment, added_at
+
+
+class IngestServer:
+    """
+    The ingestion API on host:port. Use as
+
+        server = IngestServer(port=0)   # 0: any free port, see .port
+        await server.start()
+        ...
+        await server.close()
+    """
+    def __init__(self, host=HOST, port=PORT):
+        self.host = host
+        self.port = port
+        self._server = None
+        self._writes = None
+        self._clients = set()
+
+    async def start(self):
+        self._writes = WriteQueue(max_delay_ms=WRITE_DELAY_MS)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections and let queued events be written."""
+        self._server.close()
+        await self._server.wait_closed()
+        # idle keep-alive connections see end of input and finish
+        for writer in list(self._clients):
+            writer.close()
+        while self._clients:
+            await asyncio.sleep(0.01)
+        await asyncio.get_running_loop().run_in_executor(None, self._writes.close)
+
+    async def ingest(self, events):
+        """Store normalized events; returns their (status, record_id) results."""
+        return await asyncio.wrap_future(
+            self._writes.submit(database.ingest_records, events))
+
+    # -- HTTP ----------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                try:
+                    status, payload = await self._route(method, path, headers, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            # unreadable request: answer once, then drop the connection
+            _write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _route(self, method, path, headers, body):
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Use GET")
+            return 200, {"status": "ok"}
+        if path != "/kicks":
+            raise HTTPError(404, f"No such endpoint: {path}")
+        if method != "POST":
+            raise HTTPError(405, "Use POST")
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}") from None
+
+        single = isinstance(data, dict) and "events" not in data
+        if single:
+            items = [data]
+        else:
+            items = data["events"] if isinstance(data, dict) else data
+            if not isinstance(items, list):
+                raise HTTPError(400, "Expected an event object or a list of events")
+        if len(items) > MAX_EVENTS:
+            raise HTTPError(413, f"At most {MAX_EVENTS} events per request")
+
+        results = [None] * len(items)
+        valid = []
+        for i, item in enumerate(items):
+            try:
+                event = parse_event(item, headers.get("idempotency-key") if single else None)
+            except ValueError as e:
+                results[i] = {"status": "invalid", "error": str(e)}
+            else:
+                valid.append((i, event))
+        if valid:
+            try:
+                stored = await self.ingest([event for _, event in valid])
+            except sqlite3.OperationalError as e:
+                raise HTTPError(503, f"Database busy, retry later: {e}") from None
+            for (i, _), (status, record_id) in zip(valid, stored):
+                results[i] = {"status": status, "id": record_id}
+
+        if single:
+            result = results[0]
+            code = {"created": 201, "archived": 409, "invalid": 422}.get(result["status"], 200)
+            return code, result
+        return 200, {"results": results}
+
+
+async def _read_request(reader):
+    """(method, path, headers, body), or None once the client hangs up."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length") from None
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, f"Request body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+        + body
+    )
+
+
+def serve(host=HOST, port=PORT):
+    """Run the API until interrupted."""
+    async def main():
+        server = IngestServer(host, port)
+        await server.start()
+        print(f"Listening on http://{server.host}:{server.port}/kicks")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,147 @@
+"""
+Kick-counting sessions: every tap, with millisecond timestamps.
+
+A session keeps its taps in memory as millisecond offsets from its
+start. When it ends, save() stores them as one packed BLOB in
+kick_sessions: the gaps between taps as little-endian uint32, which
+decode with a single cumulative sum. That is 4 bytes per tap, however
+many there are. The session's summary (number of kicks, time to
+TARGET_KICKS, inter-kick intervals), computed with NumPy, goes into the
+kicks table as an ordinary record at the session's start time, so lists,
+charts, reports and alerts count it like any other.
+
+    session = Session()
+    session.tap(); session.tap(); ...
+    record, session_id = get_writer().submit(save, session).result()
+"""
+import time
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+import database
+
+# "count to ten"
+TARGET_KICKS = 10
+TAP_DTYPE = np.dtype("<u4")
+
+
+def encode(offsets):
+    """Delta-encoded uint32 BLOB of ascending millisecond offsets."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    deltas = np.diff(offsets, prepend=0)
+    if len(deltas) and (deltas.min() < 0 or deltas.max() > np.iinfo(TAP_DTYPE).max):
+        raise ValueError("Tap offsets must be ascending and at most ~49 days apart")
+    return deltas.astype(TAP_DTYPE).tobytes()
+
+
+def decode(blob):
+    """Millisecond offsets of the taps stored by encode()."""
+    return np.cumsum(np.frombuffer(blob, dtype=TAP_DTYPE), dtype=np.int64)
+
+
+def summarize(offsets, duration_ms=None, target=TARGET_KICKS):
+    """
+    Statistics of one session's tap offsets (ms): taps, duration_ms (the
+    given one, else up to the last tap), time_to_target_ms (None if
+    fewer than target taps), and the inter-kick interval mean, median,
+    shortest and longest in ms (None with fewer than two taps).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    intervals = np.diff(offsets)
+    if duration_ms is None:
+        duration_ms = offsets[-1] if len(offsets) else 0
+    stats = {
+        "taps": len(offsets),
+        "duration_ms": int(duration_ms),
+        "time_to_target_ms": int(offsets[target - 1]) if len(offsets) >= target else None,
+    }
+    if len(intervals):
+        stats.update(
+            interval_mean_ms=float(intervals.mean()),
+            interval_median_ms=float(np.median(intervals)),
+            interval_min_ms=int(intervals.min()),
+            interval_max_ms=int(intervals.max()),
+        )
+    else:
+        stats.update(interval_mean_ms=None, interval_median_ms=None,
+                     interval_min_ms=None, interval_max_ms=None)
+    return stats
+
+
+def format_duration(ms):
+    """'M:SS' (or 'H:MM:SS') for a number of milliseconds."""
+    minutes, seconds = divmod(round(ms / 1000), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def describe(stats, target=TARGET_KICKS):
+    """One-line summary for the comment of the session's record."""
+    parts = [f"Session: {stats['taps']} kicks in {format_duration(stats['duration_ms'])}"]
+    if stats["time_to_target_ms"] is not None:
+        parts.append(f"{target} kicks in {format_duration(stats['time_to_target_ms'])}")
+    if stats["interval_median_ms"] is not None:
+        parts.append(f"median interval {stats['interval_median_ms'] / 1000:.1f} s")
+    return ", ".join(parts)
+
+
+class Session:
+    """
+    Taps of one running session, buffered in memory. Times come from the
+    monotonic clock, so changing the system clock mid-session does not
+    distort the intervals.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start_ns = time.monotonic_ns()
+        self.offsets = array("q")
+        self.ended_ms = None
+
+    def elapsed_ms(self):
+        if self.ended_ms is not None:
+            return self.ended_ms
+        return (time.monotonic_ns() - self._start_ns) // 1_000_000
+
+    def tap(self):
+        """Record a kick now; returns the number of taps so far."""
+        self.offsets.append(self.elapsed_ms())
+        return len(self.offsets)
+
+    def undo(self):
+        """Drop the last tap, e.g. a double press."""
+        if self.offsets:
+            self.offsets.pop()
+
+    def end(self):
+        if self.ended_ms is None:
+            self.ended_ms = self.elapsed_ms()
+
+    def summary(self):
+        return summarize(self.offsets, self.elapsed_ms())
+
+
+def save(session, comment=""):
+    """
+    Store an ended session and its summary record in one transaction;
+    returns (KickRecord or None, session id) as database.insert_session.
+    """
+    session.end()
+    stats = session.summary()
+    text = describe(stats)
+    if comment.strip():
+        text = f"{comment.strip()} ({text})"
+    return database.insert_session(
+        session.started_at, stats, encode(session.offsets), text,
+    )
+
+
+def load(session_id):
+    """(started_at, record_id, tap offsets in ms) of a stored session, or None."""
+    row = database.get_session(session_id)
+    if row is None:
+        return None
+    started_at, record_id, blob = row
+    return started_at, record_id, decode(blob)
@@ -1,10 +1,27 @@
+from datetime import date
+
 # simple in-memory settings
 settings = {
     "pregnancy_start_date": "2024-11-02"
 }
 
+# day ordinal of the start date, parsed once per change
+_start_ordinal = None
+
 def set_pregnancy_start_date(new_date_str):
+    global _start_ordinal
     settings["pregnancy_start_date"] = new_date_str
+    _start_ordinal = None
 
 def get_pregnancy_start_date():
     return settings["pregnancy_start_date"]
+
+def get_pregnancy_start_ordinal():
+    """date.toordinal() of the pregnancy start date, or None if invalid."""
+    global _start_ordinal
+    if _start_ordinal is None:
+        try:
+            _start_ordinal = date.fromisoformat(get_pregnancy_start_date()).toordinal()
+        except (TypeError, ValueError):
+            return None
+    return _start_ordinal
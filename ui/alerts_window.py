@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
-from datetime import datetime
-import database
+import anomaly
+from ui.background import get_executor, set_busy, show_error
 
 class AlertsWindow(tk.Toplevel):
     """Window for anomaly detection alerts."""
@@ -21,17 +21,28 @@ class AlertsWindow(tk.Toplevel):
                   font=("Segoe UI", 14, "bold")
         ).grid(row=0, column=0, pady=(0,10))
 
-        today = datetime.today().strftime("%Y-%m-%d")
-        records = database.get_records_between_dates(today, today)
+        self.status = ttk.Label(frame, text="Checking today's records…", justify="center")
+        self.status.grid(row=1, column=0, pady=(0,10))
 
-        if not records:
-            msg, color = "⚠️ No records today!\nPlease check baby activity.", "red"
-        else:
-            msg, color = f"✅ {len(records)} record(s) today.\nAll good.", "green"
+        self.update()
+        self.minsize(self.winfo_width(), self.winfo_height())
 
-        ttk.Label(frame, text=msg, foreground=color).grid(
-            row=1, column=0, pady=(0,10)
+        set_busy(self, True)
+        get_executor().submit(
+            self, anomaly.check, on_done=self._show_result, on_error=self._failed
         )
 
-        self.update()
-        self.minsize(self.winfo_width(), self.winfo_height())
+    def _failed(self, exc):
+        set_busy(self, False)
+        show_error(exc)
+
+    def _show_result(self, alerts):
+        set_busy(self, False)
+        warnings = [a.message for a in alerts if a.level == "warning"]
+        if warnings:
+            msg = "\n\n".join(f"⚠️ {m}" for m in warnings)
+            color = "red"
+        else:
+            msg, color = f"✅ {alerts[0].message}", "green"
+
+        self.status.configure(text=msg, foreground=color)
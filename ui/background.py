@@ -0,0 +1,120 @@
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+import instrumentation
+from writer import get_writer
+
+# how often the Tk loop checks for finished background work
+POLL_MS = 15
+
+
+def show_error(exc):
+    """Default error handler: report the failure in a dialog."""
+    messagebox.showerror("Error", str(exc))
+
+
+def watch(widget, future, on_done=None, on_error=None, is_current=None):
+    """
+    Deliver the outcome of a concurrent.futures.Future on the Tk thread.
+
+    The future is polled with after() on the root window, so the Tk loop
+    never blocks. on_done(result) or on_error(exception) runs once the
+    future finishes, unless it was cancelled, is_current() returns False
+    (a newer request superseded it), or widget was destroyed meanwhile.
+    """
+    root = widget.nametowidget(".")
+    on_error = on_error or show_error
+
+    def poll():
+        if not future.done():
+            root.after(POLL_MS, poll)
+            return
+        if future.cancelled() or (is_current is not None and not is_current()):
+            return
+        try:
+            if not widget.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        exc = future.exception()
+        if exc is not None:
+            on_error(exc)
+        elif on_done is not None:
+            on_done(future.result())
+
+    root.after(POLL_MS, poll)
+
+
+class BackgroundExecutor:
+    """
+    Runs database work on worker threads (each with its own SQLite
+    connection, see connection.py) and hands results back to the Tk
+    thread through watch().
+
+    Requests submitted with the same key supersede each other: a pending
+    older request is cancelled, and the result of one that already
+    started is dropped.
+    """
+    def __init__(self, max_workers=1, name="db"):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def submit(self, widget, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """Run fn(*args, **kwargs) in the background; returns the Future."""
+        future = self._pool.submit(instrumentation.job(fn), *args, **kwargs)
+        is_current = None
+        if key is not None:
+            with self._lock:
+                previous = self._latest.get(key)
+                self._latest[key] = future
+            if previous is not None:
+                previous.cancel()
+
+            def is_current():
+                with self._lock:
+                    if self._latest.get(key) is not future:
+                        return False
+                    del self._latest[key]
+                    return True
+
+        watch(widget, future, on_done, on_error, is_current)
+        return future
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executors = {}
+
+
+def get_executor(name="db"):
+    """
+    The shared executor used by all windows for database queries. Long
+    jobs such as exports use their own name, so they never hold up the
+    queries behind them.
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        executor = _executors[name] = BackgroundExecutor(name=name)
+    return executor
+
+
+def submit_write(widget, fn, *args, on_done=None, on_error=None, **kwargs):
+    """
+    Queue fn(*args, **kwargs) on the shared write queue (writer.py), which
+    group-commits it with other writes, and deliver the outcome on the Tk
+    thread like BackgroundExecutor.submit(). Returns the Future.
+    """
+    future = get_writer().submit(instrumentation.job(fn), *args, **kwargs)
+    watch(widget, future, on_done, on_error)
+    return future
+
+
+def set_busy(widget, busy):
+    """Show or clear the wait cursor on a window while it loads."""
+    try:
+        widget.configure(cursor="watch" if busy else "")
+    except tk.TclError:
+        pass
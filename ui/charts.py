@@ -0,0 +1,138 @@
+"""
+Embedded, reusable matplotlib charts for RecordsWindow.
+
+Each chart owns one Figure drawn through FigureCanvasTkAgg. Refreshing
+a chart swaps the data of its existing artists (set_verts / set_data)
+instead of building a new figure. Long ranges are binned by week or
+month (columnar.choose_bin), and tick locators cap the number of labels,
+so a redraw costs the same whatever the range.
+"""
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+from columnar import bin_end, choose_bin, rebin
+from models import day_to_date
+
+MAX_TICKS = 10
+BIN_TITLES = {"day": "per Day", "week": "per Week", "month": "per Month"}
+
+
+def _date_label(ordinal):
+    try:
+        return day_to_date(int(ordinal))
+    except (ValueError, OverflowError):
+        return ""
+
+
+class _EmbeddedChart:
+    """A Figure with one Axes, embedded in a Tk container."""
+
+    def __init__(self, master):
+        self.figure = Figure(figsize=(9, 4), dpi=100)
+        self.figure.subplots_adjust(left=0.08, right=0.97, top=0.9, bottom=0.2)
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.empty_text = self.ax.text(
+            0.5, 0.5, "No records to display.", transform=self.ax.transAxes,
+            ha="center", va="center", visible=False,
+        )
+
+    def _set_empty(self, empty):
+        self.empty_text.set_visible(empty)
+        if empty:
+            self.canvas.draw_idle()
+
+
+class DailyChart(_EmbeddedChart):
+    """Bar chart of total kicks per day, week or month."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.bars = PolyCollection([], facecolors="tab:blue")
+        self.ax.add_collection(self.bars)
+        self.ax.set_xlabel("Date")
+        self.ax.set_ylabel("Number of Kicks")
+        self.ax.xaxis.set_major_locator(MaxNLocator(nbins=MAX_TICKS, integer=True))
+        self.ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: _date_label(x)))
+        self.ax.tick_params(axis="x", labelrotation=30)
+
+    def update(self, days, totals):
+        """Show (days, totals) as returned by KickSnapshot.daily_totals."""
+        if not len(days):
+            self.bars.set_verts([])
+            self._set_empty(True)
+            return
+        self._set_empty(False)
+        width = choose_bin(days[0], days[-1])
+        starts, heights = rebin(days, totals, width)
+        ends = bin_end(starts, width)
+
+        # one rectangle per bin, built for all bins at once
+        left = starts + 0.1 * (ends - starts)
+        right = ends - 0.1 * (ends - starts)
+        zero = np.zeros(len(starts))
+        verts = np.stack([
+            np.column_stack((left, zero)),
+            np.column_stack((left, heights)),
+            np.column_stack((right, heights)),
+            np.column_stack((right, zero)),
+        ], axis=1)
+        self.bars.set_verts(verts)
+
+        self.ax.set_xlim(starts[0], ends[-1])
+        self.ax.set_ylim(0, max(int(heights.max()), 1) * 1.05)
+        self.ax.set_title(f"Baby Kicks {BIN_TITLES[width]}")
+        self.canvas.draw_idle()
+
+
+class HeatmapChart(_EmbeddedChart):
+    """Kicks by hour of day (rows) against day, week or month (columns)."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.starts = np.empty(0, np.int64)
+        self.image = self.ax.imshow(
+            np.zeros((24, 1)), aspect="auto", origin="upper",
+            cmap="YlOrRd", vmin=0, vmax=1, interpolation="nearest",
+        )
+        self.figure.colorbar(self.image, ax=self.ax, label="Number of Kicks")
+        self.ax.set_yticks(range(0, 24, 2))
+        self.ax.set_yticklabels([f"{h:02d}:00" for h in range(0, 24, 2)])
+        self.ax.set_xlabel("Date")
+        self.ax.set_ylabel("Hour of Day")
+        # x runs over column indexes; label each tick with its bin's start date
+        self.ax.xaxis.set_major_locator(MaxNLocator(nbins=MAX_TICKS, integer=True))
+        self.ax.xaxis.set_major_formatter(FuncFormatter(self._column_label))
+        self.ax.tick_params(axis="x", labelrotation=30)
+
+    def _column_label(self, x, _):
+        col = int(round(x))
+        if 0 <= col < len(self.starts):
+            return _date_label(self.starts[col])
+        return ""
+
+    def update(self, days, matrix):
+        """Show (days, 24 x n matrix) as returned by KickSnapshot.hourly_matrix."""
+        if not len(days):
+            self.image.set_data(np.zeros((24, 1)))
+            self.starts = np.empty(0, np.int64)
+            self._set_empty(True)
+            return
+        self._set_empty(False)
+        # spread over every day of the range so empty days show as gaps
+        first = int(days[0])
+        all_days = np.arange(first, int(days[-1]) + 1)
+        dense = np.zeros((24, len(all_days)), dtype=matrix.dtype)
+        dense[:, np.asarray(days) - first] = matrix
+
+        width = choose_bin(all_days[0], all_days[-1])
+        self.starts, binned = rebin(all_days, dense, width)
+        self.image.set_data(binned)
+        self.image.set_extent((-0.5, len(self.starts) - 0.5, 23.5, -0.5))
+        self.image.set_clim(0, max(int(binned.max()), 1))
+        self.ax.set_xlim(-0.5, len(self.starts) - 0.5)
+        self.ax.set_title(f"Baby Kicks Heatmap ({BIN_TITLES[width].lower()})")
+        self.canvas.draw_idle()
@@ -0,0 +1,91 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import cache
+import instrumentation
+
+# how often the open window re-reads the samples
+REFRESH_MS = 1000
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    """Latency percentiles of SQL statements, database calls and UI actions."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.geometry("900x420")
+
+        top = ttk.Frame(self, padding=10)
+        top.pack(fill="x")
+        self.toggle_btn = ttk.Button(top, command=self.toggle)
+        self.toggle_btn.grid(row=0, column=0, padx=(0,5))
+        ttk.Button(top, text="Clear", command=self.clear).grid(row=0, column=1, padx=(0,5))
+        ttk.Button(top, text="Save JSON…", command=self.save).grid(row=0, column=2)
+        self.status = ttk.Label(top)
+        self.status.grid(row=0, column=3, padx=(15,0))
+
+        frame = ttk.Frame(self, padding=(10,0,10,10))
+        frame.pack(fill="both", expand=True)
+        cols = ("Kind", "Name", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms")
+        self.tree = ttk.Treeview(frame, columns=cols, show="headings")
+        widths = [50, 460, 60, 70, 70, 70, 70]
+        for c, w in zip(cols, widths):
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=w, anchor="w" if c == "Name" else "center")
+        vsb = ttk.Scrollbar(frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        vsb.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+
+        self._refresh_job = None
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the table from the ring buffer, then again in REFRESH_MS."""
+        self._show_state()
+        rows = instrumentation.summary()
+        hits = cache.stats()
+        self.status.configure(
+            text=f"{'Recording' if instrumentation.ENABLED else 'Not recording'} · "
+                 f"{sum(r['count'] for r in rows)} sample(s), "
+                 f"last {instrumentation.RING_SIZE} kept · "
+                 f"cache {hits['hits']} hit(s), {hits['misses']} miss(es), "
+                 f"{hits['bytes'] / 1024:.0f} KiB"
+        )
+        self.tree.delete(*self.tree.get_children())
+        for r in rows:
+            self.tree.insert("", "end", values=(
+                r["kind"], r["name"], r["count"],
+                f"{r['p50']:.2f}", f"{r['p95']:.2f}", f"{r['p99']:.2f}", f"{r['max']:.2f}",
+            ))
+        self._refresh_job = self.after(REFRESH_MS, self.refresh)
+
+    def destroy(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
+
+    def _show_state(self):
+        self.toggle_btn.configure(
+            text="⏸ Stop Recording" if instrumentation.ENABLED else "⏺ Start Recording"
+        )
+
+    def toggle(self):
+        if instrumentation.ENABLED:
+            instrumentation.disable()
+        else:
+            instrumentation.enable()
+        self._show_state()
+
+    def clear(self):
+        instrumentation.clear()
+
+    def save(self):
+        """Dump the samples, percentiles and histograms to a JSON file."""
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Save Diagnostics", defaultextension=".json",
+            filetypes=[("JSON", "*.json")],
+        )
+        if path:
+            instrumentation.dump(path)
+            messagebox.showinfo("Diagnostics", f"Saved to\n{path}", parent=self)
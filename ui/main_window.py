@@ -2,12 +2,46 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 from tkcalendar import DateEntry
 from datetime import datetime
-from ui.records_window import RecordsWindow
-from ui.settings_window import SettingsWindow
-from ui.alerts_window import AlertsWindow
+import importlib
+import threading
+import time
 import database
+from instrumentation import timed_action
+from models import normalize_record
+from ui.background import set_busy, show_error, submit_write
 from utils import calculate_pregnancy_weeks
 
+# Secondary windows and their heavy dependencies (numpy, matplotlib) are
+# imported on first use so the entry form appears as fast as possible.
+# prewarm() loads them in the background once the form is on screen.
+PREWARM_MODULES = (
+    "ui.records_window",
+    "ui.settings_window",
+    "ui.alerts_window",
+    "ui.session_window",
+    "columnar",
+    "ui.charts",
+)
+
+
+def prewarm(modules=PREWARM_MODULES, on_done=None):
+    """
+    Import modules on a daemon thread. on_done(seconds), if given, is
+    called from that thread when all imports finished.
+    """
+    def run():
+        start = time.perf_counter()
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # the real import on first use will report it
+        if on_done is not None:
+            on_done(time.perf_counter() - start)
+
+    threading.Thread(target=run, name="prewarm", daemon=True).start()
+
+
 class MainWindow(tk.Tk):
     """Main application window for adding baby kick records."""
     def __init__(self):
@@ -86,6 +120,7 @@ class MainWindow(tk.Tk):
         btn_frame.grid(row=6, column=0, columnspan=2, pady=30)
         for idx, (txt, cmd) in enumerate([
             ("➕ Add Record", self.add_record),
+            ("⏱ Session",      self.open_session),
             ("📄 View Records", self.open_records),
             ("⚙️ Settings",     self.open_settings),
             ("🔔 Check Alerts", self.open_alerts),
@@ -93,11 +128,17 @@ class MainWindow(tk.Tk):
             btn = ttk.Button(btn_frame, text=txt, command=cmd)
             btn.grid(row=0, column=idx, padx=5, sticky="we")
             btn_frame.columnconfigure(idx, weight=1)
+            if idx == 0:
+                self.add_btn = btn
+
+        # Latency diagnostics (see instrumentation.py)
+        self.bind_all("<Control-Shift-D>", lambda _: self.open_diagnostics())
 
         # Prevent window from being too small
         self.update()
         self.minsize(self.winfo_width(), self.winfo_height())
 
+    @timed_action
     def add_record(self):
         """Validate inputs and insert a new kick record into the database."""
         date    = self.date_entry.get()
@@ -109,12 +150,32 @@ class MainWindow(tk.Tk):
             messagebox.showwarning("Missing data", "Please fill in Date and Time.")
             return
 
-        if database.record_exists(date, time):
+        try:
+            day, minute, kicks, comment = normalize_record(date, time, kicks, comment)
+        except ValueError as e:
+            messagebox.showwarning("Invalid data", str(e))
+            return
+
+        self.add_btn.configure(state="disabled")
+        set_busy(self, True)
+        submit_write(
+            self, _insert_if_new, day, minute, kicks, comment,
+            on_done=self._record_added, on_error=self._add_failed
+        )
+
+    def _add_failed(self, exc):
+        self.add_btn.configure(state="normal")
+        set_busy(self, False)
+        show_error(exc)
+
+    def _record_added(self, record):
+        self.add_btn.configure(state="normal")
+        set_busy(self, False)
+        if record is None:
             messagebox.showwarning("Duplicate", "A record for this Date and Time already exists.")
             return
 
-        weeks = calculate_pregnancy_weeks(date)
-        database.insert_record(date, time, kicks, comment, weeks)
+        self._show_in_records_windows(record)
         messagebox.showinfo("Success", "Record added!")
 
         # Reset form
@@ -123,14 +184,40 @@ class MainWindow(tk.Tk):
         self.kicks_entry.delete(0, tk.END)
         self.comment_entry.delete("1.0", tk.END)
 
+    def _show_in_records_windows(self, record):
+        # open records windows show the new row without reloading
+        for window in self.winfo_children():
+            if hasattr(window, "records_saved"):
+                window.records_saved([record])
+
+    def open_session(self):
+        """Open a kick-counting session that records every tap."""
+        from ui.session_window import SessionWindow
+        SessionWindow(self, on_save=self._show_in_records_windows)
+
     def open_records(self):
         """Open the records listing window."""
+        from ui.records_window import RecordsWindow
         RecordsWindow(self)
 
     def open_settings(self):
         """Open the settings window."""
+        from ui.settings_window import SettingsWindow
         SettingsWindow(self)
 
+    def open_diagnostics(self):
+        """Open the latency diagnostics window."""
+        from ui.diagnostics_window import DiagnosticsWindow
+        DiagnosticsWindow(self)
+
     def open_alerts(self):
         """Open the alerts/anomaly detection window."""
+        from ui.alerts_window import AlertsWindow
         AlertsWindow(self)
+
+
+def _insert_if_new(day, minute, kicks, comment):
+    """Worker side of MainWindow.add_record: the new record, or None if date+time is taken."""
+    if database.record_exists(day, minute):
+        return None
+    return database.insert_record(day, minute, kicks, comment)
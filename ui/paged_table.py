@@ -0,0 +1,235 @@
+from bisect import bisect
+import database
+from models import parse_date
+from ui.background import get_executor, show_error
+
+PAGE_SIZE = 200
+MAX_PAGES = 5
+# fetch the next/previous page once the view is this close to an edge
+EDGE = 0.1
+
+
+class PagedTable:
+    """
+    Virtualized view of the kicks table in a ttk.Treeview.
+
+    Records are fetched a page at a time with keyset pagination on
+    (day, minute, id) as the view scrolls towards either end. At most
+    MAX_PAGES pages are live in the widget; pages scrolled far out of
+    view are dropped and fetched again if the user comes back.
+
+    Queries run on the background executor. on_loading(True/False) is
+    called around a full (re)load so the window can show its loading
+    state; a new load supersedes any page fetch still in flight.
+
+    After a write, upsert() and remove() patch single items in place so
+    the window does not have to reload.
+    """
+    def __init__(self, tree, scrollbar, page_size=PAGE_SIZE, max_pages=MAX_PAGES,
+                 on_loading=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_items = page_size * max_pages
+        self.on_loading = on_loading
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+
+        # KickRecords by Treeview item id, and item ids by record id
+        self.records = {}
+        self._iids = {}
+        self.total = 0
+        self.start = self.end = None
+        self.descending = False
+        self._more_before = self._more_after = False
+        self._busy = False
+        # show() lists are not ordered by key and never grow
+        self._static = False
+
+    def load(self, start=None, end=None, descending=False):
+        """Show the first page of records in an optional date range."""
+        self.start, self.end, self.descending = start, end, descending
+        self._static = False
+        self._busy = True
+        if self.on_loading is not None:
+            self.on_loading(True)
+        self._submit(self._query_first, self._show_first, start, end, descending)
+
+    def show(self, records, values=None):
+        """
+        Show a fixed list of records, such as search results, without
+        paging. values, if given, is the row shown for each record in
+        place of its display_values().
+        """
+        if values is None:
+            values = [rec.display_values() for rec in records]
+        self.tree.delete(*self.tree.get_children())
+        self.records = {}
+        self._iids = {}
+        for rec, row in zip(records, values):
+            iid = self.tree.insert("", "end", values=row)
+            self.records[iid] = rec
+            self._iids[rec.id] = iid
+        self.total = len(records)
+        self._more_before = self._more_after = False
+        self._busy = False
+        self._static = True
+        self.tree.yview_moveto(0)
+
+    def in_range(self, rec):
+        """Whether rec falls in the date range of the last load()."""
+        if self.start is None or self.end is None:
+            return True
+        return parse_date(self.start) <= rec.day <= parse_date(self.end)
+
+    def upsert(self, rec):
+        """
+        Show an inserted or edited record without reloading: moved to its
+        sorted position if that lies within the live pages, otherwise left
+        to be fetched when the view scrolls there. A record that left the
+        date range is removed. In a show() list it is only updated in place.
+        """
+        iid = self._iids.get(rec.id)
+        if self._static:
+            if iid is not None:
+                self.records[iid] = rec
+                self.tree.item(iid, values=rec.display_values())
+            return
+        if not self.in_range(rec):
+            self.remove([rec.id])
+            return
+        if iid is None:
+            self.total += 1
+        items = [i for i in self.tree.get_children() if i != iid]
+        index = bisect([self._sort_key(self.records[i]) for i in items], self._sort_key(rec))
+        if (index == 0 and self._more_before) or (index == len(items) and self._more_after):
+            if iid is not None:
+                self._drop([iid])
+            return
+        if iid is None:
+            self._append([rec], index)
+        else:
+            # move keeps the item id, and with it the selection
+            self.records[iid] = rec
+            self.tree.move(iid, "", index)
+            self.tree.item(iid, values=rec.display_values())
+
+    def remove(self, record_ids):
+        """Remove the live items of deleted records and count them off the total."""
+        iids = [self._iids[i] for i in record_ids if i in self._iids]
+        self._drop(iids)
+        self.total -= len(iids)
+
+    @staticmethod
+    def _key(rec):
+        return (rec.day, rec.minute, rec.id)
+
+    def _sort_key(self, rec):
+        # increasing in display order
+        if self.descending:
+            return (-rec.day, -rec.minute, -rec.id)
+        return self._key(rec)
+
+    def _submit(self, query, on_done, *args):
+        get_executor().submit(self.tree, query, *args,
+                              on_done=on_done, on_error=self._failed, key=self)
+
+    def _failed(self, exc):
+        self._busy = False
+        if self.on_loading is not None:
+            self.on_loading(False)
+        show_error(exc)
+
+    # -- worker thread -------------------------------------------------
+
+    def _query_first(self, start, end, descending):
+        total = database.count_records(start, end)
+        rows = database.get_records_page(start, end, limit=self.page_size,
+                                         descending=descending)
+        return total, rows
+
+    def _query_page(self, start, end, after, descending):
+        return database.get_records_page(start, end, after=after,
+                                         limit=self.page_size, descending=descending)
+
+    # -- Tk thread -----------------------------------------------------
+
+    def _show_first(self, result):
+        self.total, rows = result
+        self.tree.delete(*self.tree.get_children())
+        self.records = {}
+        self._iids = {}
+        self._append(rows)
+        self._more_before = False
+        self._more_after = len(rows) == self.page_size
+        self.tree.yview_moveto(0)
+        self._busy = False
+        if self.on_loading is not None:
+            self.on_loading(False)
+
+    def _append(self, rows, index="end"):
+        for rec in rows:
+            iid = self.tree.insert("", index, values=rec.display_values())
+            self.records[iid] = rec
+            self._iids[rec.id] = iid
+            if index != "end":
+                index += 1
+
+    def _drop(self, iids):
+        self.tree.delete(*iids)
+        for iid in iids:
+            del self._iids[self.records.pop(iid).id]
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # (0, 1): everything fits, or the widget is not mapped yet
+        if self._busy or (float(first) <= 0 and float(last) >= 1):
+            return
+        items = self.tree.get_children()
+        if not items:
+            return
+        if float(last) >= 1 - EDGE and self._more_after:
+            self._busy = True
+            self._submit(self._query_page, self._show_next, self.start, self.end,
+                         self._key(self.records[items[-1]]), self.descending)
+        elif float(first) <= EDGE and self._more_before:
+            # walk backwards from the first item
+            self._busy = True
+            self._submit(self._query_page, self._show_previous, self.start, self.end,
+                         self._key(self.records[items[0]]), not self.descending)
+
+    def _top_index(self, count):
+        return round(float(self.tree.yview()[0]) * count)
+
+    def _show_next(self, rows):
+        """Append the page after the last live item; trim the top if needed."""
+        self._busy = False
+        self._more_after = len(rows) == self.page_size
+        items = self.tree.get_children()
+        if not rows or not items:
+            return
+        top = self._top_index(len(items))
+        self._append(rows)
+        overflow = len(items) + len(rows) - self.max_items
+        if overflow > 0:
+            self._drop(items[:overflow])
+            self._more_before = True
+            top -= overflow
+        count = len(self.records)
+        self.tree.yview_moveto(max(top, 0) / count)
+
+    def _show_previous(self, rows):
+        """Prepend the page before the first live item; trim the bottom if needed."""
+        self._busy = False
+        self._more_before = len(rows) == self.page_size
+        items = self.tree.get_children()
+        if not rows or not items:
+            return
+        rows.reverse()  # restore display order
+        top = self._top_index(len(items))
+        self._append(rows, index=0)
+        overflow = len(items) + len(rows) - self.max_items
+        if overflow > 0:
+            self._drop(items[len(items) - overflow:])
+            self._more_after = True
+        count = len(self.records)
+        self.tree.yview_moveto((top + len(rows)) / count)
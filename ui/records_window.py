@@ -1,11 +1,24 @@
+import sqlite3
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
-from collections import defaultdict
-import numpy as np
-import matplotlib.pyplot as plt
 import database
-from utils import calculate_pregnancy_weeks
+from instrumentation import timed_action
+from models import parse_date
+from ui.background import get_executor, set_busy, show_error, submit_write
+from ui.paged_table import PagedTable
+
+# wait this long after the last keystroke before searching
+SEARCH_DELAY_MS = 250
+# how often the export progress shown in the window is updated
+EXPORT_PROGRESS_MS = 200
+
+EXPORT_FILETYPES = [
+    ("CSV", "*.csv"),
+    ("CSV, gzip", "*.csv.gz"),
+    ("JSON Lines", "*.jsonl"),
+    ("JSON Lines, gzip", "*.jsonl.gz"),
+]
 
 class RecordsWindow(tk.Toplevel):
     """Window to view, filter, chart, edit and delete kick records."""
@@ -31,13 +44,30 @@ class RecordsWindow(tk.Toplevel):
         ttk.Button(filter_frame, text="Filter",        command=self.load_records).grid(row=0, column=4, padx=(0,5))
         ttk.Button(filter_frame, text="Show Chart",    command=self.show_chart).grid(row=0, column=5, padx=(0,5))
         ttk.Button(filter_frame, text="Show Heatmap",  command=self.show_heatmap).grid(row=0, column=6)
+        self.export_btn = ttk.Button(filter_frame, text="Export…", command=self.export_records)
+        self.export_btn.grid(row=0, column=7, padx=(15,0))
+
+        ttk.Label(filter_frame, text="Search:").grid(row=1, column=0, padx=(0,5), pady=(8,0))
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(filter_frame, textvariable=self.search_var)
+        search_entry.grid(row=1, column=1, columnspan=7, sticky="we", pady=(8,0))
+        filter_frame.columnconfigure(6, weight=1)
+        self._search_job = None
+        self.search_var.trace_add("write", self._on_search_typed)
+
+        # Records table plus chart tabs that are created on first use
+        self.notebook = ttk.Notebook(self, padding=(10,0,10,10))
+        self.notebook.pack(fill="both", expand=True)
+        self.charts = {}
 
         # Table
-        table_frame = ttk.Frame(self, padding=(10,0,10,10))
-        table_frame.pack(fill="both", expand=True)
+        table_frame = ttk.Frame(self.notebook)
+        self.notebook.add(table_frame, text="Records")
 
         cols = ("ID","Date","Time","Kicks","Comment","Weeks","Added At")
-        self.tree = ttk.Treeview(table_frame, columns=cols, show="headings")
+        # ctrl/shift-click selects several records for batch edit and delete
+        self.tree = ttk.Treeview(table_frame, columns=cols, show="headings",
+                                 selectmode="extended")
         for c in cols:
             self.tree.heading(c, text=c)
         widths = [40,100,80,60,300,100,140]
@@ -45,134 +75,284 @@ class RecordsWindow(tk.Toplevel):
             self.tree.column(c, width=w, anchor="center")
 
         vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
         vsb.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
+        # only a few pages of rows are ever live in the Treeview
+        self.table = PagedTable(self.tree, vsb, on_loading=self._on_loading)
 
         # Bottom action buttons: Edit & Delete
         action_frame = ttk.Frame(self, padding=10)
         action_frame.pack(fill="x")
-        action_frame.columnconfigure((0,1), weight=1)
+        action_frame.columnconfigure((0,1,2), weight=1)
 
         ttk.Button(action_frame,
-                   text="✏️ Edit Selected Record",
+                   text="✏️ Edit Selected",
                    command=self.edit_selected
         ).grid(row=0, column=0, sticky="w")
+        self.count_label = ttk.Label(action_frame)
+        self.count_label.grid(row=0, column=1)
         ttk.Button(action_frame,
-                   text="🗑️ Delete Selected Record",
+                   text="🗑️ Delete Selected",
                    command=self.delete_selected
-        ).grid(row=0, column=1, sticky="e")
+        ).grid(row=0, column=2, sticky="e")
 
-        # Initial load: all records
-        self._populate_tree(database.get_all_records())
+        # Initial load: all records, newest first
+        self.date_range = None
+        self.descending = True
+        self._show_page()
 
-    def _populate_tree(self, rows):
-        """Clear existing rows and insert new ones."""
-        for iid in self.tree.get_children():
-            self.tree.delete(iid)
-        for rec in rows:
-            self.tree.insert("", "end", values=rec)
+    def _show_page(self):
+        """(Re)load the table for the current date range and search text."""
+        if self.search_var.get().strip():
+            self.search()
+        else:
+            self.table.load(*(self.date_range or (None, None)), descending=self.descending)
+
+    def _on_search_typed(self, *_):
+        # debounce: only search once typing pauses
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._show_page)
+
+    def search(self):
+        """Show records whose comment matches the search text, best first."""
+        self._search_job = None
+        self._on_loading(True)
+        # keyed on the table so it supersedes page loads and older searches
+        get_executor().submit(
+            self, database.search_records, self.search_var.get(),
+            *(self.date_range or (None, None)),
+            on_done=self._show_matches, on_error=self._search_failed, key=self.table
+        )
+
+    def _show_matches(self, matches):
+        self.table.show(
+            [rec for rec, _ in matches],
+            [rec._replace(comment=marked).display_values() for rec, marked in matches],
+        )
+        self._on_loading(False)
+
+    def _search_failed(self, exc):
+        self._on_loading(False)
+        show_error(exc)
+
+    def _on_loading(self, loading):
+        set_busy(self, loading)
+        if loading:
+            self.count_label.configure(text="Loading…")
+        else:
+            self._show_count()
+
+    def _show_count(self):
+        if self.search_var.get().strip():
+            more = "+" if self.table.total >= database.SEARCH_LIMIT else ""
+            self.count_label.configure(text=f"{self.table.total}{more} match(es)")
+        else:
+            self.count_label.configure(text=f"{self.table.total} record(s)")
 
+    @timed_action
     def load_records(self):
         """Load records into the table based on date filters."""
         start = self.from_date.get()
         end   = self.to_date.get()
         if start and end:
-            rows = database.get_records_between_dates(start, end)
+            self.date_range = (start, end)
+            self.descending = False
         else:
-            rows = database.get_all_records()
-        self._populate_tree(rows)
+            self.date_range = None
+            self.descending = True
+        self._show_page()
+        self._refresh_charts()
+
+    def _refresh_charts(self):
+        # charts already on screen follow the filter and the edits
+        for kind in self.charts:
+            self._refresh_chart(kind, select=False)
 
+    def _selected_records(self):
+        return [self.table.records[iid] for iid in self.tree.selection()]
+
+    @timed_action
     def delete_selected(self):
-        """Delete highlighted record and refresh."""
-        sel = self.tree.selection()
-        if not sel:
+        """Delete the highlighted records in one transaction and drop their rows."""
+        records = self._selected_records()
+        if not records:
             messagebox.showwarning("No selection", "Please select a record to delete.")
             return
-        rid = self.tree.item(sel[0])["values"][0]
-        database.delete_record(rid)
-        self.load_records()
+        if len(records) > 1 and not messagebox.askyesno(
+                "Delete records", f"Delete {len(records)} records?", parent=self):
+            return
+        submit_write(
+            self, database.delete_records, [rec.id for rec in records],
+            on_done=self._deleted
+        )
+
+    def _deleted(self, record_ids):
+        self.table.remove(record_ids)
+        self._show_count()
+        self._refresh_charts()
 
     def edit_selected(self):
-        """Open an edit dialog for the selected record."""
-        sel = self.tree.selection()
-        if not sel:
+        """Open an edit dialog for the selected record, or a batch edit for several."""
+        records = self._selected_records()
+        if not records:
             messagebox.showwarning("No selection", "Please select a record to edit.")
             return
-        vals = self.tree.item(sel[0])["values"]
-        EditRecordWindow(self, vals, on_save=self.load_records)
+        if len(records) > 1:
+            BatchEditWindow(self, records, on_save=self.records_saved)
+        else:
+            EditRecordWindow(self, records[0], on_save=self.record_saved)
+
+    def record_saved(self, record, bounds):
+        """Patch an edited record into the table."""
+        if self.date_range is not None and not self.table.in_range(record):
+            # moved out of the filter: widen it to everything to keep it in view
+            self.from_date.set_date(bounds[0])
+            self.to_date.set_date(bounds[1])
+            self.load_records()
+            return
+        self.records_saved([record])
+
+    def records_saved(self, records):
+        """Patch edited records into the table and refresh open charts."""
+        for rec in records:
+            self.table.upsert(rec)
+        self._show_count()
+        self._refresh_charts()
+
+    def export_records(self):
+        """Write the records of the current date range to a file."""
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Export Records", defaultextension=".csv",
+            filetypes=EXPORT_FILETYPES,
+        )
+        if not path:
+            return
+        # the worker stores (written, total) here; the Tk loop displays it
+        progress = [0, 0]
+
+        def report(written, total):
+            progress[:] = written, total
+
+        self.export_btn.configure(state="disabled")
+        # own executor, so browsing the table is not queued behind the export
+        future = get_executor("export").submit(
+            self, _export, path, self.date_range, report,
+            on_done=lambda count: self._exported(path, count),
+            on_error=self._export_failed
+        )
+        self._show_export_progress(future, progress)
 
-    def show_chart(self):
-        """Bar chart: total kicks per day."""
-        items = self.tree.get_children()
-        if not items:
-            messagebox.showinfo("No Data", "No records to display.")
+    def _show_export_progress(self, future, progress):
+        if future.done():
             return
+        written, total = progress
+        self.export_btn.configure(text=f"Exporting {written}/{total}…")
+        self.after(EXPORT_PROGRESS_MS, self._show_export_progress, future, progress)
 
-        daily = defaultdict(int)
-        for iid in items:
-            _, date, _, kicks, *_ = self.tree.item(iid)["values"]
-            cnt = int(kicks) if str(kicks).isdigit() else 1
-            daily[date] += cnt
+    def _exported(self, path, count):
+        self.export_btn.configure(text="Export…", state="normal")
+        messagebox.showinfo("Export", f"Exported {count} record(s) to\n{path}", parent=self)
 
-        dates  = sorted(daily)
-        counts = [daily[d] for d in dates]
+    def _export_failed(self, exc):
+        self.export_btn.configure(text="Export…", state="normal")
+        show_error(exc)
 
-        plt.figure(figsize=(10,5))
-        plt.bar(dates, counts)
-        plt.xlabel("Date")
-        plt.ylabel("Number of Kicks")
-        plt.title("Baby Kicks per Day")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+    @timed_action
+    def show_chart(self):
+        """Bar chart: total kicks per day, for the range shown in the table."""
+        self._refresh_chart("chart")
 
+    @timed_action
     def show_heatmap(self):
-        """Heatmap: kicks by hour-of-day vs date, using current table contents."""
-        items = self.tree.get_children()
-        if not items:
-            messagebox.showinfo("No Data", "No records to display.")
-            return
+        """Heatmap: kicks by hour-of-day vs date, for the range shown in the table."""
+        self._refresh_chart("heatmap")
+
+    def _refresh_chart(self, kind, select=True):
+        """Create the chart tab on first use, then update it in place."""
+        class_name, title, query = CHARTS[kind]
+        chart = self.charts.get(kind)
+        if chart is None:
+            import ui.charts  # matplotlib is only loaded once a chart is shown
+            chart_cls = getattr(ui.charts, class_name)
+            chart = self.charts[kind] = chart_cls(self.notebook)
+            self.notebook.add(chart.widget, text=title)
+        if select:
+            self.notebook.select(chart.widget)
+        set_busy(self, True)
+        get_executor().submit(
+            self, query, self.date_range,
+            on_done=lambda series: self._draw(chart, series),
+            on_error=self._query_failed, key=(self, kind)
+        )
+
+    def _draw(self, chart, series):
+        set_busy(self, False)
+        chart.update(*series)
+
+    def _query_failed(self, exc):
+        set_busy(self, False)
+        show_error(exc)
+
+
+def _day_bounds(date_range):
+    if date_range is None:
+        return None, None
+    return parse_date(date_range[0]), parse_date(date_range[1])
+
+
+def _export(path, date_range, progress):
+    """Worker side of export_records."""
+    import export
+    start, end = date_range or (None, None)
+    return export.export_file(path, start_date=start, end_date=end, progress=progress)
+
+
+def _daily_series(date_range):
+    """
+    Worker side of show_chart: (days, totals) from the column snapshot,
+    or from the rollups if the range reaches into archives.
+    """
+    import archive
+    from columnar import daily_from_rollup, get_snapshot
+    start, end = _day_bounds(date_range)
+    if archive.reaches(start, end):
+        return daily_from_rollup(database.get_daily_totals(start, end))
+    return get_snapshot().daily_totals(start, end)
 
-        # aggregate kicks per date/hour
-        data = defaultdict(lambda: [0]*24)
-        for iid in items:
-            _, date, time_str, kicks, *_ = self.tree.item(iid)["values"]
-            hour = int(time_str.split(":")[0])
-            cnt  = int(kicks) if str(kicks).isdigit() else 1
-            data[date][hour] += cnt
-
-        dates = sorted(data)
-        mat   = np.array([data[d] for d in dates]).T  # shape (24, n_dates)
-
-        # color scale from zero up to the max value
-        vmin, vmax = 0, int(mat.max()) if mat.size else 1
-
-        plt.figure(figsize=(10,5))
-        im = plt.imshow(mat, aspect='auto', origin='upper',
-                        cmap='YlOrRd', vmin=vmin, vmax=vmax)
-        plt.colorbar(im, label="Number of Kicks")
-        plt.yticks(range(24), [f"{h:02d}:00" for h in range(24)])
-        plt.xticks(range(len(dates)), dates, rotation=45)
-        plt.xlabel("Date")
-        plt.ylabel("Hour of Day")
-        plt.title("Baby Kicks Heatmap")
-        plt.tight_layout()
-        plt.show()
+
+def _hourly_matrix(date_range):
+    """
+    Worker side of show_heatmap: (days, 24 x n matrix) from the column
+    snapshot, or from the rollups if the range reaches into archives.
+    """
+    import archive
+    from columnar import get_snapshot, hourly_from_rollup
+    start, end = _day_bounds(date_range)
+    if archive.reaches(start, end):
+        return hourly_from_rollup(database.get_hourly_totals(start, end))
+    return get_snapshot().hourly_matrix(start, end)
+
+
+# chart kind → (ui.charts class name, tab title, worker query)
+CHARTS = {
+    "chart": ("DailyChart", "Chart", _daily_series),
+    "heatmap": ("HeatmapChart", "Heatmap", _hourly_matrix),
+}
 
 
 class EditRecordWindow(tk.Toplevel):
     """Modal window to edit an existing record."""
-    def __init__(self, parent, record_values, on_save):
+    def __init__(self, parent, record, on_save):
         super().__init__(parent)
         self.title("Edit Record")
         self.resizable(False, False)
         self.parent_window = parent
         self.on_save = on_save
-        self.record_id = record_values[0]
+        self.record_id = record.id
 
-        # Unpack existing values
-        _, date, time, kicks, comment, _, _ = record_values
+        # Existing values, as shown in the table
+        _, date, time, kicks, comment, _, _ = record.display_values()
 
         frm = ttk.Frame(self, padding=20)
         frm.grid()
@@ -204,11 +384,13 @@ class EditRecordWindow(tk.Toplevel):
         # Save / Cancel buttons
         btns = ttk.Frame(frm)
         btns.grid(row=4, column=0, columnspan=2, pady=(10,0))
-        ttk.Button(btns, text="Save",   command=self.save).grid(row=0, column=0, padx=5)
+        self.save_btn = ttk.Button(btns, text="Save", command=self.save)
+        self.save_btn.grid(row=0, column=0, padx=5)
         ttk.Button(btns, text="Cancel", command=self.destroy).grid(row=0, column=1, padx=5)
 
+    @timed_action
     def save(self):
-        """Validate inputs, update DB, reset filters, and refresh."""
+        """Validate inputs, update DB, and patch the record into the table."""
         new_date    = self.dt.get()
         new_time    = self.tm.get().strip()
         new_kicks   = self.kc.get().strip()
@@ -218,25 +400,97 @@ class EditRecordWindow(tk.Toplevel):
             messagebox.showwarning("Missing data", "Date and Time are required.")
             return
 
-        # compute updated pregnancy weeks
-        new_weeks = calculate_pregnancy_weeks(new_date)
-
-        # commit to DB
-        database.update_record(
-            self.record_id,
-            new_date, new_time,
-            new_kicks, new_comment,
-            new_weeks
+        # commit to DB in the background; the dialog stays open meanwhile
+        self.save_btn.configure(state="disabled")
+        set_busy(self, True)
+        submit_write(
+            self, _update_and_get_bounds,
+            self.record_id, new_date, new_time, new_kicks, new_comment,
+            on_done=self._saved, on_error=self._save_failed
         )
 
-        # reset filters in parent window to full range
-        all_rows = database.get_all_records()
-        if all_rows:
-            dates = [row[1] for row in all_rows]  # row[1] is the date
-            min_date, max_date = min(dates), max(dates)
-            self.parent_window.from_date.set_date(min_date)
-            self.parent_window.to_date.set_date(max_date)
+    def _save_failed(self, exc):
+        self.save_btn.configure(state="normal")
+        set_busy(self, False)
+        if isinstance(exc, ValueError):
+            messagebox.showwarning("Invalid data", str(exc))
+        elif isinstance(exc, sqlite3.IntegrityError):
+            messagebox.showwarning("Duplicate", "A record for this Date and Time already exists.")
+        else:
+            show_error(exc)
 
+    def _saved(self, result):
         messagebox.showinfo("Success", "Record updated.")
-        self.on_save()
+        self.on_save(*result)
+        self.destroy()
+
+
+def _update_and_get_bounds(record_id, date, time, kicks, comment):
+    """Worker side of EditRecordWindow.save: the updated record and the date range."""
+    record = database.update_record(record_id, date, time, kicks, comment)
+    if record is None:
+        raise ValueError("This record has been deleted or archived.")
+    return record, database.get_date_bounds()
+
+
+class BatchEditWindow(tk.Toplevel):
+    """Modal window giving several records the same kick count and/or comment."""
+    def __init__(self, parent, records, on_save):
+        super().__init__(parent)
+        self.title(f"Edit {len(records)} Records")
+        self.resizable(False, False)
+        self.on_save = on_save
+        self.record_ids = [rec.id for rec in records]
+
+        frm = ttk.Frame(self, padding=20)
+        frm.grid()
+
+        # only the ticked fields are changed
+        self.set_kicks = tk.BooleanVar()
+        ttk.Checkbutton(frm, text="Kicks Count:", variable=self.set_kicks
+        ).grid(row=0, column=0, sticky="w", padx=5, pady=5)
+        self.kc = ttk.Entry(frm)
+        self.kc.grid(row=0, column=1, pady=5)
+
+        self.set_comment = tk.BooleanVar()
+        ttk.Checkbutton(frm, text="Comment:", variable=self.set_comment
+        ).grid(row=1, column=0, sticky="nw", padx=5, pady=5)
+        self.cm = tk.Text(frm, width=30, height=4, wrap="word")
+        self.cm.grid(row=1, column=1, pady=5)
+
+        btns = ttk.Frame(frm)
+        btns.grid(row=2, column=0, columnspan=2, pady=(10,0))
+        self.save_btn = ttk.Button(btns, text="Save", command=self.save)
+        self.save_btn.grid(row=0, column=0, padx=5)
+        ttk.Button(btns, text="Cancel", command=self.destroy).grid(row=0, column=1, padx=5)
+
+    @timed_action
+    def save(self):
+        """Update all the records in one transaction."""
+        changes = {}
+        if self.set_kicks.get():
+            changes["kicks"] = self.kc.get().strip()
+        if self.set_comment.get():
+            changes["comment"] = self.cm.get("1.0", tk.END).strip()
+        if not changes:
+            messagebox.showwarning("Nothing to change", "Tick the fields to change.", parent=self)
+            return
+
+        self.save_btn.configure(state="disabled")
+        set_busy(self, True)
+        submit_write(
+            self, database.update_records, self.record_ids,
+            on_done=self._saved, on_error=self._save_failed, **changes
+        )
+
+    def _save_failed(self, exc):
+        self.save_btn.configure(state="normal")
+        set_busy(self, False)
+        if isinstance(exc, ValueError):
+            messagebox.showwarning("Invalid data", str(exc), parent=self)
+        else:
+            show_error(exc)
+
+    def _saved(self, records):
+        self.on_save(records)
         self.destroy()
@@ -0,0 +1,138 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sessions
+from instrumentation import timed_action
+from ui.background import set_busy, show_error, submit_write
+
+# how often the elapsed time is redrawn
+TICK_MS = 250
+
+
+class SessionWindow(tk.Toplevel):
+    """Kick-counting session: one tap per kick, saved as a whole when finished."""
+    def __init__(self, parent, on_save):
+        super().__init__(parent)
+        self.title("Kick Counting Session")
+        self.on_save = on_save
+
+        style = ttk.Style(self)
+        style.theme_use('default')
+        style.configure(".", font=("Segoe UI", 10))
+        style.configure("Tap.TButton", font=("Segoe UI", 18, "bold"), padding=20)
+
+        frame = ttk.Frame(self, padding=20)
+        frame.grid(row=0, column=0, sticky="nsew")
+        frame.columnconfigure(1, weight=1)
+
+        ttk.Label(frame,
+                  text="Tap for every kick (or press Space)",
+                  font=("Segoe UI", 14, "bold")
+        ).grid(row=0, column=0, columnspan=3, pady=(0,10))
+
+        self.count_lbl = ttk.Label(frame, text="0", font=("Segoe UI", 36, "bold"))
+        self.count_lbl.grid(row=1, column=0, columnspan=3)
+        self.status = ttk.Label(frame, justify="center")
+        self.status.grid(row=2, column=0, columnspan=3, pady=(0,10))
+
+        # taps are taken on press, not release, for accurate timestamps
+        self.tap_btn = ttk.Button(frame, text="👣 Kick", style="Tap.TButton")
+        self.tap_btn.grid(row=3, column=0, columnspan=3, sticky="we")
+        self.tap_btn.bind("<ButtonPress-1>", self.tap)
+        # on the button, not the window, so spaces typed in the comment are not kicks
+        self.tap_btn.bind("<KeyPress-space>", self.tap)
+
+        ttk.Label(frame, text="Comment (optional):").grid(
+            row=4, column=0, sticky="e", padx=(0,5), pady=(15,0)
+        )
+        self.comment = ttk.Entry(frame)
+        self.comment.grid(row=4, column=1, columnspan=2, sticky="we", pady=(15,0))
+
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=5, column=0, columnspan=3, pady=(15,0))
+        ttk.Button(buttons, text="Undo Last", command=self.undo).grid(row=0, column=0, padx=5)
+        self.save_btn = ttk.Button(buttons, text="Finish & Save", command=self.finish)
+        self.save_btn.grid(row=0, column=1, padx=5)
+        ttk.Button(buttons, text="Discard", command=self.discard).grid(row=0, column=2, padx=5)
+        self.protocol("WM_DELETE_WINDOW", self.discard)
+
+        self.session = sessions.Session()
+        self._tick_job = None
+        self._tick()
+        self.update()
+        self.minsize(self.winfo_width(), self.winfo_height())
+        self.tap_btn.focus_set()
+
+    def tap(self, _event=None):
+        """Record one kick now."""
+        if self.session.ended_ms is None:
+            self.count_lbl.configure(text=str(self.session.tap()))
+            self._show_status()
+
+    def undo(self):
+        self.session.undo()
+        self.count_lbl.configure(text=str(len(self.session.offsets)))
+        self._show_status()
+        self.tap_btn.focus_set()
+
+    def _tick(self):
+        if self.session.ended_ms is None:
+            self._show_status()
+            self._tick_job = self.after(TICK_MS, self._tick)
+
+    def _show_status(self):
+        offsets = self.session.offsets
+        text = f"Elapsed {sessions.format_duration(self.session.elapsed_ms())}"
+        if len(offsets) >= sessions.TARGET_KICKS:
+            reached = sessions.format_duration(offsets[sessions.TARGET_KICKS - 1])
+            text += f"\n{sessions.TARGET_KICKS} kicks reached after {reached}"
+        self.status.configure(text=text)
+
+    @timed_action
+    def finish(self):
+        """End the session and store its taps and summary record."""
+        if not self.session.offsets:
+            messagebox.showwarning("No kicks", "Tap at least once before saving.", parent=self)
+            return
+        self.session.end()
+        self.save_btn.configure(state="disabled")
+        self.tap_btn.configure(state="disabled")
+        set_busy(self, True)
+        submit_write(
+            self, sessions.save, self.session, self.comment.get(),
+            on_done=self._saved, on_error=self._save_failed
+        )
+
+    def _save_failed(self, exc):
+        set_busy(self, False)
+        self.save_btn.configure(state="normal")
+        show_error(exc)
+
+    def _saved(self, result):
+        record, _ = result
+        set_busy(self, False)
+        if record is None:
+            messagebox.showwarning(
+                "Duplicate",
+                "A record for this Date and Time already exists. The session's kicks "
+                "were saved, but no summary record was added.",
+                parent=self,
+            )
+        else:
+            messagebox.showinfo("Success", f"Session saved: {record.comment}", parent=self)
+            self.on_save(record)
+        self.destroy()
+
+    def destroy(self):
+        if self._tick_job is not None:
+            self.after_cancel(self._tick_job)
+            self._tick_job = None
+        super().destroy()
+
+    def discard(self):
+        """Close without saving, after asking if there are taps."""
+        if self.save_btn.instate(["disabled"]):
+            return  # saving
+        if self.session.offsets and not messagebox.askyesno(
+                "Discard session", f"Discard {len(self.session.offsets)} kicks?", parent=self):
+            return
+        self.destroy()
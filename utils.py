@@ -1,15 +1,18 @@
-from datetime import datetime
-from settings import get_pregnancy_start_date
+from functools import lru_cache
+from models import format_gestational_age, parse_date
+from settings import get_pregnancy_start_ordinal
 
-def calculate_pregnancy_weeks(record_date_str):
+def calculate_pregnancy_weeks(record_date):
     """Return weeks and days since pregnancy start."""
-    start_str = get_pregnancy_start_date()
     try:
-        start = datetime.strptime(start_str, "%Y-%m-%d")
-        record = datetime.strptime(record_date_str, "%Y-%m-%d")
-        delta = record - start
-        weeks = delta.days // 7
-        days = delta.days % 7
-        return f"{weeks} weeks {days} days"
-    except:
+        day = parse_date(record_date)
+    except ValueError:
         return "N/A"
+    return _weeks_for_day(day, get_pregnancy_start_ordinal())
+
+@lru_cache(maxsize=4096)
+def _weeks_for_day(day, start):
+    # keyed on the start ordinal too, so a new start date never hits stale entries
+    if start is None:
+        return "N/A"
+    return format_gestational_age(day - start)
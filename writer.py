@@ -0,0 +1,155 @@
+"""
+Write-behind queue with group commit.
+
+One writer thread owns the write connection. Callers submit write
+operations (usually database.py functions) and get a
+concurrent.futures.Future back right away; the thread runs whatever has
+queued up, up to max_batch operations, inside one transaction and
+commits once. The first operation of a group waits at most
+max_delay_ms for company, so a burst of taps becomes a few large
+transactions instead of many tiny ones.
+
+Each operation runs in its own savepoint, so a failing one only undoes
+itself and gets the exception on its future. Futures are resolved after
+the commit. The writer connection uses synchronous=FULL: a resolved
+future means the write is on disk, and the fsync is paid once per
+group, off the Tk thread.
+
+    future = get_writer().submit(database.insert_record, "2025-01-05", "21:15", 7, "")
+    record = future.result()
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import connection
+from connection import transaction
+
+MAX_DELAY_MS = 5
+MAX_BATCH = 500
+SYNCHRONOUS = "FULL"
+
+_STOP = object()
+
+
+class WriteQueue:
+    """A writer thread group-committing submitted write operations."""
+
+    def __init__(self, max_delay_ms=MAX_DELAY_MS, max_batch=MAX_BATCH,
+                 synchronous=SYNCHRONOUS):
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        # operations and transactions so far, for benchmarks and diagnostics
+        self.writes = self.commits = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._conn = None
+        self._thread = threading.Thread(target=self._run, name="writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) to run on the writer thread; returns a Future."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The write queue is closed")
+            self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far is committed to disk."""
+        self.submit(_noop).result(timeout)
+
+    def close(self, timeout=None):
+        """Refuse new writes, commit the queued ones, and stop the thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # -- writer thread -------------------------------------------------
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+        connection.close_connection()
+
+    def _connect(self):
+        conn = connection.get_connection()
+        if conn is not self._conn:  # first use, or the database path changed
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._conn = conn
+
+    def _commit(self, batch):
+        done = []
+        try:
+            self._connect()
+            with transaction():
+                for future, fn, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction():
+                            result = fn(*args, **kwargs)
+                        done.append((future, result, None))
+                    except Exception as e:
+                        done.append((future, None, e))
+        except Exception as e:
+            # nothing was committed
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.writes += len(done)
+        self.commits += 1
+        for future, result, exc in done:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+def _noop():
+    pass
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """The shared write queue, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteQueue()
+        return _writer
+
+
+def close_writer():
+    """Drain and stop the shared write queue, if it was started."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()